@@ -0,0 +1,249 @@
+"""卡片生成基准测试和参考图比对
+
+不访问网络: 按固定种子生成各种尺寸和比例的合成图片(极小、4K、超高、超宽),
+编码为JPEG放进图片磁盘缓存, 再对每种封面类型(default/detail/collage)调用
+CardGenerator.generate_card, 测量每张卡片的耗时(含解码、绘制、编码和保存)
+和峰值内存增量。
+
+生成的卡片与参考图逐像素比较, 任一通道差值超过--tolerance的像素占比
+超过--max-diff即为不一致, 并输出差异图, 防止渲染优化悄悄改变卡片外观。
+参考图与字体有关, 存放在 golden/<字体名>/ 下, 修改渲染代码前先在修改前的
+提交上生成参考图:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.bench_cards --font 字体路径 --update-golden
+    python -m astrbot_plugin_ggac.GGAC_Scraper.bench_cards --font 字体路径
+
+需要以包的方式在插件目录的上一级运行, 有不一致或缺少参考图时返回码为1,
+只有指定--update-golden时才会写入参考图
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from PIL import Image, ImageChops, ImageDraw
+from .bench_render import make_work, current_rss_kb, reset_peak_rss, peak_rss_kb
+from .card_generator import CardGenerator
+from .ggac_scraper import WorkItem
+from ..config import FONTS_DIR
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+
+COVER_SIZES = {
+    "tiny": (96, 64),
+    "small": (600, 400),
+    "fhd": (1920, 1080),
+    "4k": (3840, 2160),
+    "tall": (800, 4000),
+    "wide": (4000, 500),
+}
+
+COVER_TYPES = ("default", "detail", "collage")
+
+# 拼图使用的详情图片尺寸
+MEDIA_SIZES = [(1200, 800), (800, 1200), (1000, 1000), (1600, 900), (900, 1600)]
+
+
+def synthetic_image(width: int, height: int, seed: int) -> Image.Image:
+    """按种子生成确定的图片: 渐变背景加若干色块"""
+    rng = random.Random(seed)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    channels = [
+        gradient.point(lambda v, c=rng.randrange(256): (v + c) % 256),
+        gradient.transpose(Image.ROTATE_180).point(
+            lambda v, c=rng.randrange(256): (v + c) % 256
+        ),
+        Image.new("L", (width, height), rng.randrange(256)),
+    ]
+    image = Image.merge("RGB", channels)
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1 = min(width, x0 + rng.randint(1, max(1, width // 3)))
+        y1 = min(height, y0 + rng.randint(1, max(1, height // 3)))
+        color = tuple(rng.randrange(256) for _ in range(3))
+        if rng.random() < 0.5:
+            draw.ellipse([x0, y0, x1, y1], fill=color)
+        else:
+            draw.rectangle([x0, y0, x1, y1], fill=color)
+    return image
+
+
+def encode_jpeg(image: Image.Image) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def prepare_generator(font_path: str, temp_dir: str) -> CardGenerator:
+    """创建生成器并把合成图片的JPEG字节放进磁盘缓存
+
+    关闭内存缓存和卡片缓存, 每次生成都要解码、绘制和编码
+    """
+    generator = CardGenerator(
+        output_dir=os.path.join(temp_dir, "cards"),
+        font_path=font_path,
+        image_cache_dir=os.path.join(temp_dir, "images"),
+        image_cache_pixels=0,
+        card_cache=False,
+        card_format="png",
+    )
+    cache = generator.image_cache
+    for index, (name, (width, height)) in enumerate(COVER_SIZES.items()):
+        cache.put_bytes(
+            f"bench://cover/{name}", encode_jpeg(synthetic_image(width, height, index))
+        )
+    for index, (width, height) in enumerate(MEDIA_SIZES):
+        cache.put_bytes(
+            f"bench://media/{index}",
+            encode_jpeg(synthetic_image(width, height, 100 + index)),
+        )
+    cache.put_bytes("bench://avatar", encode_jpeg(synthetic_image(256, 256, 200)))
+    return generator
+
+
+def make_case_work(index: int, cover: str):
+    """封面为指定尺寸的作品, 详情中第一张图片为另一张图片, 其后为拼图图片"""
+    work = make_work(index, f"bench://cover/{cover}")
+    work.media_urls = WorkItem.project_media(
+        [{"type": 1, "url": f"bench://media/{(index + 1) % 5}"}]
+        + [{"type": 1, "url": f"bench://media/{i}"} for i in range(len(MEDIA_SIZES))]
+    )
+    return work
+
+
+def compare(card: Image.Image, golden: Image.Image, tolerance: int):
+    """返回 (差异像素占比, 最大差值, 差异图); 尺寸不同时占比为1"""
+    if card.size != golden.size:
+        return 1.0, 255, None
+    diff = ImageChops.difference(card.convert("RGB"), golden.convert("RGB"))
+    # 逐像素取三个通道的最大差值
+    channels = diff.split()
+    diff_max = ImageChops.lighter(ImageChops.lighter(channels[0], channels[1]), channels[2])
+    histogram = diff_max.histogram()
+    over = sum(histogram[tolerance + 1 :])
+    max_diff = max((value for value, count in enumerate(histogram) if count), default=0)
+    mask = diff_max.point(lambda v: 255 if v > tolerance else 0)
+    return over / (card.width * card.height), max_diff, mask
+
+
+async def bench_cover(args, cover: str) -> int:
+    """在当前进程中测量一种封面的各种类型, 返回不一致的卡片数"""
+    golden_dir = Path(args.golden_dir or GOLDEN_DIR / Path(args.font).stem)
+    golden_dir.mkdir(parents=True, exist_ok=True)
+    index = list(COVER_SIZES).index(cover)
+    width, height = COVER_SIZES[cover]
+    failed = 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        generator = prepare_generator(args.font, temp_dir)
+        work = make_case_work(index, cover)
+        for type in COVER_TYPES:
+            baseline = current_rss_kb()
+            reset_peak_rss()
+            elapsed = []
+            card_path = None
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                card_path, _ = await generator.generate_card(work, type)
+                elapsed.append((time.perf_counter() - start) * 1000)
+            peak = (peak_rss_kb() - baseline) / 1024
+
+            golden_path = golden_dir / f"{cover}_{type}.png"
+            diff_path = golden_dir / f"{cover}_{type}.diff.png"
+            actual_path = golden_dir / f"{cover}_{type}.actual.png"
+            # 清除上次比对留下的差异图
+            for stale_path in (diff_path, actual_path):
+                stale_path.unlink(missing_ok=True)
+            with Image.open(card_path) as card:
+                card.load()
+            if args.update_golden:
+                card.save(golden_path)
+                result = "已更新"
+            elif not golden_path.exists():
+                # 不自动新建参考图, 否则新的检出总是与自身比较
+                failed += 1
+                result = "缺少参考图"
+                card.save(actual_path)
+            else:
+                with Image.open(golden_path) as golden:
+                    ratio, max_diff, mask = compare(card, golden, args.tolerance)
+                if ratio > args.max_diff:
+                    failed += 1
+                    result = f"不一致 {ratio:.2%} (最大差值 {max_diff})"
+                    if mask is not None:
+                        mask.save(diff_path)
+                    card.save(actual_path)
+                else:
+                    result = f"一致 (最大差值 {max_diff})"
+
+            print(
+                f"{cover:<8}{type:<9}{f'{width}x{height}':<12}{elapsed[0]:>10.1f}"
+                f"{sum(elapsed) / len(elapsed):>10.1f}{peak:>14.1f}  {result}",
+                flush=True,
+            )
+    return failed
+
+
+def bench(args) -> int:
+    """每种封面在独立的子进程中测量, 避免互相影响峰值内存"""
+    if not reset_peak_rss():
+        print("无法重置峰值内存统计, 内存增量仅供参考")
+    print(
+        f"{'封面':<8}{'类型':<9}{'尺寸':<12}{'首次(ms)':>10}{'平均(ms)':>10}"
+        f"{'峰值增量(MB)':>14}  参考图",
+        flush=True,
+    )
+    failed = 0
+    for cover in COVER_SIZES:
+        command = [
+            sys.executable,
+            "-m",
+            __spec__.name,
+            "--cover",
+            cover,
+            "--font",
+            args.font,
+            "--rounds",
+            str(args.rounds),
+            "--tolerance",
+            str(args.tolerance),
+            "--max-diff",
+            str(args.max_diff),
+        ]
+        if args.golden_dir:
+            command += ["--golden-dir", args.golden_dir]
+        if args.update_golden:
+            command.append("--update-golden")
+        failed += subprocess.run(command).returncode
+
+    if failed:
+        print(
+            f"\n{failed} 张卡片与参考图不一致或缺少参考图, 差异图保存在参考图目录中;"
+            " 缺少参考图时先在修改前的提交上加 --update-golden 运行一次生成参考图"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="卡片生成基准测试和参考图比对")
+    parser.add_argument("--font", default=FONTS_DIR, help="字体文件路径")
+    parser.add_argument("--rounds", type=int, default=3, help="每种卡片的生成次数")
+    parser.add_argument("--golden-dir", help="参考图目录, 默认 golden/<字体名>")
+    parser.add_argument("--update-golden", action="store_true", help="用本次结果覆盖参考图")
+    parser.add_argument("--tolerance", type=int, default=8, help="单个通道允许的差值")
+    parser.add_argument(
+        "--max-diff", type=float, default=0.001, help="允许超出差值的像素占比"
+    )
+    parser.add_argument("--cover", choices=COVER_SIZES, help="只测量一种封面")
+    args = parser.parse_args()
+    if args.cover:
+        # 子进程以不一致的卡片数作为返回码
+        sys.exit(asyncio.run(bench_cover(args, args.cover)))
+    sys.exit(bench(args))
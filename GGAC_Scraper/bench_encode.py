@@ -0,0 +1,68 @@
+"""卡片编码基准测试
+
+用合成的卡片比较各编码格式的耗时和文件大小。
+需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.bench_encode
+"""
+
+import time
+from PIL import Image, ImageDraw, ImageFilter
+from .card_encoder import CardEncoder
+
+
+def make_card(width: int, cover_height: int) -> Image.Image:
+    """生成与真实卡片结构相近的测试图: 照片般的封面 + 纯色信息栏 + 圆角"""
+    info_height = int(width * 0.3)
+    # 噪声加模糊模拟照片纹理, 再叠加渐变
+    cover = Image.effect_noise((width, cover_height), 64).filter(
+        ImageFilter.GaussianBlur(2)
+    )
+    gradient = Image.linear_gradient("L").resize((width, cover_height))
+    cover = Image.merge("RGB", (cover, gradient, cover.transpose(Image.FLIP_LEFT_RIGHT)))
+
+    card = Image.new("RGBA", (width, cover_height + info_height), "#ffffff")
+    card.paste(cover, (0, 0))
+    draw = ImageDraw.Draw(card)
+    for i in range(6):
+        y = cover_height + 20 + i * info_height // 7
+        draw.rectangle([(30, y), (30 + width // (i + 2), y + 12)], fill="#666666")
+
+    radius = int(width * 0.015)
+    mask = Image.new("L", card.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle([(0, 0), card.size], radius, fill=255)
+    card.putalpha(mask)
+    return card
+
+
+def bench():
+    """比较各格式的编码耗时和文件大小"""
+    cards = {
+        "600x480": make_card(600, 480),
+        "900x720": make_card(900, 720),
+        "1500x1200": make_card(1500, 1200),
+    }
+    encoders = {
+        "png": CardEncoder("png"),
+        "png_optimized": CardEncoder("png_optimized"),
+        "webp q85": CardEncoder("webp", quality=85),
+        "jpeg q85": CardEncoder("jpeg", quality=85),
+        "jpeg <=150KB": CardEncoder("jpeg", quality=90, target_bytes=150 * 1024),
+        "webp <=150KB": CardEncoder("webp", quality=90, target_bytes=150 * 1024),
+    }
+    rounds = 3
+
+    print(f"{'卡片':<12}{'格式':<16}{'耗时(ms)':>10}{'大小(KB)':>10}")
+    for card_name, card in cards.items():
+        for encoder_name, encoder in encoders.items():
+            start = time.perf_counter()
+            for _ in range(rounds):
+                data = encoder.encode(card)
+            elapsed = (time.perf_counter() - start) / rounds * 1000
+            print(
+                f"{card_name:<12}{encoder_name:<16}{elapsed:>10.1f}{len(data) / 1024:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    bench()
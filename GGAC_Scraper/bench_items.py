@@ -0,0 +1,83 @@
+"""作品数据内存基准测试
+
+用本地模拟服务器的数据(或录制的响应数据)生成列表项和详情, 经过一次JSON
+往返模拟刚解析的响应, 再转换为WorkItem, 用tracemalloc统计每1万个作品
+常驻的内存和转换耗时, 分别测量只保留用到的字段和保留原始数据(keep_raw)。
+需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.bench_items
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from .fake_ggac_server import FakeGGACServer
+from .ggac_scraper import WorkItem
+
+
+def load_payloads(args) -> list:
+    """(列表项JSON, 详情JSON), 去掉模拟服务器只用于筛选的字段"""
+    server = FakeGGACServer(
+        works=args.works, media_per_work=args.media, payload_file=args.payload_file
+    )
+    payloads = []
+    for work in server.works[: args.works]:
+        item = {key: value for key, value in work.items() if not key.startswith("_")}
+        detail = dict(server.details.get(work["id"], {}))
+        if args.description:
+            detail["description"] = "作品描述" * (args.description // 4)
+        payloads.append((json.dumps(item), json.dumps(detail)))
+    return payloads
+
+
+def measure(payloads: list, keep_raw: bool) -> tuple:
+    """返回 (常驻字节数, 转换耗时秒数)
+
+    常驻内存从解析响应开始统计, 响应数据在转换后即被释放, 只有作品中
+    引用的部分仍然常驻。耗时单独测量, 不含JSON解析和tracemalloc的开销
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    parsed = [(json.loads(item), json.loads(detail)) for item, detail in payloads]
+    works = [WorkItem.from_dict(item, detail, keep_raw) for item, detail in parsed]
+    del parsed
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    assert len(works) == len(payloads)
+    del works
+
+    parsed = [(json.loads(item), json.loads(detail)) for item, detail in payloads]
+    start = time.perf_counter()
+    works = [WorkItem.from_dict(item, detail, keep_raw) for item, detail in parsed]
+    return retained, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="作品数据内存基准测试")
+    parser.add_argument("--works", type=int, default=10000, help="作品数")
+    parser.add_argument("--media", type=int, default=6, help="每个作品详情中的图片数")
+    parser.add_argument(
+        "--description", type=int, default=0, help="在详情中附加该长度的描述, 模拟较大的详情"
+    )
+    parser.add_argument("--payload-file", help="录制的响应数据, 替代生成的数据")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args)
+    count = len(payloads)
+    payload_bytes = sum(len(item) + len(detail) for item, detail in payloads)
+    print(f"作品数: {count}, 响应JSON共 {payload_bytes / 1024 / 1024:.1f}MB")
+    print(f"{'表示':<12}{'每万个(MB)':>12}{'每个(B)':>10}{'转换(ms)':>10}")
+    for name, keep_raw in (("只保留字段", False), ("keep_raw", True)):
+        retained, elapsed = measure(payloads, keep_raw)
+        print(
+            f"{name:<12}{retained / count * 10000 / 1024 / 1024:>12.2f}"
+            f"{retained / count:>10.0f}{elapsed * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
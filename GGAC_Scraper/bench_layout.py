@@ -0,0 +1,86 @@
+"""标题排版基准测试
+
+比较TextLayout(字符宽度缓存)与逐次调用FreeType测量的朴素换行,
+标题为中英混排的长标题。需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.bench_layout --font 字体路径
+"""
+
+import argparse
+import random
+import time
+from PIL import ImageFont
+from .text_layout import TextLayout
+
+CJK = "原画场景角色设计概念插画赛博朋克古风少女机甲怪物森林城市夜晚光影练习作品集"
+LATIN = ["Cyberpunk", "Concept", "Art", "Character", "Design", "2024", "WIP", "v2", "Study"]
+
+
+def make_titles(count: int, seed: int = 0) -> list:
+    """生成中英混排的长标题"""
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(6, 14)):
+            if rng.random() < 0.5:
+                parts.append("".join(rng.choice(CJK) for _ in range(rng.randint(2, 6))))
+            else:
+                parts.append(rng.choice(LATIN))
+        titles.append(" ".join(parts) if rng.random() < 0.5 else "".join(parts))
+    return titles
+
+
+def naive_wrap(text: str, font, max_width: float, max_lines: int) -> list:
+    """逐字符追加并用getlength测量整行的朴素实现"""
+    lines, line = [], ""
+    for char in text:
+        if font.getlength(line + char) <= max_width:
+            line += char
+            continue
+        lines.append(line)
+        line = char
+        if len(lines) == max_lines:
+            # 还有剩余文本, 末行加省略号
+            last = lines[-1]
+            while last and font.getlength(last + "…") > max_width:
+                last = last[:-1]
+            lines[-1] = last + "…"
+            return lines
+    lines.append(line)
+    return lines
+
+
+def bench(font_path: str, count: int):
+    titles = make_titles(count)
+    font = ImageFont.truetype(font_path, 38)
+    max_width = 900 - 2 * 29
+
+    start = time.perf_counter()
+    for title in titles:
+        naive_wrap(title, font, max_width, 2)
+    naive = (time.perf_counter() - start) / count * 1000
+
+    layout = TextLayout()
+    start = time.perf_counter()
+    for title in titles:
+        layout.wrap(title, font, max_width, 2)
+    cold = (time.perf_counter() - start) / count * 1000
+
+    start = time.perf_counter()
+    for title in titles:
+        layout.wrap(title, font, max_width, 2)
+    warm = (time.perf_counter() - start) / count * 1000
+
+    print(f"标题数: {count}, 平均长度: {sum(map(len, titles)) / count:.0f}字符")
+    print(f"朴素实现:          {naive:.3f} ms/标题")
+    print(f"TextLayout(首次): {cold:.3f} ms/标题")
+    print(f"TextLayout(缓存): {warm:.3f} ms/标题")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="标题排版基准测试")
+    parser.add_argument("--font", required=True, help="字体文件路径")
+    parser.add_argument("--count", type=int, default=500, help="标题数量")
+    args = parser.parse_args()
+    bench(args.font, args.count)
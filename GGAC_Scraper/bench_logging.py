@@ -0,0 +1,100 @@
+"""日志开销基准测试
+
+在子进程中启动本地模拟服务器, 用GGACMonitor反复执行没有新作品的检查周期
+(只有列表和详情请求, 是日志最密集的路径), 分别在不同日志级别和是否采样时
+测量每个周期的CPU时间和输出的日志条数。日志写入os.devnull, 只计格式化和
+处理的开销, 不计终端输出。需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.bench_logging --font 字体路径
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import tempfile
+from .bench_poll import PUSH_SETTINGS, ServerProcess
+from .ggac_monitor import GGACMonitor
+from .log import logger, configure_logging
+from ..config import FONTS_DIR
+
+# (名称, 日志级别, 同一条日志每分钟最多输出的条数, 0为不采样)
+SCENARIOS = [
+    ("DEBUG 不采样", "DEBUG", 0),
+    ("DEBUG 采样", "DEBUG", 5),
+    ("INFO", "INFO", 5),
+    ("WARNING", "WARNING", 5),
+]
+
+
+class CountingHandler(logging.StreamHandler):
+    """写入devnull并统计条数"""
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.records = 0
+
+    def emit(self, record):
+        self.records += 1
+        super().emit(record)
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def run_scenario(
+    server, font_path: str, level: str, burst: int, cycles: int, page_size: int
+):
+    push_settings = {
+        name: dict(settings, page_size=page_size)
+        for name, settings in PUSH_SETTINGS[:3]
+    }
+    with tempfile.TemporaryDirectory() as temp_dir, open(os.devnull, "w") as devnull:
+        handler = CountingHandler(devnull)
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        saved_handlers, logger.handlers = logger.handlers, [handler]
+        logger.propagate = False
+        try:
+            # 建立缓存时的日志不计入
+            configure_logging("ERROR")
+            monitor = GGACMonitor(
+                cache_dir=os.path.join(temp_dir, "cache"),
+                cards_dir=os.path.join(temp_dir, "cards"),
+                api_rate_limit=0,
+                warm_pool_size=0,
+                api_base_url=server.base_url,
+                font_path=font_path,
+            )
+            await monitor.check_updates(push_settings)
+
+            configure_logging(level, burst=burst)
+            start = cpu_seconds()
+            for _ in range(cycles):
+                await monitor.check_updates(push_settings)
+            elapsed = cpu_seconds() - start
+        finally:
+            logger.handlers = saved_handlers
+            logger.propagate = True
+    return elapsed / cycles * 1000, handler.records / cycles
+
+
+async def bench(args):
+    print(f"{'场景':<14}{'CPU/周期(ms)':>14}{'日志/周期':>12}")
+    with ServerProcess(works=1000, latency=0.0) as server:
+        for name, level, burst in SCENARIOS:
+            cpu_ms, records = await run_scenario(
+                server, args.font, level, burst, args.cycles, args.page_size
+            )
+            print(f"{name:<14}{cpu_ms:>14.1f}{records:>12.1f}", flush=True)
+    configure_logging("INFO")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="日志开销基准测试")
+    parser.add_argument("--font", default=FONTS_DIR, help="字体文件路径")
+    parser.add_argument("--cycles", type=int, default=10, help="每个场景的检查周期数")
+    parser.add_argument("--page-size", type=int, default=48, help="每页作品数")
+    asyncio.run(bench(parser.parse_args()))
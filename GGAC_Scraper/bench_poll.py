@@ -0,0 +1,324 @@
+"""监控周期基准测试
+
+在子进程中启动本地模拟服务器, 用真实的GGACMonitor执行完整的检查周期:
+获取列表、对比缓存、请求详情、绘制卡片, 再通过模拟的OneBot客户端推送到各群组。
+按推送设置数、每页作品数、每周期新增作品数和群组数的组合分别测量,
+输出每个周期的耗时、各阶段的p50/p99、请求次数和字节数、峰值内存和CPU时间,
+结果写入JSON文件, 便于比较不同提交。需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.bench_poll --font 字体路径 --output bench_poll.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+import aiohttp
+from .bench_render import current_rss_kb, reset_peak_rss, peak_rss_kb
+from .ggac_monitor import GGACMonitor
+from .log import configure_logging
+from .scheduler import LatencyStats
+from .tracing import use_trace, span
+from ..config import FONTS_DIR
+
+# 依次取前N项作为推送设置, 第一项不限创作类型, 保证新增作品都能被检查到
+PUSH_SETTINGS = [
+    ("最新全部", {"category": "all", "media_type": None, "sort_by": "latest"}),
+    ("最新2D", {"category": "all", "media_type": "2d", "sort_by": "latest"}),
+    ("最新3D", {"category": "all", "media_type": "3d", "sort_by": "latest"}),
+    ("游戏最新", {"category": "game", "media_type": None, "sort_by": "latest"}),
+    ("精选2D", {"category": "featured", "media_type": "2d", "sort_by": "latest"}),
+]
+
+STAGES = ("cycle", "list", "detail", "diff", "render", "deliver")
+
+
+class StubClient:
+    """模拟OneBot客户端, 只记录发送的消息"""
+
+    def __init__(self, stage_latency: dict):
+        self.api = self
+        self.stage_latency = stage_latency
+        self.messages = 0
+        self.bytes = 0
+
+    async def call_action(self, action: str, **payloads):
+        start = time.perf_counter()
+        for segment in payloads["message"]:
+            if segment["type"] == "image":
+                image_file = segment["data"]["file"]
+                if image_file.startswith("file://"):
+                    self.bytes += os.path.getsize(image_file[len("file://") :])
+                else:
+                    self.bytes += len(image_file)
+        self.messages += 1
+        await asyncio.sleep(0)
+        self.stage_latency["deliver"].record(time.perf_counter() - start)
+
+
+async def send_updates(client: StubClient, group_id: str, updates: dict):
+    """与插件的send_updates发送相同的消息, 不等待发送间隔"""
+    for items in updates.values():
+        for item in items:
+            message = [
+                {"type": "image", "data": {"file": item["image_file"]}},
+                {"type": "text", "data": {"text": f"作品链接: {item['url']}"}},
+            ]
+            with use_trace(item.get("trace")), span("send", group=group_id):
+                await client.api.call_action(
+                    "send_group_msg", group_id=group_id, message=message
+                )
+
+
+def timed(function, latency: LatencyStats):
+    """包装协程函数, 记录每次调用的耗时"""
+
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            latency.record(time.perf_counter() - start)
+
+    return wrapper
+
+
+def instrument(monitor: GGACMonitor, stage_latency: dict):
+    """在实例上包装各阶段的方法"""
+    scraper = monitor.api._scraper
+    for name in ("featured", "game", "anime", "movie", "art", "comic", "other", "all"):
+        instance = getattr(scraper, name)
+        instance.get_work_page = timed(instance.get_work_page, stage_latency["list"])
+        instance.get_work_detail = timed(
+            instance.get_work_detail, stage_latency["detail"]
+        )
+    monitor.render_work = timed(monitor.render_work, stage_latency["render"])
+
+    find_updates = monitor._find_updates
+
+    def timed_find_updates(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return find_updates(*args, **kwargs)
+        finally:
+            stage_latency["diff"].record(time.perf_counter() - start)
+
+    monitor._find_updates = timed_find_updates
+
+
+class ServerProcess:
+    """在子进程中运行模拟服务器, 服务器的开销不计入测量"""
+
+    def __init__(self, works: int, latency: float):
+        self.args = [
+            sys.executable,
+            "-m",
+            __spec__.parent + ".fake_ggac_server",
+            "--port",
+            "0",
+            "--works",
+            str(works),
+            "--latency",
+            str(latency),
+        ]
+
+    def __enter__(self) -> "ServerProcess":
+        self.process = subprocess.Popen(
+            self.args, stdout=subprocess.PIPE, text=True, encoding="utf-8"
+        )
+        # 第一行输出为接口地址
+        self.base_url = self.process.stdout.readline().split(": ", 1)[1].strip()
+        self.root_url = self.base_url.rsplit("/api", 1)[0]
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+
+    async def call(self, method: str, path: str) -> dict:
+        async with aiohttp.ClientSession() as session:
+            async with session.request(method, self.root_url + path) as response:
+                return await response.json()
+
+
+async def run_scenario(
+    server: ServerProcess,
+    font_path: str,
+    settings_count: int,
+    page_size: int,
+    new_works: int,
+    groups: int,
+    cycles: int,
+    delivery: str,
+    trace_sample_rate: float,
+) -> dict:
+    push_settings = {
+        name: dict(settings, page_size=page_size)
+        for name, settings in PUSH_SETTINGS[:settings_count]
+    }
+    stage_latency = defaultdict(LatencyStats)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monitor = GGACMonitor(
+            cache_dir=os.path.join(temp_dir, "cache"),
+            cards_dir=os.path.join(temp_dir, "cards"),
+            api_rate_limit=0,
+            warm_pool_size=0,
+            delivery=delivery,
+            api_base_url=server.base_url,
+            font_path=font_path,
+            trace_file=os.path.join(temp_dir, "traces.jsonl"),
+            trace_sample_rate=trace_sample_rate,
+        )
+        client = StubClient(stage_latency)
+
+        # 第一个周期只建立缓存, 不计入结果
+        await monitor.check_updates(push_settings)
+        instrument(monitor, stage_latency)
+        await server.call("POST", "/_reset")
+
+        updates_found = 0
+        baseline_rss = current_rss_kb()
+        reset_peak_rss()
+        cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+        wall_start = time.perf_counter()
+        for _ in range(cycles):
+            await server.call("POST", f"/_works?count={new_works}")
+            start = time.perf_counter()
+            updates = await monitor.check_updates(push_settings)
+            try:
+                for group_id in range(groups):
+                    await send_updates(client, str(group_id), updates)
+            finally:
+                monitor.release_updates(updates)
+            stage_latency["cycle"].record(time.perf_counter() - start)
+            updates_found += sum(len(items) for items in updates.values())
+        wall = time.perf_counter() - wall_start
+        cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+        server_stats = await server.call("GET", "/_stats")
+
+    return {
+        "settings": settings_count,
+        "page_size": page_size,
+        "new_works": new_works,
+        "groups": groups,
+        "cycles": cycles,
+        "wall_s": round(wall, 4),
+        "cpu_s": round(
+            (cpu_end.ru_utime - cpu_start.ru_utime)
+            + (cpu_end.ru_stime - cpu_start.ru_stime),
+            4,
+        ),
+        "peak_rss_mb": round(peak_rss_kb() / 1024, 1),
+        "peak_rss_delta_mb": round((peak_rss_kb() - baseline_rss) / 1024, 1),
+        "updates": updates_found,
+        "messages": client.messages,
+        "delivered_bytes": client.bytes,
+        "requests": server_stats["requests"],
+        "response_bytes": server_stats["bytes"],
+        "stages": {
+            stage: {
+                "count": stage_latency[stage].count,
+                "p50_ms": round(stage_latency[stage].percentile(50) * 1000, 3),
+                "p99_ms": round(stage_latency[stage].percentile(99) * 1000, 3),
+            }
+            for stage in STAGES
+        },
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+async def bench(args):
+    results = []
+    print(
+        f"{'设置':>4}{'每页':>6}{'新增':>6}{'群组':>6}{'周期(ms)':>10}"
+        f"{'绘制p50':>10}{'请求':>6}{'CPU(s)':>8}{'峰值(MB)':>10}"
+    )
+    with ServerProcess(args.works, args.latency) as server:
+        for settings_count, page_size, new_works, groups in itertools.product(
+            args.settings, args.page_sizes, args.new_works, args.groups
+        ):
+            result = await run_scenario(
+                server,
+                args.font,
+                settings_count,
+                page_size,
+                new_works,
+                groups,
+                args.cycles,
+                args.delivery,
+                args.trace_sample_rate,
+            )
+            results.append(result)
+            stages = result["stages"]
+            print(
+                f"{settings_count:>4}{page_size:>6}{new_works:>6}{groups:>6}"
+                f"{stages['cycle']['p50_ms']:>10.1f}{stages['render']['p50_ms']:>10.1f}"
+                f"{sum(result['requests'].values()):>6}{result['cpu_s']:>8.2f}"
+                f"{result['peak_rss_mb']:>10.1f}",
+                flush=True,
+            )
+
+    report = {
+        "commit": git_commit(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "delivery": args.delivery,
+        "server_latency_s": args.latency,
+        "trace_sample_rate": args.trace_sample_rate,
+        "scenarios": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+
+def int_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="监控周期基准测试")
+    parser.add_argument("--font", default=FONTS_DIR, help="字体文件路径")
+    parser.add_argument("--output", default="bench_poll.json", help="结果JSON文件")
+    parser.add_argument("--settings", type=int_list, default=[1, 3], help="推送设置数")
+    parser.add_argument("--page-sizes", type=int_list, default=[24, 48], help="每页作品数")
+    parser.add_argument("--new-works", type=int_list, default=[0, 5], help="每周期新增作品数")
+    parser.add_argument("--groups", type=int_list, default=[1, 4], help="推送群组数")
+    parser.add_argument("--cycles", type=int, default=3, help="每种组合测量的周期数")
+    parser.add_argument("--works", type=int, default=1000, help="服务器初始作品数")
+    parser.add_argument("--latency", type=float, default=0.0, help="服务器接口延迟(秒)")
+    parser.add_argument(
+        "--delivery", choices=("file", "base64"), default="file", help="卡片发送方式"
+    )
+    parser.add_argument(
+        "--trace-sample-rate", type=float, default=0.0, help="记录trace的新作品比例"
+    )
+    parser.add_argument("--verbose", action="store_true", help="显示调试日志")
+    args = parser.parse_args()
+    if args.settings and max(args.settings) > len(PUSH_SETTINGS):
+        parser.error(f"推送设置数最多为 {len(PUSH_SETTINGS)}")
+    # 爬虫和监控的日志量很大, 默认只显示错误
+    configure_logging("DEBUG" if args.verbose else "ERROR")
+    asyncio.run(bench(args))
@@ -0,0 +1,169 @@
+"""卡片渲染基准测试
+
+不访问网络, 用合成封面测量每张卡片的绘制耗时和峰值内存增量。
+需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.bench_render --font 字体路径
+"""
+
+import argparse
+import asyncio
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from PIL import Image, ImageFilter
+from .card_generator import CardGenerator
+from .ggac_scraper import WorkItem, Category
+
+COVER_SIZES = {
+    "small": (600, 400),
+    "medium": (1200, 800),
+    "fhd": (1920, 1080),
+    "4k": (3840, 2160),
+    "tall": (1000, 4000),
+    "wide": (4000, 600),
+}
+
+
+def make_cover(width: int, height: int) -> Image.Image:
+    """生成带纹理的合成封面"""
+    noise = Image.effect_noise((width, height), 48).filter(ImageFilter.BoxBlur(2))
+    gradient = Image.linear_gradient("L").resize((width, height))
+    return Image.merge("RGB", (noise, gradient, gradient.transpose(Image.ROTATE_180)))
+
+
+def make_work(work_id: int, cover_url: str) -> WorkItem:
+    """生成测试用作品"""
+    return WorkItem(
+        id=work_id,
+        title="基准测试作品 Benchmark Work",
+        cover_url=cover_url,
+        media_category="2D原画",
+        username="bench_user",
+        user_avatar="bench://avatar",
+        categories=(Category(id=1, level=1, name="游戏", code="game"),),
+        view_count=12345,
+        hot=678,
+        create_time=datetime(2024, 11, 16, 14, 3, 18),
+    )
+
+
+def current_rss_kb() -> int:
+    """当前常驻内存(KB)"""
+    with open("/proc/self/status") as f:
+        return int(re.search(r"VmRSS:\s+(\d+)", f.read()).group(1))
+
+
+def reset_peak_rss() -> bool:
+    """重置峰值内存统计, 仅Linux支持"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_kb() -> int:
+    """峰值常驻内存(KB)"""
+    try:
+        with open("/proc/self/status") as f:
+            return int(re.search(r"VmHWM:\s+(\d+)", f.read()).group(1))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def prepare_generator(font_path: str, output_dir: str, names: list) -> CardGenerator:
+    """创建生成器并把合成图片放进内存缓存, 使测量只包含绘制流程"""
+    generator = CardGenerator(
+        output_dir=output_dir,
+        font_path=font_path,
+        card_cache=False,
+        image_cache_pixels=10**9,
+    )
+    max_width = generator.max_card_width
+    for name in names:
+        width, height = COVER_SIZES[name]
+        cover = make_cover(width, height)
+        if cover.width > max_width:
+            cover = cover.resize(
+                (max_width, max(1, int(height * max_width / width))), Image.LANCZOS
+            )
+        generator.image_cache.put_image(f"bench://{name}", max_width, cover)
+    generator.image_cache.put_image(
+        "bench://avatar",
+        generator.avatar_max_width,
+        make_cover(256, 256),
+    )
+    return generator
+
+
+async def bench_cover(font_path: str, name: str, rounds: int):
+    """在当前进程中测量一种封面, 输出一行结果"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        generator = prepare_generator(font_path, output_dir, [name])
+        work = make_work(0, f"bench://{name}")
+
+        # 首次渲染测量峰值内存增量
+        baseline = current_rss_kb()
+        reset_peak_rss()
+        card = await generator._compose_card(work)
+        peak = (peak_rss_kb() - baseline) / 1024
+        del card
+
+        # 分别测量开启和关闭主题底纹的耗时
+        elapsed = {}
+        for patterns in (False, True):
+            generator.theme_patterns = patterns
+            start = time.perf_counter()
+            for _ in range(rounds):
+                card = await generator._compose_card(work)
+                del card
+            elapsed[patterns] = (time.perf_counter() - start) / rounds * 1000
+
+    width, height = COVER_SIZES[name]
+    print(
+        f"{name:<8}{f'{width}x{height}':<12}{elapsed[False]:>10.1f}"
+        f"{elapsed[True]:>12.1f}{peak:>14.1f}"
+    )
+
+
+def bench(font_path: str, rounds: int):
+    """每种封面在独立的子进程中测量, 避免互相影响峰值内存"""
+    if not reset_peak_rss():
+        print("无法重置峰值内存统计, 内存增量仅供参考")
+    print(
+        f"{'封面':<8}{'尺寸':<12}{'耗时(ms)':>10}{'含底纹(ms)':>12}{'峰值增量(MB)':>14}",
+        flush=True,
+    )
+    for name in COVER_SIZES:
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                __spec__.name,
+                "--font",
+                font_path,
+                "--rounds",
+                str(rounds),
+                "--cover",
+                name,
+            ],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="卡片渲染基准测试")
+    parser.add_argument("--font", required=True, help="字体文件路径")
+    parser.add_argument("--rounds", type=int, default=5, help="每种封面的渲染次数")
+    parser.add_argument("--cover", choices=COVER_SIZES, help="只测量一种封面")
+    args = parser.parse_args()
+    if args.cover:
+        asyncio.run(bench_cover(args.font, args.cover, args.rounds))
+    else:
+        bench(args.font, args.rounds)
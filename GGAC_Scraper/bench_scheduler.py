@@ -0,0 +1,103 @@
+"""优先级调度基准测试
+
+模拟推送高峰: 监控任务不断获取整页作品详情并批量绘制卡片, 卡片池在后台补充,
+同时用户每隔一段时间发送一次 /ggac 命令。HTTP请求经过限流器, 绘制经过绘制槽位,
+请求和绘制都用sleep模拟。分别在开启优先级和所有任务同一优先级(先到先得)时
+统计 /ggac 命令的耗时分位数, 以及后台任务的最长排队时间。
+需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.bench_scheduler
+"""
+
+import argparse
+import asyncio
+import time
+from .rate_limiter import RateLimiter
+from .scheduler import (
+    LatencyStats,
+    Priority,
+    PriorityScheduler,
+    scheduling_priority,
+)
+
+HTTP_TIME = 0.02  # 单个请求耗时
+RENDER_TIME = 0.05  # 单张卡片绘制耗时
+
+
+class Simulation:
+    def __init__(self, prioritized: bool):
+        self.prioritized = prioritized
+        self.limiter = RateLimiter(rate=40, burst=10)
+        self.render = PriorityScheduler(concurrency=2)
+        self.command_latency = LatencyStats()
+
+    def priority(self, priority: Priority) -> Priority:
+        return priority if self.prioritized else Priority.POLLING
+
+    async def request(self):
+        await self.limiter.acquire()
+        await asyncio.sleep(HTTP_TIME)
+
+    async def render_card(self):
+        async with self.render.slot():
+            await asyncio.sleep(RENDER_TIME)
+
+    async def poll(self, stop: float):
+        """每2秒获取一页48个作品的详情, 并绘制其中24张卡片"""
+        with scheduling_priority(self.priority(Priority.POLLING)):
+            while time.monotonic() < stop:
+                await asyncio.gather(*(self.request() for _ in range(49)))
+                await asyncio.gather(*(self.render_card() for _ in range(24)))
+                await asyncio.sleep(2)
+
+    async def backfill(self, stop: float):
+        """卡片池补充: 持续获取随机作品并绘制"""
+        with scheduling_priority(self.priority(Priority.BACKGROUND)):
+            while time.monotonic() < stop:
+                await self.request()
+                await self.request()
+                await self.render_card()
+
+    async def commands(self, stop: float, interval: float):
+        """用户命令: 两次请求加一次绘制"""
+        with scheduling_priority(self.priority(Priority.INTERACTIVE)):
+            while time.monotonic() < stop:
+                start = time.monotonic()
+                await self.request()
+                await self.request()
+                await self.render_card()
+                self.command_latency.record(time.monotonic() - start)
+                await asyncio.sleep(interval)
+
+    async def run(self, duration: float, interval: float):
+        stop = time.monotonic() + duration
+        await asyncio.gather(
+            self.poll(stop),
+            *(self.backfill(stop) for _ in range(4)),
+            self.commands(stop, interval),
+        )
+
+
+async def bench(duration: float, interval: float):
+    for prioritized in (False, True):
+        simulation = Simulation(prioritized)
+        await simulation.run(duration, interval)
+        command = simulation.command_latency.stats()
+        background_wait = max(
+            simulation.limiter.queue.wait_latency[Priority.BACKGROUND].stats()["max_ms"],
+            simulation.render.wait_latency[Priority.BACKGROUND].stats()["max_ms"],
+        )
+        name = "优先级调度" if prioritized else "先到先得  "
+        print(
+            f"{name}: /ggac {command['count']}次, "
+            f"p50 {command['p50_ms']:.0f}ms, p95 {command['p95_ms']:.0f}ms"
+            + (f", 后台最长排队 {background_wait:.0f}ms" if prioritized else "")
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="优先级调度基准测试")
+    parser.add_argument("--duration", type=float, default=10, help="模拟时长(秒)")
+    parser.add_argument("--interval", type=float, default=0.5, help="命令间隔(秒)")
+    args = parser.parse_args()
+    asyncio.run(bench(args.duration, args.interval))
@@ -0,0 +1,100 @@
+from io import BytesIO
+from typing import Optional
+from PIL import Image
+from .log import logger
+
+
+class CardEncoder:
+    """卡片编码器
+
+    支持的格式:
+    - png: 无损PNG, 保留圆角透明度
+    - png_optimized: 开启optimize的PNG, 更小但编码更慢
+    - webp: 有损WebP, 保留透明度
+    - jpeg: JPEG, 透明部分铺到纯色背景上
+
+    设置target_bytes后, 对有损格式二分搜索满足大小的最高质量
+    """
+
+    FORMATS = {
+        "png": ("PNG", "png"),
+        "png_optimized": ("PNG", "png"),
+        "webp": ("WEBP", "webp"),
+        "jpeg": ("JPEG", "jpg"),
+    }
+
+    def __init__(
+        self,
+        format: str = "png",
+        quality: int = 85,
+        target_bytes: Optional[int] = None,
+        min_quality: int = 40,
+        background: str = "#ffffff",
+    ):
+        format = (format or "png").lower()
+        if format not in self.FORMATS:
+            logger.warning("不支持的卡片格式: %s, 使用png", format)
+            format = "png"
+        self.format = format
+        self.quality = max(1, min(100, quality))
+        self.target_bytes = target_bytes or None
+        self.min_quality = max(1, min(self.quality, min_quality))
+        self.background = background
+
+    @property
+    def extension(self) -> str:
+        """文件扩展名"""
+        return self.FORMATS[self.format][1]
+
+    @property
+    def lossy(self) -> bool:
+        """是否为有损格式"""
+        return self.format in ("webp", "jpeg")
+
+    def _prepare(self, image: Image.Image) -> Image.Image:
+        """转换为目标格式需要的模式"""
+        if self.format == "jpeg" and image.mode != "RGB":
+            flat = Image.new("RGB", image.size, self.background)
+            if image.mode == "RGBA":
+                flat.paste(image, mask=image.getchannel("A"))
+            else:
+                flat.paste(image.convert("RGB"))
+            return flat
+        return image
+
+    def _encode(self, image: Image.Image, quality: int) -> bytes:
+        """以指定质量编码一次"""
+        buffer = BytesIO()
+        if self.format == "png":
+            image.save(buffer, "PNG")
+        elif self.format == "png_optimized":
+            image.save(buffer, "PNG", optimize=True)
+        elif self.format == "webp":
+            image.save(buffer, "WEBP", quality=quality, method=4)
+        else:
+            image.save(buffer, "JPEG", quality=quality, optimize=True)
+        return buffer.getvalue()
+
+    def encode(self, image: Image.Image) -> bytes:
+        """编码卡片, 返回文件字节"""
+        image = self._prepare(image)
+        data = self._encode(image, self.quality)
+        if not self.lossy or not self.target_bytes or len(data) <= self.target_bytes:
+            return data
+
+        # 二分搜索满足大小上限的最高质量
+        best = smallest = None
+        low, high = self.min_quality, self.quality - 1
+        while low <= high:
+            quality = (low + high) // 2
+            candidate = self._encode(image, quality)
+            if quality == self.min_quality:
+                smallest = candidate
+            if len(candidate) <= self.target_bytes:
+                best = candidate
+                low = quality + 1
+            else:
+                high = quality - 1
+
+        # 最低质量也超出上限时, 使用最低质量的结果
+        return best or smallest or self._encode(image, self.min_quality)
@@ -1,20 +1,47 @@
 import os
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 import asyncio
-from io import BytesIO
 from datetime import datetime
 import aiohttp
+import hashlib
 import math
 import random
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance, ImageOps
+import time
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
 from .ggac_scraper import WorkItem
+from .image_cache import ImageCache
+from .card_store import CardStore
+from .card_encoder import CardEncoder
+from .pixel_budget import PixelBudget, PixelLease, ImageTooLargeError
+from .theme_patterns import PatternTiles
+from .palette import PaletteExtractor
+from .text_layout import TextLayout
+from .scheduler import PriorityScheduler
+from .metrics import registry
+from .log import logger, SAMPLED
+from .tracing import span, record_span
 from ..config import FONTS_DIR
 
+IMAGE_LOADS = registry.counter(
+    "ggac_image_loads_total", "图片读取次数, 按来源(memory/disk/network/error)"
+)
+IMAGE_DOWNLOAD_SECONDS = registry.histogram(
+    "ggac_image_download_seconds", "图片网络下载耗时(秒)"
+)
+CARD_DRAW_SECONDS = registry.histogram(
+    "ggac_card_draw_seconds", "卡片绘制耗时(秒), 不含图片下载"
+)
+CARD_ENCODE_SECONDS = registry.histogram("ggac_card_encode_seconds", "卡片编码耗时(秒)")
+CARD_CACHE = registry.counter("ggac_card_cache_total", "已渲染卡片的复用情况(hit/miss)")
+
 
 class CardGenerator:
     """作品卡片生成器"""
 
+    # 卡片模板版本, 修改卡片外观时需要递增, 使旧的缓存卡片失效
+    TEMPLATE_VERSION = 6
+
     def __init__(
         self,
         output_dir: str = "cards",
@@ -22,9 +49,78 @@ class CardGenerator:
         min_card_width: int = 600,  # 最小卡片宽度
         max_card_width: int = 1500,  # 最大卡片宽度
         card_padding_ratio: float = 0.033,  # 边距与卡片宽度的比例
+        image_cache_dir: Optional[str] = None,  # 图片磁盘缓存目录, 为空则只用内存缓存
+        image_cache_pixels: int = 20_000_000,  # 内存缓存的总像素上限
+        image_cache_bytes: int = 200 * 1024 * 1024,  # 磁盘缓存的总字节上限
+        card_cache: bool = True,  # 是否复用内容相同的已渲染卡片
+        stat_granularity: int = 100,  # 浏览量/热度变化超过该粒度才重新渲染
+        card_store_bytes: int = 500 * 1024 * 1024,  # 卡片目录的总字节上限
+        card_max_age: float = 3 * 24 * 3600,  # 卡片最长闲置时间(秒)
+        card_format: str = "png",  # 卡片格式: png/png_optimized/webp/jpeg
+        card_quality: int = 85,  # 有损格式的编码质量
+        card_target_bytes: Optional[int] = None,  # 有损格式的目标文件大小
+        render_budget_pixels: int = 64_000_000,  # 解码和绘制中的图片总像素上限
+        max_image_pixels: int = 40_000_000,  # 单张图片解码的像素上限
+        theme_patterns: bool = True,  # 是否在作者栏和信息区域绘制主题底纹
+        theme_mode: str = "category",  # 主题: category(按创作类型)/dynamic(取封面配色)
+        title_max_lines: int = 2,  # 标题最多行数, 超出部分以省略号结尾
+        tag_max_lines: int = 1,  # 分类标签最多行数
+        collage_max_images: int = 9,  # 拼图封面最多使用的图片数
+        collage_concurrency: int = 4,  # 拼图封面同时下载解码的图片数
+        preview_width: int = 400,  # 预览图宽度
+        thumb_size: int = 256,  # 正方形缩略图边长
+        render_concurrency: int = 2,  # 同时绘制的卡片数
+        image_hosts: Optional[Dict[str, str]] = None,  # 图片地址前缀替换, 例如指向本地测试服务器
     ):
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
+        self.card_store = CardStore(
+            output_dir, max_bytes=card_store_bytes, max_age=card_max_age
+        )
+
+        # 封面和头像的两级缓存
+        self.image_cache = ImageCache(
+            cache_dir=image_cache_dir,
+            max_memory_pixels=image_cache_pixels,
+            max_disk_bytes=image_cache_bytes,
+        )
+        self.avatar_max_width = 256
+        self.image_hosts = image_hosts or {}
+
+        # 限制同时在内存中解码和绘制的像素总量
+        self.pixel_budget = PixelBudget(render_budget_pixels)
+
+        # 绘制槽位按优先级分配, 用户命令的卡片先于推送和预热的卡片绘制
+        self.render_scheduler = PriorityScheduler(concurrency=render_concurrency)
+        self.max_image_pixels = max_image_pixels
+
+        self.theme_patterns = theme_patterns
+        self.pattern_tiles = PatternTiles()
+
+        self.theme_mode = theme_mode
+        self.palette = PaletteExtractor()
+
+        self.text_layout = TextLayout()
+        self.title_max_lines = max(1, title_max_lines)
+        self.tag_max_lines = max(1, tag_max_lines)
+
+        self.collage_max_images = max(1, collage_max_images)
+        self.collage_concurrency = max(1, collage_concurrency)
+        self.collage_width = 1200
+        self.collage_gap = 4
+
+        # 同一次渲染可以输出的尺寸: 完整卡片、预览图和封面的正方形缩略图
+        self.variant_sizes = {
+            "card": None,
+            "preview": max(1, preview_width),
+            "thumb": max(1, thumb_size),
+        }
+
+        self.encoder = CardEncoder(
+            format=card_format, quality=card_quality, target_bytes=card_target_bytes
+        )
+
+        self.card_cache = card_cache
+        self.stat_granularity = max(1, stat_granularity)
 
         if not os.path.exists(font_path):
             raise FileNotFoundError(f"找不到字体文件: {font_path}")
@@ -170,20 +266,34 @@ class CardGenerator:
         return mask
 
     def _apply_design_effect_to_cover(
-        self, cover_image: Image.Image, theme: dict
+        self, cover_image: Image.Image, theme: dict, fill_pixels: int = 0
     ) -> Image.Image:
-        """对封面图应用设计效果"""
-        # 根据图片样式，简化效果处理
-        result = cover_image.copy().convert("RGBA")
-
-        # 轻微增强亮度和对比度
-        enhancer = ImageEnhance.Brightness(result)
-        result = enhancer.enhance(1.05)
-
-        enhancer = ImageEnhance.Contrast(result)
-        result = enhancer.enhance(1.05)
+        """对封面图应用设计效果
+
+        轻微增强亮度和对比度, 两步合成一张查找表, 一次point完成。
+        fill_pixels为封面区域中留白(白色)部分的像素数, 参与对比度均值计算
+        """
+        brightness, contrast = 1.05, 1.05
+        cover_image = cover_image.convert("RGB")
+
+        # 由直方图计算增亮后的灰度均值, 不需要额外的灰度图
+        histogram = cover_image.histogram()
+        total = cover_image.width * cover_image.height + fill_pixels
+        bright = [min(255, int(v * brightness)) for v in range(256)]
+        band_means = []
+        for band in range(3):
+            counts = histogram[band * 256 : (band + 1) * 256]
+            band_sum = sum(count * bright[v] for v, count in enumerate(counts))
+            band_means.append((band_sum + 255 * fill_pixels) / max(total, 1))
+        mean = int(
+            band_means[0] * 0.299 + band_means[1] * 0.587 + band_means[2] * 0.114 + 0.5
+        )
 
-        return result
+        lut = [
+            max(0, min(255, int(mean + contrast * (bright[v] - mean))))
+            for v in range(256)
+        ]
+        return cover_image.point(lut * 3)
 
     def _create_circular_avatar(
         self, avatar_image: Image.Image, size: int
@@ -201,69 +311,445 @@ class CardGenerator:
 
         return avatar
 
-    async def _download_image(self, url: str) -> Optional[Image.Image]:
-        """下载图片"""
+    def _render_pixels(self, cover_width: int) -> int:
+        """估算以该宽度的封面绘制一张卡片需要的像素额度
+
+        包括卡片画布以及缩放、调色过程中的封面副本
+        """
+        card_width = min(max(cover_width, self.min_card_width), self.max_card_width)
+        return 3 * card_width * card_width
+
+    def _placeholder_image(self, message: str) -> Image.Image:
+        """图片无法使用时的占位图"""
+        default_img = Image.new("RGBA", (800, 600), (200, 200, 200, 255))
+        draw = ImageDraw.Draw(default_img)
+        draw.text(
+            (400, 300),
+            message,
+            fill=(100, 100, 100, 255),
+            font=ImageFont.truetype(str(self.font_path), 24),
+            anchor="mm",
+        )
+        # 标记为占位图, 拼图时跳过
+        default_img.info["placeholder"] = message
+        return default_img
+
+    def _fetch_url(self, url: str) -> str:
+        """实际下载使用的地址, 按image_hosts替换前缀, 缓存仍以原地址为键"""
+        for prefix, replacement in self.image_hosts.items():
+            if url.startswith(prefix):
+                return replacement + url[len(prefix) :]
+        return url
+
+    async def _download_image(
+        self,
+        url: str,
+        max_width: Optional[int] = None,
+        lease: Optional[PixelLease] = None,
+    ) -> Optional[Image.Image]:
+        """下载图片, 依次查询内存缓存、磁盘缓存, 最后才走网络
+
+        传入lease时, 解码前按解码尺寸和后续绘制所需申请像素额度,
+        额度不足时等待。返回的图片可能来自缓存, 调用方不应原地修改
+        """
+        if max_width is None:
+            max_width = self.max_card_width
+        with span("image") as span_attrs:
+            return await self._load_image(url, max_width, lease, span_attrs)
+
+    async def _load_image(
+        self, url: str, max_width: int, lease: Optional[PixelLease], span_attrs: dict
+    ) -> Optional[Image.Image]:
+        """_download_image的实现, 图片来源和错误记录在span_attrs中"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.read()
-                        return Image.open(BytesIO(data)).convert("RGBA")
-                    raise Exception(f"下载图片失败: HTTP {response.status}")
+            image = self.image_cache.get_image(url, max_width)
+            if image is not None:
+                IMAGE_LOADS.inc(source="memory")
+                span_attrs["source"] = "memory"
+                if lease is not None:
+                    await lease.acquire(self._render_pixels(image.width))
+                return image
+
+            data = self.image_cache.get_bytes(url)
+            if data is None:
+                with IMAGE_DOWNLOAD_SECONDS.time():
+                    async with aiohttp.ClientSession() as session:
+                        async with session.get(self._fetch_url(url)) as response:
+                            if response.status != 200:
+                                raise Exception(f"下载图片失败: HTTP {response.status}")
+                            data = await response.read()
+                IMAGE_LOADS.inc(source="network")
+                span_attrs["source"] = "network"
+                self.image_cache.put_bytes(url, data)
+            else:
+                IMAGE_LOADS.inc(source="disk")
+                span_attrs["source"] = "disk"
+
+            image = self.image_cache.open(data, max_width)
+            decode_pixels = image.width * image.height
+            if decode_pixels > self.max_image_pixels:
+                raise ImageTooLargeError(
+                    f"图片过大: {image.width}x{image.height} ({url})"
+                )
+            if lease is not None:
+                await lease.acquire(
+                    decode_pixels + self._render_pixels(min(image.width, max_width))
+                )
+
+            image = self.image_cache.finish(image, max_width)
+            self.image_cache.put_image(url, max_width, image)
+            return image
+        except ImageTooLargeError as e:
+            IMAGE_LOADS.inc(source="error")
+            span_attrs["error"] = "too_large"
+            logger.warning("下载图片出错: %s", e, extra=SAMPLED)
+            return self._placeholder_image("图片过大")
         except Exception as e:
-            print(f"下载图片出错: {e}")
+            IMAGE_LOADS.inc(source="error")
+            span_attrs["error"] = type(e).__name__
+            logger.warning("下载图片出错: %s", e, extra=SAMPLED)
             # 创建一个默认图片
-            default_img = Image.new("RGBA", (800, 600), (200, 200, 200, 255))
-            draw = ImageDraw.Draw(default_img)
-            draw.text(
-                (400, 300),
-                "图片加载失败",
-                fill=(100, 100, 100, 255),
-                font=ImageFont.truetype(str(self.font_path), 24),
-                anchor="mm",
-            )
-            return default_img
+            return self._placeholder_image("图片加载失败")
+
+    @staticmethod
+    def _cover_url(work: WorkItem, type: str = None) -> str:
+        """封面图片地址, 详情类型取详情中的第一张图片, 视频取其封面"""
+        if type == "detail" and work.media_urls:
+            return work.media_urls[0]
+        return work.cover_url
+
+    def _media_urls(self, work: WorkItem, limit: int) -> List[str]:
+        """作品详情mediaList中前limit张图片的地址, 视频取其封面"""
+        return list(work.media_urls[:limit])
+
+    async def _download_collage_tile(
+        self, url: str, semaphore: asyncio.Semaphore, max_height: int
+    ) -> Optional[Image.Image]:
+        """下载一张拼图图片并立即缩小, 原图在返回后即可释放
+
+        每张图片单独申请像素额度, 缩小后归还, 不与卡片的额度互相等待
+        """
+        async with semaphore:
+            async with self.pixel_budget.lease() as lease:
+                image = await self._download_image(url, self.collage_width, lease)
+                if image is None or "placeholder" in image.info:
+                    return None
+                if image.height > max_height:
+                    width = max(1, round(image.width * max_height / image.height))
+                    image = image.resize(
+                        (width, max_height), Image.LANCZOS, reducing_gap=3.0
+                    )
+                return image
+
+    def _mosaic_rows(
+        self, aspects: List[float], width: int, max_height: int
+    ) -> List[Tuple[List[int], float]]:
+        """把图片按顺序分成若干行, 每行等高且铺满宽度
+
+        行数按图片数量和平均宽高比估计, 再用动态规划选择使各行高度
+        最接近目标高度的分行方式。返回 [(行内图片下标, 行高), ...]
+        """
+        count = len(aspects)
+        gap = self.collage_gap
+        mean_aspect = sum(aspects) / count
+        rows = round(math.sqrt(count * mean_aspect * max_height / width))
+        rows = max(1, min(count, rows))
+        target = max_height / rows
+
+        def row_height(start: int, end: int) -> float:
+            return (width - gap * (end - start - 1)) / sum(aspects[start:end])
+
+        # best[i]: 前i张图片分行的最小代价
+        best = [0.0] + [math.inf] * count
+        split = [0] * (count + 1)
+        for end in range(1, count + 1):
+            for start in range(end):
+                cost = best[start] + (row_height(start, end) - target) ** 2
+                if cost < best[end]:
+                    best[end], split[end] = cost, start
+
+        layout = []
+        end = count
+        while end > 0:
+            start = split[end]
+            layout.append((list(range(start, end)), row_height(start, end)))
+            end = start
+        layout.reverse()
+        return layout
+
+    async def _download_collage(
+        self, urls: List[str], fallback_url: str, lease: PixelLease
+    ) -> Optional[Image.Image]:
+        """并发下载多张图片并拼成一张封面
+
+        同时解码的原图数量受collage_concurrency限制, 每张图片到达后立即缩小,
+        不会同时持有全部原图。没有可用图片时退回作品封面
+        """
+        width = min(max(self.collage_width, self.min_card_width), self.max_card_width)
+        max_height = int(width * 0.8)
+        semaphore = asyncio.Semaphore(self.collage_concurrency)
+        tiles = await asyncio.gather(
+            *(self._download_collage_tile(url, semaphore, max_height) for url in urls)
+        )
+        tiles = [tile for tile in tiles if tile is not None]
+        if not tiles:
+            return await self._download_image(fallback_url, lease=lease)
+
+        layout = self._mosaic_rows(
+            [tile.width / tile.height for tile in tiles], width, max_height
+        )
+        # 总高度超出上限时各行等比压低, 图片居中裁剪
+        gaps = self.collage_gap * (len(layout) - 1)
+        natural_height = sum(height for _, height in layout)
+        scale = min(1.0, (max_height - gaps) / natural_height)
+        heights = [max(1, round(height * scale)) for _, height in layout]
+
+        await lease.acquire(self._render_pixels(width))
+        collage = Image.new("RGB", (width, sum(heights) + gaps), self.colors["card_bg"])
+        y = 0
+        for (indices, _), height in zip(layout, heights):
+            # 按累计宽度取整, 保证每行恰好铺满
+            row_width = width - self.collage_gap * (len(indices) - 1)
+            row_aspect = sum(tiles[i].width / tiles[i].height for i in indices)
+            left, covered = 0, 0.0
+            for column, i in enumerate(indices):
+                covered += tiles[i].width / tiles[i].height
+                right = round(row_width * covered / row_aspect)
+                tile = ImageOps.fit(
+                    tiles[i], (max(1, right - left), height), Image.LANCZOS
+                )
+                tiles[i] = None
+                x = left + column * self.collage_gap
+                collage.paste(tile, (x, y), tile if tile.mode == "RGBA" else None)
+                left = right
+            y += height + self.collage_gap
+        return collage
+
+    def _card_cache_key(self, work: WorkItem, type: str = None) -> str:
+        """根据作品ID、封面类型、卡片上渲染的字段和模板版本计算缓存键"""
+        fields = [
+            self.TEMPLATE_VERSION,
+            self.theme_patterns,
+            self.theme_mode,
+            self.title_max_lines,
+            self.tag_max_lines,
+            self.encoder.format,
+            self.encoder.quality,
+            self.encoder.target_bytes,
+            work.id,
+            type or "default",
+            work.title,
+            self._cover_url(work, type),
+            self._media_urls(work, self.collage_max_images)
+            if type == "collage"
+            else None,
+            getattr(work, "user_avatar", ""),
+            work.username,
+            work.media_category,
+            [getattr(category, "name", "") for category in work.categories],
+            work.create_time.strftime("%Y-%m-%d %H:%M:%S"),
+            work.view_count // self.stat_granularity,
+            work.hot // self.stat_granularity,
+        ]
+        return hashlib.sha1(repr(fields).encode("utf-8")).hexdigest()[:16]
+
+    def _card_path(
+        self, work: WorkItem, type: str = None, variant: str = "card"
+    ) -> Path:
+        """卡片的保存路径, 开启卡片缓存时以内容哈希命名
+
+        预览图和缩略图在文件名中附加尺寸名和边长, 与完整卡片分别缓存
+        """
+        if self.card_cache:
+            card_key = self._card_cache_key(work, type)
+        else:
+            card_key = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if variant != "card":
+            card_key = f"{card_key}_{variant}{self.variant_sizes[variant]}"
+        card_filename = f"{work.id}_{card_key}.{self.encoder.extension}"
+        return self.card_store.path_for(card_filename)
+
+    def lookup_card(
+        self, work: WorkItem, type: str = None, variant: str = "card"
+    ) -> Optional[str]:
+        """查找内容相同的已渲染卡片, 不经过PIL"""
+        if not self.card_cache:
+            return None
+        path = self.card_store.lookup(self._card_path(work, type, variant).name)
+        CARD_CACHE.inc(result="hit" if path else "miss")
+        return path
+
+    def _save_card(
+        self, work: WorkItem, type: str, data: bytes, variant: str = "card"
+    ) -> Path:
+        """将编码后的卡片写入卡片存储"""
+        card_path = self._card_path(work, type, variant)
+        card_path.parent.mkdir(exist_ok=True)
+        with open(card_path, "wb") as f:
+            f.write(data)
+        self.card_store.add(card_path)
+        return card_path
 
     async def generate_card(self, work: WorkItem, type: str = None) -> Tuple[str, str]:
-        """生成单个作品卡片，具有现代设计感"""
+        """生成单个作品卡片并保存到磁盘，返回卡片路径和作品链接"""
+        paths, work_url = await self.generate_card_set(work, type, ("card",))
+        return paths.get("card"), work_url
+
+    async def generate_card_set(
+        self,
+        work: WorkItem,
+        type: str = None,
+        variants: Tuple[str, ...] = ("card", "preview", "thumb"),
+    ) -> Tuple[Dict[str, str], Optional[str]]:
+        """一次渲染输出多种尺寸, 返回 {尺寸名: 卡片路径} 和作品链接
+
+        可选尺寸: card(完整卡片), preview(按preview_width等比缩小的卡片),
+        thumb(封面居中裁剪的正方形缩略图)。各尺寸分别缓存,
+        只有缺失的尺寸需要生成, 它们共用一次下载、解码和绘制
+        """
+        # 生成作品链接
+        work_url = f"https://www.ggac.com/work/detail/{work.id}"
+
+        paths = {}
+        missing = []
+        for variant in variants:
+            if variant not in self.variant_sizes:
+                raise ValueError(f"未知的卡片尺寸: {variant}")
+            # 已有内容相同的卡片时直接复用
+            cached_path = self.lookup_card(work, type, variant)
+            if cached_path:
+                paths[variant] = cached_path
+            else:
+                missing.append(variant)
+        if not missing:
+            return paths, work_url
+
+        card = await self._compose_card(work, type)
+        if card is None:
+            return {}, None
+
+        # 按配置的格式编码, PNG和WebP保留圆角透明度
+        for variant, image in self._derive_variants(card, missing):
+            with CARD_ENCODE_SECONDS.time(), span("encode", variant=variant):
+                data = self.encoder.encode(image)
+            card_path = self._save_card(work, type, data, variant)
+            paths[variant] = str(card_path)
+
+        return paths, work_url
+
+    def _derive_variants(self, card: Image.Image, variants: List[str]):
+        """由完整卡片逐级缩小得到各尺寸, 每次都从已有的最小可用图像开始
+
+        缩略图取卡片中的封面区域, 封面位置由_draw_card记录在card.info中
+        """
+        cover_box = card.info.get("cover_box", (0, 0, card.width, card.width))
+        # 逐级缩小的来源: (图像, 图像相对完整卡片的比例)
+        sources = [(card, 1.0)]
+        for variant in ("card", "preview", "thumb"):
+            if variant not in variants:
+                continue
+            if variant == "card":
+                yield variant, card
+            elif variant == "preview":
+                width = min(self.variant_sizes["preview"], card.width)
+                scale = width / card.width
+                preview = card.resize(
+                    (width, max(1, round(card.height * scale))),
+                    Image.LANCZOS,
+                    reducing_gap=3.0,
+                )
+                sources.append((preview, scale))
+                yield variant, preview
+            else:
+                size = self.variant_sizes["thumb"]
+                left, top, right, bottom = cover_box
+                # 选择封面区域仍不小于缩略图的最小来源
+                image, scale = min(
+                    (
+                        (image, scale)
+                        for image, scale in sources
+                        if min(right - left, bottom - top) * scale >= size
+                    ),
+                    key=lambda source: source[1],
+                    default=(card, 1.0),
+                )
+                box = tuple(round(v * scale) for v in cover_box)
+                yield variant, ImageOps.fit(
+                    image.crop(box), (size, size), Image.LANCZOS
+                )
+
+    async def generate_card_data(
+        self, work: WorkItem, type: str = None
+    ) -> Tuple[Optional[bytes], Optional[str]]:
+        """在内存中生成卡片，返回编码后的字节和作品链接
+
+        只有开启卡片缓存时才会读写磁盘
+        """
+        work_url = f"https://www.ggac.com/work/detail/{work.id}"
+
+        cached_path = self.lookup_card(work, type)
+        if cached_path:
+            with open(cached_path, "rb") as f:
+                return f.read(), work_url
+
+        card = await self._compose_card(work, type)
+        if card is None:
+            return None, None
+
+        with CARD_ENCODE_SECONDS.time(), span("encode", variant="card"):
+            data = self.encoder.encode(card)
+        if self.card_cache:
+            self._save_card(work, type, data)
+
+        return data, work_url
+
+    async def _compose_card(
+        self, work: WorkItem, type: str = None
+    ) -> Optional[Image.Image]:
+        """按优先级取得绘制槽位, 在像素额度内绘制作品卡片"""
+        queued = time.perf_counter()
+        async with self.render_scheduler.slot():
+            record_span("render_queue", queued)
+            async with self.pixel_budget.lease() as lease:
+                return await self._draw_card(work, type, lease)
+
+    async def _draw_card(
+        self, work: WorkItem, type: str, lease: PixelLease
+    ) -> Optional[Image.Image]:
+        """绘制作品卡片，具有现代设计感"""
         # 获取作品适合的主题色
         theme = self.themes.get(work.media_category, self.themes["default"])
 
-        # 下载并处理封面图片
-        # 下载详情图片
-        if type == "detail" and work.detail is not None:
-            mediaList = work.detail.get("mediaList")
-
-            # 添加空值检查
-            if mediaList and len(mediaList) > 0:
-                if mediaList[0].get("type") == 2:
-                    url = mediaList[0].get("coverUrl")
-                    original_cover = await self._download_image(url)
-                elif mediaList[0].get("type") == 1:
-                    url = mediaList[0].get("url")
-                    original_cover = await self._download_image(url)
-                else:
-                    # 获得mediaList中第一个满足type为1或2的url
-                    for media in mediaList:
-                        if media.get("type") in [1, 2]:
-                            url = media.get("url") or media.get("coverUrl")
-                            if url:
-                                original_cover = await self._download_image(url)
-                                break
-                    else:  # 如果没有找到合适的媒体项
-                        original_cover = await self._download_image(work.cover_url)
-            else:  # 如果mediaList为空或不存在
-                original_cover = await self._download_image(work.cover_url)
+        # 确定封面图片地址
+        cover_url = self._cover_url(work, type)
+
+        # 拼图封面使用详情中的多张图片
+        collage_urls = []
+        if type == "collage":
+            collage_urls = self._media_urls(work, self.collage_max_images)
+        if collage_urls:
+            cover_task = self._download_collage(collage_urls, cover_url, lease)
+        else:
+            cover_task = self._download_image(cover_url, lease=lease)
+
+        # 并发下载封面和用户头像, 头像尺寸很小, 不占用像素额度
+        avatar_url = getattr(work, "user_avatar", None)
+        if avatar_url:
+            original_cover, avatar_image = await asyncio.gather(
+                cover_task,
+                self._download_image(avatar_url, self.avatar_max_width),
+            )
         else:
-            original_cover = await self._download_image(work.cover_url)
+            original_cover = await cover_task
+            avatar_image = None
 
         if not original_cover:
-            return None, None
+            return None
 
-        # 下载用户头像
-        avatar_image = None
-        if hasattr(work, "user_avatar") and work.user_avatar:
-            avatar_image = await self._download_image(work.user_avatar)
+        # 占位图没有经过额度申请, 在绘制前补上
+        if not lease.held:
+            await lease.acquire(self._render_pixels(original_cover.width))
+        draw_start = time.perf_counter()
 
         # 根据原始图片大小自适应卡片宽度
         original_width, original_height = original_cover.size
@@ -290,12 +776,7 @@ class CardGenerator:
         else:
             cover_height = int(self.card_width * 0.6)  # 默认比例
 
-        # 调整封面图尺寸
-        cover_image = Image.new(
-            "RGBA", (self.card_width, cover_height), (255, 255, 255, 0)
-        )
         # 按比例调整图像大小，保持宽高比
-        scaled_cover = original_cover.copy()
         scaled_width = self.card_width
         scaled_height = int(original_height * (scaled_width / original_width))
 
@@ -304,24 +785,63 @@ class CardGenerator:
             scaled_height = cover_height
             scaled_width = int(original_width * (scaled_height / original_height))
 
-        scaled_cover = scaled_cover.resize((scaled_width, scaled_height), Image.LANCZOS)
+        # 一次缩放到最终尺寸, 再用一张查找表完成亮度和对比度调整
+        scaled_cover = original_cover.resize(
+            (scaled_width, scaled_height), Image.LANCZOS, reducing_gap=3.0
+        )
+        enhanced_cover = self._apply_design_effect_to_cover(
+            scaled_cover,
+            theme,
+            fill_pixels=self.card_width * cover_height - scaled_width * scaled_height,
+        )
 
-        # 将缩放后的图像居中粘贴到空白背景上
+        # 动态主题: 从缩放后的封面提取配色, 按作品、封面类型和封面地址缓存,
+        # 主色绘制在封面下方的分隔条上, 强调色用于类别文字
+        dynamic_theme = None
+        if self.theme_mode == "dynamic":
+            palette_key = (work.id, type or "default", cover_url)
+            dynamic_theme = self.palette.theme(palette_key, scaled_cover)
+            if dynamic_theme is not None:
+                theme = dynamic_theme
+        del scaled_cover
+
+        # 缩放后的图像居中放置，两侧留白
         paste_x = (self.card_width - scaled_width) // 2
         paste_y = (cover_height - scaled_height) // 2
-        cover_image.paste(scaled_cover, (paste_x, paste_y))
-
-        # 对封面应用设计效果
-        enhanced_cover = self._apply_design_effect_to_cover(cover_image, theme)
+        cover_box = (paste_x, paste_y, paste_x + scaled_width, paste_y + scaled_height)
 
         # 计算作者栏高度
         author_section_height = int(self.card_width * 0.08)
         author_section_height = max(author_section_height, 60)  # 确保最小高度
 
+        # 标题和分类按卡片宽度换行, 超出行数时以省略号截断
+        text_width = self.card_width - 2 * self.padding
+        title_lines = self.text_layout.wrap(
+            work.title, self.fonts["title"], text_width, self.title_max_lines
+        )
+
+        category_texts = []
+        if hasattr(work, "media_category") and work.media_category:
+            category_texts.append(work.media_category)
+
+        # 添加额外类别
+        for category in work.categories:
+            if hasattr(category, "name"):
+                category_texts.append(category.name)
+
+        category_lines = self.text_layout.wrap(
+            " | ".join(category_texts),
+            self.fonts["info"],
+            text_width,
+            self.tag_max_lines,
+        )
+
         # 预先计算所需的信息区域大小，避免底部空白
         # 计算文本所需的垂直空间
-        text_height_title = self.font_sizes["title"] * 1.3
-        text_height_category = self.font_sizes["info"] * 1.3
+        title_line_height = self.font_sizes["title"] * 1.3
+        category_line_height = self.font_sizes["info"] * 1.3
+        text_height_title = title_line_height * len(title_lines)
+        text_height_category = category_line_height * len(category_lines)
         text_height_stats = self.font_sizes["caption"] * 1.3
 
         # 添加各元素之间的间距和边距
@@ -341,30 +861,38 @@ class CardGenerator:
         # 创建卡片基础
         card = Image.new("RGBA", (self.card_width, card_height), self.colors["card_bg"])
 
-        # 创建作者栏背景
-        author_bg = Image.new(
-            "RGBA", (self.card_width, author_section_height), self.colors["card_bg"]
-        )
-
-        # 创建底部卡片背景
-        info_bg = Image.new(
-            "RGBA", (self.card_width, info_section_height), self.colors["card_bg"]
-        )
-
-        # 组合卡片 - 现在是封面在顶部，作者栏在中间，信息区域在底部
-        card.paste(enhanced_cover, (0, 0))
-        card.paste(author_bg, (0, cover_height))
-        card.paste(info_bg, (0, cover_height + author_section_height))
+        # 组合卡片 - 封面在顶部，作者栏在中间，信息区域在底部
+        # 作者栏和信息区域与卡片同为白色背景，无需单独绘制
+        card.paste(enhanced_cover, (paste_x, paste_y))
+        del enhanced_cover
+
+        # 作者栏和信息区域相连且位于卡片底部, 一次贴上底纹
+        if self.theme_patterns:
+            self.pattern_tiles.paste(
+                card,
+                theme["pattern"],
+                theme.get("pattern_color", theme["primary"]),
+                self.colors["card_bg"],
+                cover_height,
+                author_section_height + info_section_height,
+            )
 
         # 创建绘图对象
         draw = ImageDraw.Draw(card)
 
-        # 绘制作者区域分隔线
-        draw.line(
-            [(0, cover_height), (self.card_width, cover_height)],
-            fill=self.colors["divider"],
-            width=1,
-        )
+        # 绘制作者区域分隔线, 动态主题时为主色的分隔条
+        if dynamic_theme is not None:
+            bar_height = max(4, self.card_width // 150)
+            draw.rectangle(
+                [(0, cover_height), (self.card_width, cover_height + bar_height - 1)],
+                fill=dynamic_theme["primary"],
+            )
+        else:
+            draw.line(
+                [(0, cover_height), (self.card_width, cover_height)],
+                fill=self.colors["divider"],
+                width=1,
+            )
 
         # 绘制信息区域分隔线
         draw.line(
@@ -438,39 +966,31 @@ class CardGenerator:
         title_x = self.padding  # 标题直接从左边距开始，不再有圆形图标
 
         # 绘制标题 - 左对齐，不再使用加粗效果
-        draw.text(
-            (title_x, info_y),
-            work.title,
-            font=self.fonts["title"],
-            fill=self.colors["text_primary"],
-        )
+        for i, line in enumerate(title_lines):
+            draw.text(
+                (title_x, info_y + i * title_line_height),
+                line,
+                font=self.fonts["title"],
+                fill=self.colors["text_primary"],
+            )
 
         # 在标题下方添加类别信息
-        category_spacing = int(text_height_title * 0.2)  # 减小垂直间距
+        category_spacing = int(title_line_height * 0.2)  # 减小垂直间距
         category_y = info_y + text_height_title + category_spacing
 
-        # 处理分类信息
-        category_texts = []
-        if hasattr(work, "media_category") and work.media_category:
-            category_texts.append(work.media_category)
-
-        # 添加额外类别
-        for category in work.categories:
-            if hasattr(category, "name"):
-                category_texts.append(category.name)
-
-        category_text = " | ".join(category_texts)
-
         # 绘制类别 - 左对齐
-        draw.text(
-            (self.padding, category_y),
-            category_text,
-            font=self.fonts["info"],
-            fill=self.colors["text_secondary"],
-        )
+        for i, line in enumerate(category_lines):
+            draw.text(
+                (self.padding, category_y + i * category_line_height),
+                line,
+                font=self.fonts["info"],
+                fill=dynamic_theme["accent"]
+                if dynamic_theme is not None
+                else self.colors["text_secondary"],
+            )
 
         # 在底部添加更新时间、浏览量和点赞数
-        stats_spacing = int(text_height_category * 0.2)  # 减小垂直间距
+        stats_spacing = int(category_line_height * 0.2)  # 减小垂直间距
         stats_y = category_y + text_height_category + stats_spacing
 
         # 格式化更新时间
@@ -577,16 +1097,13 @@ class CardGenerator:
             width=1,
         )
 
-        # 保持RGBA模式以保留透明度
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        card_filename = f"{work.id}_{timestamp}.png"
-        card_path = self.output_dir / card_filename
-        card.save(card_path, "PNG")
-
-        # 生成作品链接
-        work_url = f"https://www.ggac.com/work/detail/{work.id}"
+        # 记录封面位置, 用于生成缩略图
+        card.info["cover_box"] = cover_box
 
-        return str(card_path), work_url
+        draw_end = time.perf_counter()
+        CARD_DRAW_SECONDS.observe(draw_end - draw_start, type=type or "default")
+        record_span("draw", draw_start, draw_end, type=type or "default")
+        return card
 
     async def generate_cards(
         self, works: List[WorkItem], type: str = None
@@ -595,66 +1112,3 @@ class CardGenerator:
         tasks = [self.generate_card(work, type) for work in works]
         return await asyncio.gather(*tasks)
 
-
-if __name__ == "__main__":
-    import asyncio
-    from datetime import datetime
-    from dataclasses import dataclass
-
-    @dataclass
-    class Category:
-        name: str
-        level: int = 0
-
-    @dataclass
-    class TestWorkItem:
-        id: int
-        title: str
-        username: str
-        user_avatar: str
-        media_category: str
-        categories: list
-        view_count: int
-        hot: int
-        create_time: datetime
-        cover_url: str
-
-    async def main():
-        test_work = TestWorkItem(
-            id=12345,
-            title="示例作品标题",
-            username="小明",
-            user_avatar="https://cdn-prd.ggac.com/ggac/user/detail/url/ZP5z35PsDAp8Y6ncxNKAWcyNTaQK78rG1706888761356-500x.jpg",
-            media_category="3D模型",
-            categories=[
-                Category("风景"),
-                Category("风景图片"),
-            ],
-            view_count=360,
-            hot=18525,
-            create_time=datetime.strptime("2024-11-16 14:03:18", "%Y-%m-%d %H:%M:%S"),
-            cover_url="https://picsum.photos/900/600",
-        )
-
-        # 使用不同尺寸的图片测试自适应
-        test_sizes = [
-            "https://picsum.photos/600/400",  # 小尺寸
-            "https://picsum.photos/900/600",  # 中等尺寸
-            "https://picsum.photos/1200/800",  # 大尺寸
-            "https://picsum.photos/1800/1200",  # 超大尺寸
-            "https://picsum.photos/1000/2000",  # 竖图
-            "https://picsum.photos/2000/500",  # 横图
-        ]
-
-        generator = CardGenerator(output_dir=".")
-
-        # 测试不同尺寸的图片
-        for i, url in enumerate(test_sizes):
-            test_work.id = 12345 + i
-            test_work.title = f"测试{i+1}: {url.split('/')[-1]}"
-            test_work.cover_url = url
-
-            card_path, work_url = await generator.generate_card(test_work)
-            print(f"卡片{i+1}已生成: {card_path}")
-
-    asyncio.run(main())
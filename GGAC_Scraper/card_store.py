@@ -0,0 +1,148 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from .log import logger
+
+
+class CardStore:
+    """卡片存储
+
+    按字节预算和最长闲置时间管理已渲染的卡片文件:
+    - 文件按名称哈希分散到子目录, 避免单个目录文件过多
+    - LRU淘汰, 被固定(等待推送)的卡片不会被删除
+    - 启动时扫描目录重建索引
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        max_bytes: int = 500 * 1024 * 1024,
+        max_age: float = 3 * 24 * 3600,
+    ):
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        # 文件名 -> (字节数, 最后访问时间), 按最近使用排序
+        self._index: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        # 文件名 -> 固定计数
+        self._pinned: Dict[str, int] = {}
+        self.evicted = 0
+
+        self._scan()
+
+    @staticmethod
+    def _shard(name: str) -> str:
+        """文件名对应的子目录"""
+        return hashlib.sha1(name.encode("utf-8")).hexdigest()[:2]
+
+    def path_for(self, name: str) -> Path:
+        """卡片文件的完整路径"""
+        return self.root_dir / self._shard(name) / name
+
+    def _scan(self):
+        """扫描已有的卡片文件重建索引, 兼容旧版本直接保存在根目录的卡片
+
+        先取完整的目录列表再迁移旧卡片, 并按文件名去重,
+        迁移到稍后才遍历到的子目录中的卡片不会被重复计数
+        """
+        # 文件名 -> (修改时间, 大小)
+        entries: Dict[str, tuple] = {}
+        with os.scandir(self.root_dir) as iterator:
+            root_entries = list(iterator)
+        for entry in root_entries:
+            if entry.is_dir():
+                with os.scandir(entry.path) as sub_entries:
+                    for sub_entry in sub_entries:
+                        if sub_entry.is_file():
+                            stat = sub_entry.stat()
+                            entries[sub_entry.name] = (stat.st_mtime, stat.st_size)
+            elif entry.is_file():
+                stat = entry.stat()
+                try:
+                    # 旧卡片迁移到对应的子目录
+                    target = self.path_for(entry.name)
+                    target.parent.mkdir(exist_ok=True)
+                    os.replace(entry.path, target)
+                except OSError:
+                    continue
+                entries[entry.name] = (stat.st_mtime, stat.st_size)
+
+        for name, (mtime, size) in sorted(entries.items(), key=lambda item: item[1]):
+            self._index[name] = (size, mtime)
+            self._total_bytes += size
+        self.evict()
+
+    def lookup(self, name: str) -> Optional[str]:
+        """查找卡片, 命中时刷新其LRU位置"""
+        if name not in self._index:
+            return None
+        path = self.path_for(name)
+        if not path.exists():
+            self._total_bytes -= self._index.pop(name)[0]
+            return None
+        size, _ = self._index[name]
+        self._index[name] = (size, time.time())
+        self._index.move_to_end(name)
+        return str(path)
+
+    def add(self, path: Path):
+        """登记刚写入的卡片, 并按需淘汰旧卡片"""
+        path = Path(path)
+        name = path.name
+        old = self._index.pop(name, None)
+        if old is not None:
+            self._total_bytes -= old[0]
+        size = path.stat().st_size
+        self._index[name] = (size, time.time())
+        self._total_bytes += size
+        self.evict()
+
+    def pin(self, path: str):
+        """固定卡片, 推送完成前不会被淘汰"""
+        name = Path(path).name
+        self._pinned[name] = self._pinned.get(name, 0) + 1
+
+    def unpin(self, path: str):
+        """取消固定"""
+        name = Path(path).name
+        count = self._pinned.get(name, 0) - 1
+        if count > 0:
+            self._pinned[name] = count
+        else:
+            self._pinned.pop(name, None)
+
+    def evict(self):
+        """淘汰过期卡片, 再按LRU淘汰直到不超过字节预算"""
+        expire_before = time.time() - self.max_age
+        for name, (size, last_used) in list(self._index.items()):
+            over_budget = self._total_bytes > self.max_bytes
+            if not over_budget and last_used >= expire_before:
+                break
+            if name in self._pinned:
+                continue
+            try:
+                os.remove(self.path_for(name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("删除卡片失败: %s", e)
+                continue
+            del self._index[name]
+            self._total_bytes -= size
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        """存储使用情况"""
+        return {
+            "cards": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "pinned": len(self._pinned),
+            "evicted": self.evicted,
+        }
@@ -1,5 +1,6 @@
 import os
 import json
+from .log import logger
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -59,7 +60,7 @@ def init_settings():
     if not os.path.exists(SETTINGS_DIR):
         with open(SETTINGS_DIR, "w", encoding="utf-8") as f:
             json.dump(DEFAULT_SETTINGS, f, ensure_ascii=False, indent=2)
-        print(f"已创建默认设置文件: {SETTINGS_DIR}")
+        logger.info("已创建默认设置文件: %s", SETTINGS_DIR)
 
 
 def load_settings():
@@ -68,11 +69,11 @@ def load_settings():
         with open(SETTINGS_DIR, "r", encoding="utf-8") as f:
             return json.load(f)
     except FileNotFoundError:
-        print(f"设置文件不存在，将创建默认设置")
+        logger.info("设置文件不存在，将创建默认设置")
         init_settings()
         return DEFAULT_SETTINGS
     except json.JSONDecodeError:
-        print(f"设置文件格式错误，将使用默认设置")
+        logger.warning("设置文件格式错误，将使用默认设置")
         return DEFAULT_SETTINGS
 
 
@@ -0,0 +1,448 @@
+"""本地GGAC接口模拟服务器
+
+提供与GGAC相同格式的接口, 用于离线测试和基准测试:
+- GET  /api/work/list            作品列表, 支持分页、分类、创作类型和精选筛选
+- GET  /api/work/detail/{id}     作品详情, 包含mediaList
+- POST /api/user/password_login  登录, 返回token
+- GET  /api/global_search/post   文章列表
+- GET  /cdn/{path}               图片, 尺寸由?w=&h=指定, 缺省800x600
+- GET  /_stats, POST /_works?count=n, POST /_reset
+                                 查看请求统计、新增作品、清零统计
+
+数据默认按种子生成, 也可以加载录制的响应(payload_file)。可以配置接口延迟、
+错误率、token过期(返回430)和翻页时的作品变动。爬虫通过base_url/detail_base_url
+指向本服务器, 录制数据中的图片地址通过CardGenerator的image_hosts指向cdn_url。
+单独运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.fake_ggac_server --port 8930
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import secrets
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import Dict, List, Optional
+from aiohttp import web
+from PIL import Image, ImageDraw
+
+# 创作类型编号 -> 名称, 与MediaCategory一致
+MEDIA_CATEGORIES = {
+    1: "2D原画",
+    2: "3D模型",
+    4: "UI设计",
+    5: "动画",
+    6: "其他",
+    7: "特效",
+}
+
+# 分类编号 -> (名称, 代码), 与CategoryType一致
+CATEGORIES = {
+    1: ("游戏", "game"),
+    2: ("二次元", "anime"),
+    3: ("影视", "movie"),
+    4: ("文创", "art"),
+    5: ("动画漫画", "comic"),
+    17: ("其他", "other"),
+}
+
+COVER_SIZES = [(1200, 800), (900, 1200), (1600, 900), (1000, 1000), (800, 1600)]
+
+
+class FakeGGACServer:
+    """GGAC接口模拟服务器"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,  # 0为自动选择空闲端口
+        works: int = 500,  # 生成的作品数
+        articles: int = 100,  # 生成的文章数
+        seed: int = 0,
+        latency: float = 0.0,  # 接口固定延迟(秒)
+        jitter: float = 0.0,  # 接口随机附加延迟的上限(秒)
+        cdn_latency: float = 0.0,  # 图片接口延迟(秒)
+        error_rate: float = 0.0,  # 接口返回HTTP 500的概率
+        token_ttl: Optional[int] = None,  # token可用于多少次详情请求, 之后返回430
+        require_login: bool = False,  # 详情接口是否需要登录
+        churn: int = 0,  # 每次列表请求前新增的作品数, 模拟翻页时列表变动
+        media_per_work: int = 6,  # 每个作品详情中的图片数
+        payload_file: Optional[str] = None,  # 录制的响应数据
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.cdn_latency = cdn_latency
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.require_login = require_login
+        self.churn = churn
+        self.media_per_work = media_per_work
+        self._rng = random.Random(seed)
+
+        # 作品按发布时间从新到旧排列
+        self.works: List[dict] = []
+        self.details: Dict[int, dict] = {}
+        self.articles: List[dict] = []
+        self._next_id = 1
+        self._base_time = datetime(2024, 1, 1)
+
+        # token -> 剩余可用次数(None为不限)
+        self.tokens: Dict[str, Optional[int]] = {}
+        self.requests = Counter()
+        self.bytes_sent = Counter()  # 各接口返回的响应体字节数
+        self._images: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._runner: Optional[web.AppRunner] = None
+
+        if payload_file:
+            self.load_payloads(payload_file)
+        else:
+            self.add_works(works)
+            self.articles = [self._make_article(i + 1) for i in range(articles)]
+
+    # ---------- 数据 ----------
+
+    @property
+    def root_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def base_url(self) -> str:
+        """爬虫的base_url"""
+        return f"{self.root_url}/api"
+
+    @property
+    def cdn_url(self) -> str:
+        """图片地址前缀"""
+        return f"{self.root_url}/cdn"
+
+    def _image_url(self, kind: str, name, size) -> str:
+        # 地址中使用占位主机, 启动后才知道端口, 返回响应时再替换
+        return f"{{cdn}}/{kind}/{name}.jpg?w={size[0]}&h={size[1]}"
+
+    def add_works(self, count: int) -> List[int]:
+        """在列表最前面新增作品, 返回新作品ID"""
+        new_ids = []
+        for _ in range(count):
+            work_id = self._next_id
+            self._next_id += 1
+            work, detail = self._make_work(work_id)
+            self.works.insert(0, work)
+            self.details[work_id] = detail
+            new_ids.append(work_id)
+        return new_ids
+
+    def _make_work(self, work_id: int):
+        rng = self._rng
+        media_category = rng.choice(list(MEDIA_CATEGORIES))
+        category_ids = rng.sample(list(CATEGORIES), rng.randint(1, 2))
+        user = rng.randint(1, 50)
+        create_time = self._base_time + timedelta(minutes=work_id * 7)
+        cover_size = rng.choice(COVER_SIZES)
+        work = {
+            "id": work_id,
+            "title": f"测试作品 {work_id} {rng.choice(['场景', '角色', '概念设计', 'Study'])}",
+            "originalCoverUrl": self._image_url("cover", work_id, cover_size),
+            "dictMap": {"mediaCategory": MEDIA_CATEGORIES[media_category]},
+            "userInfo": {
+                "username": f"画师{user}",
+                "avatarUrl": self._image_url("avatar", user, (200, 200)),
+            },
+            "categoryList": [
+                {
+                    "id": category_id,
+                    "level": 1,
+                    "name": CATEGORIES[category_id][0],
+                    "code": CATEGORIES[category_id][1],
+                }
+                for category_id in category_ids
+            ],
+            "viewCount": rng.randint(0, 50000),
+            "hot": rng.randint(0, 5000),
+            "createTime": create_time.strftime("%Y-%m-%d %H:%M:%S"),
+            # 以下字段只用于筛选, 返回前去掉
+            "_media": media_category,
+            "_recommend": rng.random() < 0.4,
+        }
+        media_list = [
+            {
+                "type": 1,
+                "url": self._image_url(
+                    "media", f"{work_id}_{i}", rng.choice(COVER_SIZES)
+                ),
+            }
+            for i in range(self.media_per_work)
+        ]
+        detail = {
+            "id": work_id,
+            "title": work["title"],
+            "description": "本地测试服务器生成的作品",
+            "mediaList": media_list,
+        }
+        return work, detail
+
+    def _make_article(self, article_id: int) -> dict:
+        rng = self._rng
+        create_time = self._base_time + timedelta(hours=article_id)
+        return {
+            "dataId": article_id,
+            "title": f"测试文章 {article_id}",
+            "coverUrl": self._image_url("article", article_id, (1200, 675)),
+            "userInfo": {"username": f"作者{rng.randint(1, 20)}"},
+            "categoryList": [],
+            "viewCount": rng.randint(0, 10000),
+            "hot": rng.randint(0, 1000),
+            "createTime": create_time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def load_payloads(self, payload_file: str):
+        """加载录制的数据: {"works": [...], "details": {id: {...}}, "articles": [...]}"""
+        with open(payload_file, "r", encoding="utf-8") as f:
+            payloads = json.load(f)
+        self.works = payloads.get("works", [])
+        self.details = {int(k): v for k, v in payloads.get("details", {}).items()}
+        self.articles = payloads.get("articles", [])
+        self._next_id = max((work["id"] for work in self.works), default=0) + 1
+
+    def _public(self, data):
+        """去掉内部字段并填入图片服务器地址"""
+        text = json.dumps(data, ensure_ascii=False).replace("{cdn}", self.cdn_url)
+        data = json.loads(text)
+        if isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict):
+                    for key in [key for key in item if key.startswith("_")]:
+                        del item[key]
+        return data
+
+    # ---------- 接口 ----------
+
+    async def _simulate(self, endpoint: str):
+        """记录请求, 模拟延迟和随机错误"""
+        self.requests[endpoint] += 1
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise web.HTTPInternalServerError(text="模拟服务器错误")
+
+    @staticmethod
+    def _ok(data) -> web.Response:
+        return web.json_response({"code": "0", "message": None, "data": data})
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        await self._simulate("list")
+        if self.churn:
+            self.add_works(self.churn)
+        query = request.query
+        page = max(1, int(query.get("pageNumber", 1)))
+        size = max(1, int(query.get("pageSize", 48)))
+
+        works = self.works
+        if "mediaCategory" in query:
+            media = int(query["mediaCategory"])
+            works = [w for w in works if w.get("_media", media) == media]
+        if "categoryId" in query:
+            category_id = int(query["categoryId"])
+            works = [
+                w
+                for w in works
+                if any(c["id"] == category_id for c in w.get("categoryList", []))
+            ]
+        if query.get("isRecommend") == "1":
+            works = [w for w in works if w.get("_recommend", True)]
+
+        page_data = works[(page - 1) * size : page * size]
+        return self._ok(
+            {
+                "pageData": self._public(page_data),
+                "totalSize": len(works),
+                "pageNumber": page,
+                "pageSize": size,
+            }
+        )
+
+    def _check_token(self, request: web.Request) -> bool:
+        """token有效时消耗一次可用次数"""
+        token = request.headers.get("token") or request.headers.get("authorization")
+        if token not in self.tokens:
+            return not self.require_login
+        remaining = self.tokens[token]
+        if remaining is None:
+            return True
+        if remaining <= 0:
+            return False
+        self.tokens[token] = remaining - 1
+        return True
+
+    async def handle_detail(self, request: web.Request) -> web.Response:
+        await self._simulate("detail")
+        if not self._check_token(request):
+            self.requests["detail_denied"] += 1
+            return web.json_response(
+                {"code": "430", "message": "请先登录后再访问", "data": None}
+            )
+        work_id = int(request.match_info["id"])
+        detail = self.details.get(work_id)
+        if detail is None:
+            return web.json_response({"code": "0", "message": None, "data": None})
+        return self._ok(self._public([detail])[0])
+
+    async def handle_login(self, request: web.Request) -> web.Response:
+        await self._simulate("login")
+        body = await request.json()
+        if not body.get("account") or not body.get("password"):
+            return web.json_response({"code": "1", "message": "账号或密码错误"})
+        token = secrets.token_hex(16)
+        self.tokens[token] = self.token_ttl
+        response = self._ok(token)
+        response.set_cookie("token", token)
+        return response
+
+    async def handle_articles(self, request: web.Request) -> web.Response:
+        await self._simulate("articles")
+        page = max(1, int(request.query.get("pageNumber", 1)))
+        size = max(1, int(request.query.get("pageSize", 48)))
+        page_data = self.articles[(page - 1) * size : page * size]
+        return self._ok(
+            {"pageData": self._public(page_data), "totalSize": len(self.articles)}
+        )
+
+    def _render_image(self, path: str, width: int, height: int) -> bytes:
+        """按路径生成确定的渐变图片, 最近生成的图片保存在内存中"""
+        key = (path, width, height)
+        data = self._images.get(key)
+        if data is not None:
+            self._images.move_to_end(key)
+            return data
+        seed = sum(path.encode("utf-8"))
+        start = ((seed * 37) % 256, (seed * 59) % 256, (seed * 83) % 256)
+        image = Image.linear_gradient("L").resize((width, height))
+        image = Image.merge(
+            "RGB",
+            [image.point(lambda v, c=c: (c + v // 2) % 256) for c in start],
+        )
+        ImageDraw.Draw(image).ellipse(
+            [width // 4, height // 4, width * 3 // 4, height * 3 // 4],
+            fill=start[::-1],
+        )
+        buffer = BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+        data = buffer.getvalue()
+        self._images[key] = data
+        if len(self._images) > 64:
+            self._images.popitem(last=False)
+        return data
+
+    async def handle_cdn(self, request: web.Request) -> web.Response:
+        self.requests["cdn"] += 1
+        if self.cdn_latency:
+            await asyncio.sleep(self.cdn_latency)
+        width = min(8000, max(1, int(request.query.get("w", 800))))
+        height = min(8000, max(1, int(request.query.get("h", 600))))
+        data = self._render_image(request.match_info["path"], width, height)
+        return web.Response(body=data, content_type="image/jpeg")
+
+    # ---------- 控制接口, 供其他进程中的基准测试使用 ----------
+
+    def stats(self) -> dict:
+        """各接口的请求次数和响应字节数"""
+        return {"requests": dict(self.requests), "bytes": dict(self.bytes_sent)}
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def handle_add_works(self, request: web.Request) -> web.Response:
+        count = int(request.query.get("count", 1))
+        return web.json_response({"ids": self.add_works(count)})
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.requests.clear()
+        self.bytes_sent.clear()
+        return web.json_response({})
+
+    # ---------- 启动 ----------
+
+    @web.middleware
+    async def _count_bytes(self, request: web.Request, handler):
+        response = await handler(request)
+        name = request.match_info.route.name
+        if name and isinstance(response.body, bytes):
+            self.bytes_sent[name] += len(response.body)
+        return response
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._count_bytes])
+        app.router.add_get("/api/work/list", self.handle_list, name="list")
+        app.router.add_get("/api/work/detail/{id}", self.handle_detail, name="detail")
+        app.router.add_post(
+            "/api/user/password_login", self.handle_login, name="login"
+        )
+        app.router.add_get(
+            "/api/global_search/post", self.handle_articles, name="articles"
+        )
+        app.router.add_get("/cdn/{path:.+}", self.handle_cdn, name="cdn")
+        app.router.add_get("/_stats", self.handle_stats)
+        app.router.add_post("/_works", self.handle_add_works)
+        app.router.add_post("/_reset", self.handle_reset)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # 端口为0时取实际监听的端口
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeGGACServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+
+async def serve(args):
+    server = FakeGGACServer(
+        host=args.host,
+        port=args.port,
+        works=args.works,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        token_ttl=args.token_ttl,
+        churn=args.churn,
+        payload_file=args.payload_file,
+    )
+    async with server:
+        print(f"接口地址: {server.base_url}", flush=True)
+        print(f"图片地址: {server.cdn_url}", flush=True)
+        while True:
+            await asyncio.sleep(3600)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地GGAC接口模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8930)
+    parser.add_argument("--works", type=int, default=500, help="生成的作品数")
+    parser.add_argument("--latency", type=float, default=0.0, help="接口延迟(秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="随机附加延迟上限(秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="错误率")
+    parser.add_argument("--token-ttl", type=int, default=None, help="token可用次数")
+    parser.add_argument("--churn", type=int, default=0, help="每次列表请求新增的作品数")
+    parser.add_argument("--payload-file", default=None, help="录制的响应数据")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
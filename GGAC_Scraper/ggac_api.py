@@ -1,6 +1,11 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple
 import asyncio
+import math
+import random
+import time
+from .rate_limiter import RateLimiter
 from .ggac_scraper import (
+    BaseScraper,
     GGACScraper,
     CategoryType,
     MediaCategory,
@@ -12,8 +17,53 @@ from .ggac_scraper import (
 class GGACAPI:
     """GGAC API接口类"""
 
-    def __init__(self):
-        self._scraper = GGACScraper()
+    # 分类
+    CATEGORY_MAP = {
+        "featured": None,
+        "game": CategoryType.GAME,
+        "anime": CategoryType.ANIME,
+        "movie": CategoryType.MOVIE,
+        "art": CategoryType.ART,
+        "comic": CategoryType.COMIC,
+        "other": CategoryType.ANOTHER,
+        "all": CategoryType.ALL,
+    }
+
+    # 创作类型
+    MEDIA_TYPE_MAP = {
+        "2d": MediaCategory.TWO_D,
+        "3d": MediaCategory.THREE_D,
+        "ui": MediaCategory.UI,
+        "animation": MediaCategory.ANIMATION,
+        "vfx": MediaCategory.VFX,
+        "other": MediaCategory.OTHER,
+    }
+
+    # 排序方式
+    SORT_MAP = {
+        "latest": SortField.LATEST,
+        "recommended": SortField.RECOMMENDED,
+        "views": SortField.VIEWS,
+        "likes": SortField.LIKES,
+        "hot": SortField.HOT,
+    }
+
+    def __init__(
+        self,
+        page_index_ttl: float = 600,  # 作品总数缓存的有效期(秒)
+        random_max_pages: int = 50,  # 随机作品最多从前几页中抽取
+        rate_limit: float = 8.0,  # 每秒最多发出的请求数, 0为不限制
+        base_url: Optional[str] = None,  # 替换接口地址, 例如指向本地测试服务器
+        detail_base_url: Optional[str] = None,  # 替换详情接口地址, 默认同base_url
+        keep_raw: bool = False,  # 作品保留完整的原始数据, 默认只保留用到的字段
+    ):
+        self._scraper = GGACScraper(
+            RateLimiter(rate=rate_limit), base_url, detail_base_url, keep_raw
+        )
+        self.page_index_ttl = page_index_ttl
+        self.random_max_pages = max(1, random_max_pages)
+        # 列表作品总数: (分类, 创作类型, 排序, 每页数量) -> (总数, 记录时间)
+        self._page_index: Dict[Tuple[str, str, str, int], Tuple[int, float]] = {}
 
     async def login(
         self,
@@ -81,41 +131,10 @@ class GGACAPI:
         返回:
             List[WorkItem]: 作品列表
         """
-        # 转换分类
-        category_map = {
-            "featured": None,
-            "game": CategoryType.GAME,
-            "anime": CategoryType.ANIME,
-            "movie": CategoryType.MOVIE,
-            "art": CategoryType.ART,
-            "comic": CategoryType.COMIC,
-            "other": CategoryType.ANOTHER,
-            "all": CategoryType.ALL,
-        }
-
-        # 转换创作类型
-        media_type_map = {
-            "2d": MediaCategory.TWO_D,
-            "3d": MediaCategory.THREE_D,
-            "ui": MediaCategory.UI,
-            "animation": MediaCategory.ANIMATION,
-            "vfx": MediaCategory.VFX,
-            "other": MediaCategory.OTHER,
-        }
-
-        # 转换排序方式
-        sort_map = {
-            "latest": SortField.LATEST,
-            "recommended": SortField.RECOMMENDED,
-            "views": SortField.VIEWS,
-            "likes": SortField.LIKES,
-            "hot": SortField.HOT,
-        }
-
         # 获取枚举值
-        category_type = category_map.get(category.lower()) if category else None
-        media_category = media_type_map.get(media_type.lower()) if media_type else None
-        sort_field = sort_map.get(sort_by.lower(), SortField.RECOMMENDED)
+        category_type, media_category, sort_field = self._resolve(
+            category, media_type, sort_by
+        )
 
         # 获取作品
         if category == "featured":
@@ -137,3 +156,94 @@ class GGACAPI:
     def get_works_sync(self, *args, **kwargs) -> List[WorkItem]:
         """同步方式获取作品列表"""
         return asyncio.run(self.get_works(*args, **kwargs))
+
+    def _resolve(
+        self, category: str, media_type: str, sort_by: str
+    ) -> Tuple[Optional[CategoryType], Optional[MediaCategory], SortField]:
+        """把分类、创作类型和排序方式的名称转换为枚举值"""
+        category_type = self.CATEGORY_MAP.get(category.lower()) if category else None
+        media_category = (
+            self.MEDIA_TYPE_MAP.get(media_type.lower()) if media_type else None
+        )
+        sort_field = self.SORT_MAP.get(sort_by.lower(), SortField.RECOMMENDED)
+        return category_type, media_category, sort_field
+
+    def _scraper_for(
+        self, category: str, category_type: Optional[CategoryType]
+    ) -> BaseScraper:
+        """分类名称对应的爬虫实例"""
+        if category == "featured":
+            return self._scraper.featured
+        return self._scraper.scraper_for(category_type)
+
+    async def _fetch_page(
+        self, category: str, media_type: str, sort_by: str, page: int, size: int
+    ) -> Tuple[List[dict], int]:
+        """只获取一页列表数据, 返回 (原始数据, 作品总数) 并更新总数缓存"""
+        category_type, media_category, sort_field = self._resolve(
+            category, media_type, sort_by
+        )
+        scraper = self._scraper_for(category, category_type)
+        # 爬虫实例与监控任务共用, 参数在构建URL前同步设置, 中间没有await
+        scraper.sort_field = sort_field
+        scraper.media_category = media_category
+        data, total = await scraper.get_work_page(page, size)
+        key = (category, media_type, sort_by, size)
+        if data or page == 1:
+            self._page_index[key] = (total, time.monotonic())
+        else:
+            # 页码超出范围, 作品总数已经变化
+            self._page_index.pop(key, None)
+        return data, total
+
+    def _cached_total(self, key: Tuple[str, str, str, int]) -> Optional[int]:
+        """缓存中未过期的作品总数"""
+        entry = self._page_index.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.page_index_ttl:
+            return None
+        return entry[0]
+
+    async def get_random_work(
+        self,
+        category: str = "all",
+        media_type: str = "2d",
+        sort_by: str = "latest",
+        size: int = 24,
+    ) -> Optional[WorkItem]:
+        """
+        随机获取一个作品
+
+        只请求作品列表, 根据列表返回的作品总数在前random_max_pages页中随机选页,
+        选中作品后只请求这一个作品的详情。作品总数会缓存page_index_ttl秒,
+        缓存有效时只需一次列表请求和一次详情请求
+
+        参数与get_works相同
+
+        返回:
+            Optional[WorkItem]: 随机作品, 列表为空时返回None
+        """
+        key = (category, media_type, sort_by, size)
+        data = None
+        total = self._cached_total(key)
+        if total is None:
+            data, total = await self._fetch_page(category, media_type, sort_by, 1, size)
+        if total <= 0:
+            return None
+
+        pages = min(math.ceil(total / size), self.random_max_pages)
+        page = random.randint(1, pages)
+        if data is None or page != 1:
+            data, _ = await self._fetch_page(category, media_type, sort_by, page, size)
+            if not data and page != 1:
+                # 作品变少导致页码超出范围, 退回第一页
+                data, _ = await self._fetch_page(
+                    category, media_type, sort_by, 1, size
+                )
+        if not data:
+            return None
+
+        item = random.choice(data)
+        category_type, _, _ = self._resolve(category, media_type, sort_by)
+        scraper = self._scraper_for(category, category_type)
+        works = await scraper.hydrate_works([item])
+        return works[0] if works else None
@@ -1,26 +1,125 @@
 import json
+import base64
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 import asyncio
+import time
 from datetime import datetime
 from .ggac_api import GGACAPI
-from .ggac_scraper import WorkItem
-from .card_generator import CardGenerator
+from .ggac_scraper import WorkItem, HTTP_SECONDS, HTTP_REQUESTS
+from .parsing import PARSE_SKIPPED
+from .card_generator import (
+    CardGenerator,
+    IMAGE_DOWNLOAD_SECONDS,
+    IMAGE_LOADS,
+    CARD_DRAW_SECONDS,
+    CARD_ENCODE_SECONDS,
+)
+from .warm_pool import WarmPool
+from .scheduler import Priority, current_priority, LatencyStats
+from .metrics import registry
+from .log import logger
+from .tracing import Tracer, Trace, use_trace, span
+from .profiler import Profiler
+from .loop_monitor import LoopLagMonitor, LOOP_LAG_SECONDS, LOOP_STALLS
+from ..config import FONTS_DIR
+
+POLL_CYCLE_SECONDS = registry.histogram("ggac_poll_cycle_seconds", "一轮检查更新的耗时(秒)")
+POLL_STAGE_SECONDS = registry.histogram(
+    "ggac_poll_stage_seconds", "检查更新各阶段的耗时(秒), 按阶段(fetch/diff/render)"
+)
+POLL_ERRORS = registry.counter("ggac_poll_errors_total", "检查更新出错次数")
+UPDATES_FOUND = registry.counter("ggac_updates_total", "找到的更新作品数, 按推送设置")
+LAST_POLL = registry.gauge("ggac_last_poll_timestamp_seconds", "上一轮检查结束的时间戳")
+SEND_SECONDS = registry.histogram("ggac_send_seconds", "单条消息的发送耗时(秒)")
+MESSAGES_SENT = registry.counter("ggac_messages_sent_total", "发送的消息数, 按结果(ok/error)")
+CARD_STORE_BYTES = registry.gauge("ggac_card_store_bytes", "卡片存储占用的字节数")
+CARD_STORE_CARDS = registry.gauge("ggac_card_store_cards", "卡片存储中的卡片数")
+WARM_POOL_CARDS = registry.gauge("ggac_warm_pool_cards", "预渲染卡片池中的卡片数")
+RATE_LIMIT_WAIT = registry.gauge(
+    "ggac_rate_limit_wait_seconds", "请求因限流累计等待的时间(秒)"
+)
 
 
 class GGACMonitor:
     """GGAC更新监控器"""
 
-    def __init__(self, cache_dir: str = "cache", cards_dir: str = "cards"):
-        self.api = GGACAPI()
-        self.card_generator = CardGenerator(output_dir=cards_dir)
+    def __init__(
+        self,
+        cache_dir: str = "cache",
+        cards_dir: str = "cards",
+        image_cache_mb: int = 200,
+        card_cache: bool = True,
+        stat_granularity: int = 100,
+        card_store_mb: int = 500,
+        card_max_age_hours: float = 72,
+        card_format: str = "png",
+        card_quality: int = 85,
+        card_target_kb: int = 0,
+        delivery: str = "file",
+        render_memory_mb: int = 256,
+        theme_patterns: bool = True,
+        theme_mode: str = "category",
+        collage_max_images: int = 9,
+        cover_type: str = "default",
+        warm_pool_size: int = 3,
+        warm_pool_repeat_hours: float = 24,
+        api_rate_limit: float = 8.0,
+        api_base_url: Optional[str] = None,  # 替换接口地址, 用于本地测试服务器
+        image_hosts: Optional[Dict[str, str]] = None,  # 替换图片地址前缀
+        font_path: str = FONTS_DIR,
+        metrics_file: Optional[str] = None,  # Prometheus文本格式的指标文件, 为空则不写
+        trace_file: Optional[str] = None,  # 推送过程的trace文件, 为空则不记录
+        trace_sample_rate: float = 1.0,  # 记录trace的新作品比例
+        loop_lag_threshold: float = 0.1,  # 事件循环卡顿阈值(秒), 0为关闭
+    ):
+        self.metrics_file = metrics_file
+        self.tracer = Tracer(trace_file, trace_sample_rate)
+        self.api = GGACAPI(rate_limit=api_rate_limit, base_url=api_base_url)
+        # 卡片发送方式: file(本地文件路径) / base64(内存编码, 不依赖共享文件系统)
+        self.delivery = delivery
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
+        # 按需开启的性能分析, 结果写入缓存目录
+        self.profiler = Profiler(str(self.cache_dir / "profiles"))
+        self.card_generator = CardGenerator(
+            output_dir=cards_dir,
+            image_cache_dir=str(self.cache_dir / "images"),
+            image_cache_bytes=image_cache_mb * 1024 * 1024,
+            card_cache=card_cache,
+            stat_granularity=stat_granularity,
+            card_store_bytes=card_store_mb * 1024 * 1024,
+            card_max_age=card_max_age_hours * 3600,
+            card_format=card_format,
+            card_quality=card_quality,
+            card_target_bytes=card_target_kb * 1024,
+            # 解码后的图片每像素占4字节
+            render_budget_pixels=render_memory_mb * 1024 * 1024 // 4,
+            theme_patterns=theme_patterns,
+            theme_mode=theme_mode,
+            collage_max_images=collage_max_images,
+            image_hosts=image_hosts,
+            font_path=font_path,
+        )
+        # 事件循环延迟监控, 由插件启动
+        self.loop_monitor = LoopLagMonitor(threshold=loop_lag_threshold)
+        # /ggac 命令从收到到卡片就绪的耗时
+        self.command_latency = LatencyStats()
+
+        # /ggac 命令使用的预渲染卡片池
+        self.warm_pool = WarmPool(
+            str(self.cache_dir / "warm_pool.json"),
+            self.api,
+            self.card_generator,
+            size=warm_pool_size,
+            repeat_window=warm_pool_repeat_hours * 3600,
+            cover_type=cover_type,
+        )
 
     def set_credentials(self, username: str, password: str) -> None:
         """设置登录凭据，供后续自动登录使用"""
         if not username or not password:
-            print("[WARNING] 未提供有效的登录凭据")
+            logger.warning("未提供有效的登录凭据")
             return
 
         # 为所有爬虫设置凭据
@@ -43,7 +142,7 @@ class GGACMonitor:
             scraper.username = username
             scraper.password = password
 
-        print(f"[INFO] 已为 GGAC 爬虫设置登录凭据: {username}")
+        logger.info("已为 GGAC 爬虫设置登录凭据: %s", username)
 
     def _load_cache(self, cache_file: Path) -> List[Dict]:
         """加载缓存文件"""
@@ -89,34 +188,171 @@ class GGACMonitor:
         cached_ids = {item["id"] for item in cached_data}
         updates = [work for work in new_works if work.id not in cached_ids]
         if updates:
-            print(f"找到 {len(updates)} 个更新")
+            logger.info("找到 %d 个更新", len(updates))
             for work in updates:
-                print(f"新作品: {work.id} - {work.title}")
+                logger.info("新作品: %s - %s", work.id, work.title)
         return updates
 
     async def _process_updates(
-        self, updates: List[WorkItem], type: str = None
+        self,
+        updates: List[WorkItem],
+        type: str = None,
+        setting: Optional[str] = None,
+        collected: Optional[Trace] = None,
     ) -> List[Dict[str, str]]:
-        """处理更新的作品，生成卡片"""
+        """处理更新的作品，生成卡片
+
+        被采样的作品附带trace, 继承collected中该作品的列表和详情请求,
+        发送完成后由release_updates写入
+        """
         results = []
         for work in updates:
+            trace = self.tracer.start(
+                work.id, collected, setting=setting, title=work.title
+            )
             try:
-                card_path, work_url = await self.card_generator.generate_card(
-                    work, type
-                )
-                results.append(
-                    {
-                        "image_path": str(Path(card_path).absolute()),
-                        "url": work_url,
-                        "title": work.title,
-                        "id": work.id,
-                    }
-                )
+                with use_trace(trace), span("render"):
+                    item = await self.render_work(work, type)
             except Exception as e:
-                print(f"处理作品 {work.id} 时出错: {e}")
+                logger.error("处理作品 %s 时出错: %s", work.id, e)
+                self.tracer.finish(trace, error=str(e))
                 continue
+            item["trace"] = trace
+            results.append(item)
         return results
 
+    async def render_work(self, work: WorkItem, type: str = None) -> Dict[str, str]:
+        """生成单个作品的卡片, 返回可直接发送的图片地址
+
+        file模式下卡片会被固定直到release_updates; base64模式下编码结果
+        在所有群组间复用
+        """
+        if self.delivery == "base64":
+            data, work_url = await self.card_generator.generate_card_data(work, type)
+            if data is None:
+                raise Exception("卡片生成失败")
+            image_path = None
+            image_file = "base64://" + base64.b64encode(data).decode("ascii")
+        else:
+            card_path, work_url = await self.card_generator.generate_card(work, type)
+            if card_path is None:
+                raise Exception("卡片生成失败")
+            # 推送完成前固定卡片, 避免被淘汰
+            self.card_generator.card_store.pin(card_path)
+            image_path = str(Path(card_path).absolute())
+            image_file = "file://" + image_path
+
+        return {
+            "image_path": image_path,
+            "image_file": image_file,
+            "url": work_url,
+            "title": work.title,
+            "id": work.id,
+        }
+
+    async def take_warm_card(
+        self, category: str, media_type: str, group_id
+    ) -> Optional[Dict[str, str]]:
+        """从卡片池取一张可直接发送的卡片, 池中没有合适的卡片时返回None
+
+        与render_work返回的格式相同, 同样需要在发送后调用release_updates。
+        卡片文件已被删除时取消固定并返回None, 由调用方重新绘制
+        """
+        entry = self.warm_pool.take(category, media_type, group_id)
+        if entry is None:
+            return None
+        card_path = entry["image_path"]
+        if self.delivery == "base64":
+            try:
+                data = await asyncio.to_thread(Path(card_path).read_bytes)
+            except OSError as e:
+                logger.warning("读取预渲染卡片失败: %s", e)
+                self.card_generator.card_store.unpin(card_path)
+                return None
+            self.card_generator.card_store.unpin(card_path)
+            image_path = None
+            image_file = "base64://" + base64.b64encode(data).decode("ascii")
+        else:
+            image_path = str(Path(card_path).absolute())
+            image_file = "file://" + image_path
+
+        return {
+            "image_path": image_path,
+            "image_file": image_file,
+            "url": entry["url"],
+            "title": entry["title"],
+            "id": entry["id"],
+        }
+
+    def scheduler_stats(self) -> dict:
+        """命令耗时以及请求和绘制队列中各优先级的等待时间"""
+        return {
+            "command": self.command_latency.stats(),
+            "http": self.api._scraper.rate_limiter.queue.stats(),
+            "render": self.card_generator.render_scheduler.stats(),
+        }
+
+    def _update_gauges(self):
+        """刷新只在导出时才需要的当前值"""
+        store_stats = self.card_generator.card_store.stats()
+        CARD_STORE_BYTES.set(store_stats["bytes"])
+        CARD_STORE_CARDS.set(store_stats["cards"])
+        WARM_POOL_CARDS.set(self.warm_pool.stats()["cards"])
+        RATE_LIMIT_WAIT.set(self.api._scraper.rate_limiter.waited)
+
+    def export_metrics(self):
+        """刷新当前值, 配置了指标文件时写入Prometheus文本格式"""
+        self._update_gauges()
+        if self.metrics_file:
+            registry.write_prometheus(self.metrics_file)
+
+    def metrics_summary(self) -> List[str]:
+        """各阶段耗时的摘要, 每行一项, 用于 /ggac_status"""
+
+        def latency(histogram, **labels) -> str:
+            count = histogram.count(**labels)
+            if count == 0:
+                return "暂无数据"
+            return (
+                f"p50 {histogram.quantile(0.5, **labels) * 1000:.0f}ms, "
+                f"p95 {histogram.quantile(0.95, **labels) * 1000:.0f}ms, "
+                f"{count}次"
+            )
+
+        errors = HTTP_REQUESTS.get(endpoint="list", result="error") + HTTP_REQUESTS.get(
+            endpoint="detail", result="error"
+        )
+        blocking = ", ".join(
+            f"{function} {count}次 共{total:.1f}s 最长{longest * 1000:.0f}ms"
+            for function, count, total, longest in self.loop_monitor.top(3)
+        )
+        return [
+            f"检查周期: {latency(POLL_CYCLE_SECONDS)}, 出错{POLL_ERRORS.total():.0f}次",
+            f"列表请求: {latency(HTTP_SECONDS, endpoint='list')}, "
+            f"跳过格式错误的列表项{PARSE_SKIPPED.total():.0f}个",
+            f"详情请求: {latency(HTTP_SECONDS, endpoint='detail')}, "
+            f"需要登录{HTTP_REQUESTS.get(endpoint='detail', result='need_login'):.0f}次",
+            f"请求失败: {errors:.0f}次",
+            f"图片下载: {latency(IMAGE_DOWNLOAD_SECONDS)}, "
+            f"缓存命中{IMAGE_LOADS.get(source='memory') + IMAGE_LOADS.get(source='disk'):.0f}次, "
+            f"失败{IMAGE_LOADS.get(source='error'):.0f}次",
+            f"卡片绘制: {latency(CARD_DRAW_SECONDS)}",
+            f"卡片编码: {latency(CARD_ENCODE_SECONDS)}",
+            f"消息发送: {latency(SEND_SECONDS)}, "
+            f"失败{MESSAGES_SENT.get(result='error'):.0f}次",
+            f"事件循环延迟: {latency(LOOP_LAG_SECONDS)}, "
+            f"超过{self.loop_monitor.threshold * 1000:.0f}ms {LOOP_STALLS.total():.0f}次",
+            f"阻塞事件循环最多: {blocking or '无'}",
+        ]
+
+    def release_updates(self, updates: Dict[str, List[Dict[str, str]]]):
+        """推送完成后取消固定卡片, 允许其被淘汰, 并写入作品的trace"""
+        for items in updates.values():
+            for item in items:
+                if item["image_path"]:
+                    self.card_generator.card_store.unpin(item["image_path"])
+                self.tracer.finish(item.pop("trace", None))
+
     def _get_cache_file(self, category_name: str) -> Path:
         """获取缓存文件路径"""
         return self.cache_dir / f"{category_name}.json"
@@ -140,39 +376,60 @@ class GGACMonitor:
                         "sort_by": "hot"
                     }
                 }
+                每项还可以用page_size指定每次检查的作品数, 默认48
         """
         results = {}
+        cycle_start = time.monotonic()
+        # 检查期间暂停卡片池的补充, 请求和绘制使用推送优先级
+        self.warm_pool.idle.clear()
+        priority_token = current_priority.set(Priority.POLLING)
         try:
             for category_name, settings in push_settings.items():
-                # 获取作品
-                works = await self.api.get_works(
-                    category=settings.get("category"),
-                    media_type=settings.get("media_type"),
-                    sort_by=settings.get("sort_by", "recommended"),
-                )
-                print(f"获取到 {len(works)} 个作品 (类别: {category_name})")
+                # 获取作品, 此时还不知道哪些作品需要推送, 先收集请求的span
+                collected = self.tracer.collector()
+                with POLL_STAGE_SECONDS.time(stage="fetch"), use_trace(collected):
+                    works = await self.api.get_works(
+                        category=settings.get("category"),
+                        media_type=settings.get("media_type"),
+                        sort_by=settings.get("sort_by", "recommended"),
+                        size=settings.get("page_size", 48),
+                    )
+                logger.debug("获取到 %d 个作品 (类别: %s)", len(works), category_name)
 
                 # 获取缓存
                 cache_file = self._get_cache_file(category_name)
                 cached_data = self._load_cache(cache_file)
-                print(f"已缓存 {len(cached_data)} 个作品 (类别: {category_name})")
+                logger.debug(
+                    "已缓存 %d 个作品 (类别: %s)", len(cached_data), category_name
+                )
 
                 if not cached_data:  # 首次运行
-                    print(f"首次运行，创建缓存 (类别: {category_name})")
+                    logger.info("首次运行，创建缓存 (类别: %s)", category_name)
                     self._save_cache(cache_file, works)
                 else:
-                    updates = self._find_updates(works, cached_data)
+                    with POLL_STAGE_SECONDS.time(stage="diff"):
+                        updates = self._find_updates(works, cached_data)
                     if updates:
-                        print(f"处理 {len(updates)} 个更新 (类别: {category_name})")
-                        results[category_name] = await self._process_updates(updates)
+                        logger.info(
+                            "处理 %d 个更新 (类别: %s)", len(updates), category_name
+                        )
+                        UPDATES_FOUND.inc(len(updates), setting=category_name)
+                        with POLL_STAGE_SECONDS.time(stage="render"):
+                            results[category_name] = await self._process_updates(
+                                updates, setting=category_name, collected=collected
+                            )
                         self._save_cache(cache_file, works)
 
         except Exception as e:
-            print(f"检查更新时出错: {e}")
-            import traceback
-
-            traceback.print_exc()
+            POLL_ERRORS.inc()
+            logger.exception("检查更新时出错: %s", e)
             raise
+        finally:
+            current_priority.reset(priority_token)
+            self.warm_pool.idle.set()
+            POLL_CYCLE_SECONDS.observe(time.monotonic() - cycle_start)
+            LAST_POLL.set(time.time())
+            self.profiler.cycle_finished()
 
         return results
 
@@ -182,16 +439,20 @@ class GGACMonitor:
             try:
                 updates = await self.check_updates(push_settings)
                 if any(updates.values()):
-                    print(f"发现更新: {datetime.now()}")
+                    logger.info("发现更新: %s", datetime.now())
                     for category, items in updates.items():
                         if items:
-                            print(f"{category}类型更新数量: {len(items)}")
+                            logger.info("%s类型更新数量: %d", category, len(items))
                             for item in items:
-                                print(f"图片路径: {item['image_path']}")
-                                print(f"作品链接: {item['url']}")
-                                print("---")
+                                logger.info(
+                                    "图片路径: %s, 作品链接: %s",
+                                    item["image_path"] or "内存",
+                                    item["url"],
+                                )
+                    self.release_updates(updates)
+                self.export_metrics()
 
                 await asyncio.sleep(interval_seconds)
             except Exception as e:
-                print(f"监控出错: {e}")
+                logger.error("监控出错: %s", e)
                 await asyncio.sleep(60)  # 出错后等待1分钟再继续
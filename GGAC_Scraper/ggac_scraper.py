@@ -1,9 +1,21 @@
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import aiohttp
 import asyncio
+import sys
 from datetime import datetime
+from .rate_limiter import RateLimiter
+from .metrics import registry
+from .log import logger, register_secret, SAMPLED
+from .tracing import span
+from .parsing import loads, parse_time, parse_items, require
+
+HTTP_SECONDS = registry.histogram(
+    "ggac_http_request_seconds", "GGAC接口单次请求耗时(秒), 不含限流等待"
+)
+HTTP_REQUESTS = registry.counter("ggac_http_requests_total", "GGAC接口请求次数")
+HTTP_BYTES = registry.counter("ggac_http_response_bytes_total", "GGAC接口响应字节数")
 
 
 class SortField(str, Enum):
@@ -49,19 +61,56 @@ class RequestError(Exception):
     pass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Category:
-    """分类信息"""
+    """分类信息, 不可修改, 相同的分类在所有作品间共用一个实例"""
 
     id: int
     level: int
     name: str
     code: str
 
+    @classmethod
+    def from_list(cls, data: Optional[list]) -> Tuple["Category", ...]:
+        categories = []
+        for cat in data or ():
+            # 跳过格式错误的分类, 不影响作品本身
+            if not isinstance(cat, dict) or cat.get("id") is None:
+                continue
+            key = (
+                cat["id"],
+                cat.get("level", 0),
+                cat.get("name", ""),
+                cat.get("code", ""),
+            )
+            category = _categories.get(key)
+            if category is None:
+                category = cls(*key)
+                # 分类只有十几种, 上限只是防止异常数据无限增长
+                if len(_categories) < 1024:
+                    _categories[key] = category
+            categories.append(category)
+        return tuple(categories)
 
-@dataclass
+
+_categories: Dict[tuple, Category] = {}
+
+
+def _count(value) -> int:
+    """浏览量、热度等计数, 缺失或格式错误时为0"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass(slots=True)
 class WorkItem:
-    """作品数据模型"""
+    """作品数据模型
+
+    只保留卡片和推送用到的字段, 详情只取mediaList中的图片地址。
+    完整的原始数据(列表项合并详情)只有在keep_raw时才保存在raw中
+    """
 
     id: int
     title: str
@@ -69,53 +118,79 @@ class WorkItem:
     media_category: str
     username: str
     user_avatar: str
-    categories: List[Category]
+    categories: Tuple[Category, ...]
     view_count: int
     hot: int
     create_time: datetime
-    url: str
-    detail: Optional[dict] = None
+    media_urls: Tuple[str, ...] = ()  # 详情中的图片地址, 视频取其封面, 已去重
+    need_login: bool = False  # 详情因未登录没有取到
+    raw: Optional[dict] = None
+
+    @property
+    def url(self) -> str:
+        return f"https://www.ggac.com/work/detail/{self.id}"
+
+    @staticmethod
+    def project_media(media_list: Optional[list]) -> Tuple[str, ...]:
+        """详情mediaList中的图片地址: 图片(type 1)取url, 视频(type 2)取coverUrl"""
+        urls = []
+        for media in media_list or ():
+            if media.get("type") == 1:
+                url = media.get("url")
+            elif media.get("type") == 2:
+                url = media.get("coverUrl")
+            else:
+                continue
+            if url and url not in urls:
+                urls.append(url)
+        return tuple(urls)
 
     @classmethod
-    def from_dict(cls, data: dict) -> "WorkItem":
-        """从API响应数据创建WorkItem实例"""
-        work_id = data["id"]
+    def from_dict(
+        cls, data: dict, detail: Optional[dict] = None, keep_raw: bool = False
+    ) -> "WorkItem":
+        """从API响应数据创建WorkItem实例
+
+        详情中的同名字段优先于列表项, 与详情接口返回的最新数据一致。
+        缺少ID、封面或发布时间时抛出ParseError, 其他字段缺失时使用默认值
+        """
+        detail = detail or {}
+        need_login = detail.get("error") == "need_login"
+        if need_login:
+            detail = {}
+        source = {**data, **detail} if detail else data
+        work_id = require(source, "id")
+        user_info = source.get("userInfo") or {}
 
         try:
-            media_category = data["dictMap"]["mediaCategory"]
+            media_category = source["dictMap"]["mediaCategory"]
         except (KeyError, TypeError):
             media_category = "2D原画"
-            print(
-                f"Warning: Missing mediaCategory for work {work_id}, using default value"
+            logger.warning(
+                "Missing mediaCategory for work %s, using default value", work_id
             )
-
-        # 确保detail永远不会是None
-        detail = data.get("detail", {})
-        if detail is None:
-            detail = {}
+        if isinstance(media_category, str):
+            # 创作类型只有几种, 所有作品共用同一个字符串
+            media_category = sys.intern(media_category)
 
         return cls(
             id=work_id,
-            title=data["title"],
-            cover_url=data["originalCoverUrl"],
+            title=source.get("title") or "",
+            cover_url=require(source, "originalCoverUrl"),
             media_category=media_category,
-            username=data["userInfo"]["username"],
-            user_avatar=data["userInfo"]["avatarUrl"],
-            categories=[
-                Category(
-                    id=cat["id"], level=cat["level"], name=cat["name"], code=cat["code"]
-                )
-                for cat in data["categoryList"]
-            ],
-            view_count=data["viewCount"],
-            hot=data.get("hot", 0),
-            create_time=datetime.strptime(data["createTime"], "%Y-%m-%d %H:%M:%S"),
-            url=f"https://www.ggac.com/work/detail/{work_id}",
-            detail=detail,
+            username=user_info.get("username") or "",
+            user_avatar=user_info.get("avatarUrl") or "",
+            categories=Category.from_list(source.get("categoryList")),
+            view_count=_count(source.get("viewCount")),
+            hot=_count(source.get("hot")),
+            create_time=parse_time(require(source, "createTime")),
+            media_urls=cls.project_media(detail.get("mediaList")),
+            need_login=need_login,
+            raw=source if keep_raw else None,
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ArticleItem:
     """文章数据模型"""
 
@@ -123,31 +198,29 @@ class ArticleItem:
     title: str
     cover_url: str
     username: str
-    categories: List[Category]
+    categories: Tuple[Category, ...]
     view_count: int
     hot: int
     create_time: datetime
-    url: str
+    raw: Optional[dict] = None
+
+    @property
+    def url(self) -> str:
+        return f"https://www.ggac.com/article/detail/{self.id}"
 
     @classmethod
-    def from_dict(cls, data: dict) -> "ArticleItem":
-        """从API响应数据创建ArticleItem实例"""
-        article_id = data["dataId"]
+    def from_dict(cls, data: dict, keep_raw: bool = False) -> "ArticleItem":
+        """从API响应数据创建ArticleItem实例, 缺少ID、封面或发布时间时抛出ParseError"""
         return cls(
-            id=article_id,
-            title=data["title"],
-            cover_url=data["coverUrl"],
-            username=data["userInfo"]["username"],
-            categories=[
-                Category(
-                    id=cat["id"], level=cat["level"], name=cat["name"], code=cat["code"]
-                )
-                for cat in data.get("categoryList", [])
-            ],
-            view_count=data["viewCount"],
-            hot=data.get("hot", 0),
-            create_time=datetime.strptime(data["createTime"], "%Y-%m-%d %H:%M:%S"),
-            url=f"https://www.ggac.com/article/detail/{article_id}",
+            id=require(data, "dataId"),
+            title=data.get("title") or "",
+            cover_url=require(data, "coverUrl"),
+            username=(data.get("userInfo") or {}).get("username") or "",
+            categories=Category.from_list(data.get("categoryList")),
+            view_count=_count(data.get("viewCount")),
+            hot=_count(data.get("hot")),
+            create_time=parse_time(require(data, "createTime")),
+            raw=data if keep_raw else None,
         )
 
 
@@ -155,17 +228,22 @@ class ArticleItem:
 class BaseScraper:
     """基础爬虫类"""
 
+    endpoint = "list"  # 指标中的接口名, 不是dataclass字段
+
     pageNumber: int = 1
     pageSize: int = 48
     sort_field: SortField = SortField.RECOMMENDED
     media_category: Optional[MediaCategory] = None
     base_url: str = "https://www.ggac.com/api"
+    detail_base_url: str = "https://m.ggac.com/api"  # 作品详情使用移动端域名
     max_retries: int = 3
     retry_delay: float = 1.0
     cookies: Optional[dict] = None
     token: Optional[str] = None
     username: Optional[str] = None
     password: Optional[str] = None
+    rate_limiter: Optional[RateLimiter] = None  # 所有爬虫共用的限流器
+    keep_raw: bool = False  # 作品和文章是否保留完整的原始数据
     headers: Optional[dict] = field(
         default_factory=lambda: {
             "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Mobile Safari/537.36 Edg/136.0.0.0",
@@ -185,12 +263,12 @@ class BaseScraper:
         """确保token有效，如果无效或不存在则尝试登录"""
         # 如果没有保存凭据，无法自动登录
         if not self.username or not self.password:
-            print("[WARNING] No credentials stored for auto-login")
+            logger.warning("No credentials stored for auto-login", extra=SAMPLED)
             return False
 
         # 如果没有token，尝试登录
         if not self.token:
-            print("[INFO] No token found, attempting auto-login")
+            logger.info("No token found, attempting auto-login")
             return await self.login(self.username, self.password)
 
         return True
@@ -200,7 +278,7 @@ class BaseScraper:
         # 保存凭据以备后续使用
         self.username = username
         self.password = password
-        login_url = "https://www.ggac.com/api/user/password_login"
+        login_url = f"{self.base_url}/user/password_login"
         login_data = {"account": username, "password": password}
 
         # 登录专用的headers
@@ -221,7 +299,8 @@ class BaseScraper:
             "sec-fetch-site": "same-origin",
         }
 
-        print(f"[DEBUG] 尝试登录: {username}")
+        register_secret(password)
+        logger.debug("尝试登录: %s", username)
 
         async with aiohttp.ClientSession() as session:
             try:
@@ -230,7 +309,8 @@ class BaseScraper:
                 ) as response:
                     if response.status == 200:
                         data = await response.json()
-                        print(f"[DEBUG] 登录响应: {data}")
+                        # 登录响应中包含token, 只记录返回码
+                        logger.debug("登录响应: code=%s", data.get("code"))
 
                         if data.get("code") == "0":
                             # 保存cookies
@@ -241,19 +321,25 @@ class BaseScraper:
 
                             # 保存认证令牌
                             self.token = data.get("data")
+                            register_secret(self.token)
+                            for value in self.cookies.values():
+                                register_secret(value)
 
-                            print(f"[DEBUG] 登录成功，获取到 cookies: {self.cookies}")
-                            print(f"[DEBUG] 登录成功，获取到 token: {self.token}")
+                            logger.info(
+                                "登录成功, 获取到 %d 个cookies和token", len(self.cookies)
+                            )
                             return True
-                    print(f"[ERROR] 登录失败: {await response.text()}")
+                        logger.error("登录失败: %s", data.get("message"))
+                    else:
+                        logger.error("登录失败: HTTP %s", response.status)
                     return False
             except Exception as e:
-                print(f"[ERROR] 登录异常: {e}")
+                logger.error("登录异常: %s", e)
                 return False
 
     async def fetch_with_retry(self, url: str) -> dict:
         """带重试的请求方法"""
-        print(f"\n[DEBUG] Requesting URL: {url}")
+        logger.debug("Requesting URL: %s", url)
         await self.ensure_token()
 
         # 更新请求头，添加认证令牌
@@ -265,28 +351,34 @@ class BaseScraper:
         async with aiohttp.ClientSession(cookies=self.cookies) as session:
             for attempt in range(self.max_retries):
                 try:
-                    async with session.get(
-                        url, ssl=False, headers=request_headers
-                    ) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            print(f"[DEBUG] Response status: {response.status}")
-                            print(
-                                f"[DEBUG] Response data preview: {str(data)[:200]}..."
-                            )
-                            return data
-                        raise RequestError(
-                            f"HTTP {response.status}: {await response.text()}"
+                    if self.rate_limiter:
+                        await self.rate_limiter.acquire()
+                    with HTTP_SECONDS.time(endpoint=self.endpoint):
+                        async with session.get(
+                            url, ssl=False, headers=request_headers
+                        ) as response:
+                            body = await response.read()
+                    HTTP_BYTES.inc(len(body), endpoint=self.endpoint)
+                    if response.status == 200:
+                        data = loads(body)
+                        logger.debug(
+                            "Response status: %s, %d bytes", response.status, len(body)
                         )
+                        HTTP_REQUESTS.inc(endpoint=self.endpoint, result="ok")
+                        return data
+                    raise RequestError(
+                        f"HTTP {response.status}: {body.decode('utf-8', 'replace')}"
+                    )
                 except Exception as e:
-                    print(f"[DEBUG] Request attempt {attempt + 1} failed: {e}")
+                    HTTP_REQUESTS.inc(endpoint=self.endpoint, result="error")
+                    logger.warning("Request attempt %d failed: %s", attempt + 1, e)
                     if attempt == self.max_retries - 1:
                         raise
                     await asyncio.sleep(self.retry_delay * (attempt + 1))
 
     async def get_work_detail(self, url: str) -> dict:
         # 根据作品的链接获取作品详情
-        print(f"[DEBUG] Requesting work detail: {url}")
+        logger.debug("Requesting work detail: %s", url)
         await self.ensure_token()
 
         # 确保引用了正确的域名
@@ -303,41 +395,45 @@ class BaseScraper:
             detail_headers["authorization"] = self.token
             detail_headers["token"] = self.token
         else:
-            print("[WARNING] No token found, detail requests may fail")
+            logger.warning("No token found, detail requests may fail", extra=SAMPLED)
 
         async with aiohttp.ClientSession(cookies=self.cookies) as session:
             for attempt in range(self.max_retries):
                 try:
-                    async with session.get(
-                        url, ssl=False, headers=detail_headers
-                    ) as response:
-                        if response.status == 200:
-                            raw_data = await response.json()
-                            # 检查是否需要登录
-                            if raw_data.get("code") == "430" and "登录" in raw_data.get(
-                                "message", ""
-                            ):
-                                print(
-                                    f"[WARNING] 需要登录才能访问: {raw_data.get('message')}"
-                                )
-                                return {"error": "need_login"}
-
-                            data = raw_data.get("data")
-                            if data is None:
-                                print(
-                                    f"[WARNING] No data in response for {url}: {raw_data}"
-                                )
-                                return {}  # 返回空字典而非None
-                            return data
+                    if self.rate_limiter:
+                        await self.rate_limiter.acquire()
+                    with HTTP_SECONDS.time(endpoint="detail"):
+                        async with session.get(
+                            url, ssl=False, headers=detail_headers
+                        ) as response:
+                            body = await response.read()
+                    HTTP_BYTES.inc(len(body), endpoint="detail")
+                    if response.status == 200:
+                        raw_data = loads(body)
+                        # 检查是否需要登录
+                        if raw_data.get("code") == "430" and "登录" in raw_data.get(
+                            "message", ""
+                        ):
+                            logger.warning("需要登录才能访问: %s", raw_data.get("message"))
+                            HTTP_REQUESTS.inc(endpoint="detail", result="need_login")
+                            return {"error": "need_login"}
+
+                        HTTP_REQUESTS.inc(endpoint="detail", result="ok")
+                        data = raw_data.get("data")
+                        if data is None:
+                            logger.warning("No data in response for %s: %s", url, raw_data)
+                            return {}  # 返回空字典而非None
+                        return data
                     raise RequestError(
-                        f"HTTP {response.status}: {await response.text()}"
+                        f"HTTP {response.status}: {body.decode('utf-8', 'replace')}"
                     )
                 except Exception as e:
-                    print(
-                        f"[WARNING] Failed to get work detail (attempt {attempt+1}): {e}"
+                    HTTP_REQUESTS.inc(endpoint="detail", result="error")
+                    logger.warning(
+                        "Failed to get work detail (attempt %d): %s", attempt + 1, e
                     )
                     if attempt == self.max_retries - 1:
-                        print(f"[ERROR] All attempts failed for {url}")
+                        logger.error("All attempts failed for %s", url)
                         return {}  # 所有尝试失败时返回空字典
                     await asyncio.sleep(self.retry_delay * (attempt + 1))
 
@@ -351,47 +447,80 @@ class BaseScraper:
         url = f"{self.base_url}/work/list?pageNumber={self.pageNumber}&pageSize={self.pageSize}&isPublic=1"
         if self.media_category:
             url += f"&mediaCategory={self.media_category.value}"
-        print(f"[DEBUG] Built URL: {url}")
+        logger.debug("Built URL: %s", url)
         return url
 
     @staticmethod
     def parse_response(response: dict) -> List[dict]:
         """解析响应数据"""
-        print(f"[DEBUG] Response code: {response.get('code')}")
-        print(f"[DEBUG] Response message: {response.get('message')}")
+        logger.debug(
+            "Response code: %s, message: %s", response.get("code"), response.get("message")
+        )
 
         if response.get("code") != "0":
             raise Exception(f"请求失败: {response.get('message')}")
 
-        page_data = response.get("data", {}).get("pageData", [])
-        print(f"[DEBUG] Found {len(page_data)} items in response")
+        page_data = (response.get("data") or {}).get("pageData") or []
+        logger.debug("Found %d items in response", len(page_data))
         return page_data
 
-    async def get_works(self, page: int = 1, size: int = 48) -> List[WorkItem]:
-        """获取作品列表"""
+    @staticmethod
+    def parse_total(response: dict, default: int = 0) -> int:
+        """解析列表响应中的作品总数, 缺失时返回default"""
+        data = response.get("data") or {}
+        for key in ("totalSize", "total", "totalCount"):
+            total = data.get(key)
+            if isinstance(total, int) or (isinstance(total, str) and total.isdigit()):
+                return int(total)
+        return default
+
+    async def get_work_page(
+        self, page: int = 1, size: int = 48
+    ) -> Tuple[List[dict], int]:
+        """只获取一页作品列表, 不请求详情, 返回列表原始数据和作品总数"""
         self.pageNumber = page
         self.pageSize = size
-        response = await self.fetch_data()
+        with span("list", page=page, size=size):
+            response = await self.fetch_data()
         data = self.parse_response(response)
+        return data, self.parse_total(response, default=len(data))
 
-        # 为每个作品构建详情URL，使用m.ggac.com域名
-        for item in data:
-            item["url"] = f"https://m.ggac.com/api/work/detail/{item['id']}"
-
-        # 获取作品详情, 加入进data
-        details = await asyncio.gather(
-            *(self.get_work_detail(item["url"]) for item in data)
+    async def get_works(self, page: int = 1, size: int = 48) -> List[WorkItem]:
+        """获取作品列表"""
+        data, _ = await self.get_work_page(page, size)
+        return await self.hydrate_works(data)
+
+    async def hydrate_works(self, data: List[dict]) -> List[WorkItem]:
+        """为列表中的作品请求详情并转换为WorkItem
+
+        格式错误的作品被跳过并计数, 没有ID的作品不请求详情
+        """
+
+        def listed(item: dict) -> dict:
+            require(item, "id")
+            return item
+
+        data = parse_items(data, listed, "work")
+
+        async def fetch_detail(item: dict) -> dict:
+            # 使用m.ggac.com域名的详情地址
+            url = f"{self.detail_base_url}/work/detail/{item['id']}"
+            with span("detail", work_id=item["id"]):
+                return await self.get_work_detail(url)
+
+        details = await asyncio.gather(*(fetch_detail(item) for item in data))
+        details_by_id = {item["id"]: detail for item, detail in zip(data, details)}
+        works = parse_items(
+            data,
+            lambda item: WorkItem.from_dict(
+                item, details_by_id[item["id"]], keep_raw=self.keep_raw
+            ),
+            "work",
         )
-        for item, detail in zip(data, details):
-            item["detail"] = detail or {}  # 确保detail是字典而不是None
-            if detail:  # 确保detail不是None或空字典
-                # 检查是否需要登录
-                if isinstance(detail, dict) and detail.get("error") == "need_login":
-                    print(f"[ERROR] 无法获取作品 {item['id']} 的详情，需要登录")
-                else:
-                    item.update(detail)
-
-        return [WorkItem.from_dict(item) for item in data]
+        for work in works:
+            if work.need_login:
+                logger.warning("无法获取作品 %s 的详情，需要登录", work.id)
+        return works
 
 
 class FeaturedScraper(BaseScraper):
@@ -423,7 +552,7 @@ class FeaturedScraper(BaseScraper):
         )
         if self.media_category:
             url += f"&mediaCategory={self.media_category.value}"
-        print(f"[DEBUG] Built Featured URL: {url}")
+        logger.debug("Built Featured URL: %s", url)
         return url
 
 
@@ -458,6 +587,8 @@ class CategoryScraper(BaseScraper):
 class ArticleScraper(BaseScraper):
     """文章爬虫"""
 
+    endpoint = "articles"
+
     def __init__(
         self,
         page_number: int = 1,
@@ -478,13 +609,23 @@ class ArticleScraper(BaseScraper):
         """获取文章列表"""
         response = await self.fetch_data()
         data = self.parse_response(response)
-        return [ArticleItem.from_dict(item) for item in data]
+        return parse_items(
+            data, lambda item: ArticleItem.from_dict(item, self.keep_raw), "article"
+        )
 
 
 class GGACScraper:
     """GGAC爬虫管理类"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        rate_limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,  # 替换接口地址, 例如指向本地测试服务器
+        detail_base_url: Optional[str] = None,
+        keep_raw: bool = False,  # 作品和文章保留完整的原始数据, 默认只保留用到的字段
+    ):
+        self.base_url = base_url
+        self.detail_base_url = detail_base_url or base_url
         self.featured = FeaturedScraper()
         self.game = CategoryScraper(CategoryType.GAME)
         self.anime = CategoryScraper(CategoryType.ANIME)
@@ -495,9 +636,30 @@ class GGACScraper:
         self.all = CategoryScraper(CategoryType.ALL)
         self.article = ArticleScraper()
 
+        # 所有爬虫共用一个限流器
+        self.rate_limiter = rate_limiter or RateLimiter()
+        for scraper_name in [
+            "featured",
+            "game",
+            "anime",
+            "movie",
+            "art",
+            "comic",
+            "other",
+            "all",
+            "article",
+        ]:
+            scraper = getattr(self, scraper_name)
+            scraper.rate_limiter = self.rate_limiter
+            scraper.keep_raw = keep_raw
+            if self.base_url:
+                scraper.base_url = self.base_url
+            if self.detail_base_url:
+                scraper.detail_base_url = self.detail_base_url
+
     async def login(self, username: str, password: str) -> bool:
         """登录GGAC网站"""
-        base_scraper = BaseScraper()
+        base_scraper = BaseScraper(base_url=self.featured.base_url)
         success = await base_scraper.login(username, password)
         if success:
             # 更新所有scrapers的cookies和token
@@ -519,14 +681,30 @@ class GGACScraper:
                 scraper.token = token
                 scraper.username = username
                 scraper.password = password
-                print(f"[DEBUG] 更新 {scraper_name} 爬虫的token为: {token}")
-            print("[DEBUG] 已更新所有爬虫的cookies和token")
+            logger.debug("已更新所有爬虫的cookies和token")
         return success
 
     def login_sync(self, username: str, password: str) -> bool:
         """同步方式登录GGAC网站"""
         return asyncio.run(self.login(username, password))
 
+    def scraper_for(self, category: CategoryType) -> "CategoryScraper":
+        """分类对应的爬虫实例"""
+        if category == CategoryType.GAME:
+            return self.game
+        elif category == CategoryType.ANIME:
+            return self.anime
+        elif category == CategoryType.MOVIE:
+            return self.movie
+        elif category == CategoryType.ART:
+            return self.art
+        elif category == CategoryType.COMIC:
+            return self.comic
+        elif category == CategoryType.ANOTHER:
+            return self.other
+        else:  # ALL
+            return self.all
+
     async def get_works_by_category(
         self,
         category: CategoryType,
@@ -537,20 +715,7 @@ class GGACScraper:
     ) -> List[WorkItem]:
         """根据分类获取作品"""
         # 选择合适的已存在爬虫实例
-        if category == CategoryType.GAME:
-            scraper = self.game
-        elif category == CategoryType.ANIME:
-            scraper = self.anime
-        elif category == CategoryType.MOVIE:
-            scraper = self.movie
-        elif category == CategoryType.ART:
-            scraper = self.art
-        elif category == CategoryType.COMIC:
-            scraper = self.comic
-        elif category == CategoryType.ANOTHER:
-            scraper = self.other
-        else:  # ALL
-            scraper = self.all
+        scraper = self.scraper_for(category)
 
         # 更新爬虫参数
         scraper.pageNumber = page
@@ -558,7 +723,7 @@ class GGACScraper:
         scraper.sort_field = sort_field
         scraper.media_category = media_category
 
-        return await scraper.get_works()
+        return await scraper.get_works(page, size)
 
     async def get_featured_works(
         self,
@@ -574,7 +739,7 @@ class GGACScraper:
         self.featured.sort_field = sort_field
         self.featured.media_category = media_category
 
-        return await self.featured.get_works()
+        return await self.featured.get_works(page, size)
 
     async def get_articles(
         self,
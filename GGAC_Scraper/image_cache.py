@@ -0,0 +1,182 @@
+import os
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+from io import BytesIO
+from PIL import Image
+from .log import logger, SAMPLED
+
+
+class ImageCache:
+    """两级图片缓存
+
+    - 内存层: 已解码且已缩小的图片, LRU, 按总像素数限制
+    - 磁盘层: 原始图片字节, 以URL哈希为文件名, LRU, 按总字节数限制
+
+    缓存中的图片对象是共享的, 调用方只能读取, 需要修改时请先 copy()
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_memory_pixels: int = 20_000_000,  # 约80MB的RGBA数据
+        max_disk_bytes: int = 200 * 1024 * 1024,
+    ):
+        self.max_memory_pixels = max_memory_pixels
+        self.max_disk_bytes = max_disk_bytes
+
+        # (url, max_width) -> Image
+        self._memory: "OrderedDict[Tuple[str, int], Image.Image]" = OrderedDict()
+        self._memory_pixels = 0
+
+        # 文件名 -> 字节数, 按最近使用排序
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._scan_disk()
+
+        self.hits = {"memory": 0, "disk": 0, "miss": 0}
+
+    @staticmethod
+    def _url_key(url: str) -> str:
+        """URL对应的磁盘文件名"""
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _scan_disk(self):
+        """启动时扫描磁盘缓存, 按修改时间重建LRU顺序"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """淘汰最久未使用的磁盘缓存, 直到总大小不超过预算"""
+        while self._disk and self._disk_bytes > self.max_disk_bytes:
+            name, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self.cache_dir / name)
+            except OSError:
+                pass
+
+    def _evict_memory(self):
+        """淘汰最久未使用的内存缓存, 直到总像素数不超过预算"""
+        while self._memory and self._memory_pixels > self.max_memory_pixels:
+            _, image = self._memory.popitem(last=False)
+            self._memory_pixels -= image.width * image.height
+
+    def get_image(self, url: str, max_width: int) -> Optional[Image.Image]:
+        """从内存层获取已解码的图片"""
+        key = (url, max_width)
+        image = self._memory.get(key)
+        if image is not None:
+            self._memory.move_to_end(key)
+            self.hits["memory"] += 1
+        return image
+
+    def put_image(self, url: str, max_width: int, image: Image.Image):
+        """放入内存层"""
+        pixels = image.width * image.height
+        if pixels > self.max_memory_pixels:
+            return
+        key = (url, max_width)
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_pixels -= old.width * old.height
+        self._memory[key] = image
+        self._memory_pixels += pixels
+        self._evict_memory()
+
+    def get_bytes(self, url: str) -> Optional[bytes]:
+        """从磁盘层获取原始字节"""
+        if not self.cache_dir:
+            return None
+        name = self._url_key(url)
+        if name not in self._disk:
+            self.hits["miss"] += 1
+            return None
+        path = self.cache_dir / name
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self._disk_bytes -= self._disk.pop(name)
+            self.hits["miss"] += 1
+            return None
+        self._disk.move_to_end(name)
+        self.hits["disk"] += 1
+        return data
+
+    def put_bytes(self, url: str, data: bytes):
+        """写入磁盘层"""
+        if not self.cache_dir or len(data) > self.max_disk_bytes:
+            return
+        name = self._url_key(url)
+        try:
+            with open(self.cache_dir / name, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            logger.warning("写入图片缓存失败: %s", e, extra=SAMPLED)
+            return
+        old = self._disk.pop(name, None)
+        if old is not None:
+            self._disk_bytes -= old
+        self._disk[name] = len(data)
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    @staticmethod
+    def open(data: bytes, max_width: int) -> Image.Image:
+        """只读取图片头, 对JPEG设置解码时降采样, 返回尚未解码的图片
+
+        返回图片的size即为实际解码的尺寸, 可用于申请内存额度
+        """
+        image = Image.open(BytesIO(data))
+        if image.width > max_width:
+            height = max(1, int(image.height * max_width / image.width))
+            # 利用JPEG的draft模式在解码时直接降采样
+            image.draft("RGB", (max_width, height))
+        return image
+
+    @staticmethod
+    def finish(image: Image.Image, max_width: int) -> Image.Image:
+        """解码open返回的图片并缩小到不超过max_width的宽度
+
+        没有透明通道的图片解码为RGB, 省去后续处理中的alpha运算
+        """
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        mode = "RGBA" if has_alpha else "RGB"
+        if image.mode == mode:
+            # 模式相同时convert会多复制一份, 直接解码即可
+            image.load()
+        else:
+            image = image.convert(mode)
+        if image.width > max_width:
+            height = max(1, int(image.height * max_width / image.width))
+            image = image.resize((max_width, height), Image.LANCZOS, reducing_gap=3.0)
+        return image
+
+    @classmethod
+    def decode(cls, data: bytes, max_width: int) -> Image.Image:
+        """解码图片并缩小到不超过max_width的宽度"""
+        return cls.finish(cls.open(data, max_width), max_width)
+
+    def stats(self) -> dict:
+        """缓存使用情况"""
+        return {
+            "memory_items": len(self._memory),
+            "memory_pixels": self._memory_pixels,
+            "disk_items": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            **self.hits,
+        }
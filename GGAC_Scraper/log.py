@@ -0,0 +1,103 @@
+import sys
+import time
+import logging
+from typing import Dict, Set
+
+# 挂在astrbot日志下, 在插件中运行时沿用astrbot的输出格式和处理器
+logger = logging.getLogger("astrbot.ggac")
+
+# 登录时登记的token、密码等, 任何级别的日志中都会被替换为***
+_secrets: Set[str] = set()
+
+
+def register_secret(value) -> None:
+    """登记不能出现在日志中的值"""
+    if value and len(str(value)) >= 4:
+        _secrets.add(str(value))
+
+
+class RedactFilter(logging.Filter):
+    """把日志中出现的已登记敏感值替换为***
+
+    需要格式化日志才能检查, 因此排在采样之后, 只处理确实会输出的日志
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not _secrets:
+            return True
+        message = record.getMessage()
+        redacted = message
+        for secret in _secrets:
+            redacted = redacted.replace(secret, "***")
+        if redacted != message:
+            record.msg, record.args = redacted, None
+        return True
+
+
+# 需要采样的INFO/WARNING日志在调用时传入extra=SAMPLED
+SAMPLED = {"sampled": True}
+
+
+class SamplingFilter(logging.Filter):
+    """限制重复日志的数量
+
+    按日志的格式字符串(未格式化的msg)计数, 每个时间窗口内同一条日志最多输出
+    burst次, 超出的被丢弃, 下一个窗口输出的第一条附带被省略的条数。
+    只采样DEBUG日志和标记了SAMPLED的高频日志(如每个请求都会出现的未登录警告),
+    新作品、重试等逐条有意义的INFO/WARNING日志以及ERROR不受限制
+    """
+
+    def __init__(self, burst: int = 5, window: float = 60.0):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        # 格式字符串 -> [窗口开始时间, 窗口内条数, 被省略的条数]
+        self._counts: Dict[str, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.levelno >= logging.ERROR:
+            return True
+        if record.levelno > logging.DEBUG and not getattr(record, "sampled", False):
+            return True
+        now = time.monotonic()
+        key = str(record.msg)
+        entry = self._counts.get(key)
+        if entry is None or now - entry[0] >= self.window:
+            suppressed = entry[2] if entry else 0
+            self._counts[key] = [now, 1, 0]
+            if len(self._counts) > 1024:
+                # 清理已过期的窗口, 避免格式字符串无限增多
+                self._counts = {
+                    k: v for k, v in self._counts.items() if now - v[0] < self.window
+                }
+            if suppressed:
+                record.msg = f"{record.msg} (前{self.window:.0f}秒内省略{suppressed}条相同日志)"
+            return True
+        entry[1] += 1
+        if entry[1] <= self.burst:
+            return True
+        entry[2] += 1
+        return False
+
+
+# 过滤器按添加顺序执行: 先按格式字符串采样, 再对留下的日志脱敏
+sampling_filter = SamplingFilter()
+logger.addFilter(sampling_filter)
+logger.addFilter(RedactFilter())
+
+
+def configure_logging(level: str = "INFO", burst: int = 5, window: float = 60.0):
+    """设置日志级别和重复日志的采样
+
+    没有astrbot的日志处理器时(单独运行脚本), 输出到标准输出
+    """
+    logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    sampling_filter.burst = burst
+    sampling_filter.window = window
+    if not logger.hasHandlers():
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+        logger.addHandler(handler)
+
+
+configure_logging()
@@ -0,0 +1,155 @@
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+from .metrics import registry
+from .log import logger, SAMPLED
+
+# 事件循环延迟的分桶上界(秒), 比默认分桶更细
+LAG_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "ggac_loop_lag_seconds", "事件循环的调度延迟(秒)", buckets=LAG_BUCKETS
+)
+LOOP_STALLS = registry.counter(
+    "ggac_loop_stalls_total", "事件循环延迟超过阈值的次数, 按阻塞的插件函数"
+)
+LOOP_STALL_SECONDS = registry.counter(
+    "ggac_loop_stall_seconds_total", "事件循环被阻塞的累计时间(秒), 按阻塞的插件函数"
+)
+
+# 插件目录, 阻塞时的调用栈中位于该目录下的最内层函数即为归属
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+
+UNATTRIBUTED = "插件外"
+UNCAPTURED = "未捕获"
+
+
+class LoopLagMonitor:
+    """持续测量事件循环的调度延迟, 并找出阻塞事件循环的插件函数
+
+    循环内的采样任务每隔interval秒醒来一次, 实际醒来时间与预期的差即为延迟。
+    另有一个守护线程检查采样任务的心跳, 心跳超过threshold秒未更新时,
+    说明有回调正在阻塞事件循环, 立即抓取事件循环线程的调用栈,
+    归属到栈中最内层的插件函数
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.1,
+        recent: int = 20,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        # 最近的卡顿: {"time", "seconds", "function", "stack"}
+        self.recent = deque(maxlen=recent)
+        # 函数 -> [次数, 累计秒数, 最长秒数]
+        self.attributions: Dict[str, list] = {}
+        self._last_tick = time.monotonic()
+        self._captured_tick: Optional[float] = None
+        self._pending: Optional[dict] = None
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    async def run(self):
+        """在事件循环中运行, 取消时停止守护线程"""
+        if self.threshold <= 0:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="ggac-loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+        try:
+            while True:
+                start = time.monotonic()
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self._last_tick = now
+                lag = max(0.0, now - start - self.interval)
+                LOOP_LAG_SECONDS.observe(lag)
+                if lag > self.threshold:
+                    self._record_stall(lag)
+        finally:
+            self._stop.set()
+
+    def stop(self):
+        """停止守护线程, 采样任务应先被取消"""
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    def _watch(self):
+        """守护线程: 心跳过期时抓取事件循环线程当前的调用栈, 每次卡顿只抓一次"""
+        while not self._stop.wait(min(self.interval, self.threshold) / 2):
+            last_tick = self._last_tick
+            if last_tick == self._captured_tick:
+                continue
+            if time.monotonic() - last_tick <= self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self._captured_tick = last_tick
+            self._pending = self._attribute(frame)
+            del frame
+
+    @staticmethod
+    def _attribute(frame) -> dict:
+        """取调用栈中最内层的插件函数, 跳过本模块"""
+        stack = traceback.extract_stack(frame)
+        function = None
+        for entry in reversed(stack):
+            path = Path(entry.filename)
+            if path.name == Path(__file__).name or PLUGIN_DIR not in path.parents:
+                continue
+            function = f"{path.relative_to(PLUGIN_DIR).as_posix()}:{entry.name}"
+            break
+        if function is None:
+            innermost = stack[-1] if stack else None
+            function = (
+                f"{UNATTRIBUTED}({Path(innermost.filename).name}:{innermost.name})"
+                if innermost
+                else UNATTRIBUTED
+            )
+        return {
+            "function": function,
+            "stack": [
+                f"{Path(entry.filename).name}:{entry.lineno} {entry.name}"
+                for entry in stack[-8:]
+            ],
+        }
+
+    def _record_stall(self, lag: float):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            # 阻塞结束得太快, 守护线程没来得及抓取
+            pending = {"function": UNCAPTURED, "stack": []}
+        function = pending["function"]
+        LOOP_STALLS.inc(function=function)
+        LOOP_STALL_SECONDS.inc(lag, function=function)
+        entry = self.attributions.setdefault(function, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += lag
+        entry[2] = max(entry[2], lag)
+        self.recent.append({"time": time.time(), "seconds": lag, **pending})
+        logger.warning(
+            "事件循环被阻塞 %.0fms: %s", lag * 1000, function, extra=SAMPLED
+        )
+        logger.debug("阻塞时的调用栈:\n%s", "\n".join(pending["stack"]))
+
+    def top(self, limit: int = 3) -> List[tuple]:
+        """累计阻塞时间最长的函数: [(函数, 次数, 累计秒数, 最长秒数), ...]"""
+        rows = sorted(self.attributions.items(), key=lambda item: item[1][1], reverse=True)
+        return [(function, *entry) for function, entry in rows[:limit]]
@@ -0,0 +1,193 @@
+import os
+import time
+import bisect
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from .log import logger, SAMPLED
+
+# 默认的耗时分桶上界(秒), 覆盖从单次缓存命中到整轮检查的范围
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _label_key(labels: dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """只增不减的计数, 按标签分别计数"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(_label_key(labels), 0)
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def render(self) -> list:
+        return [
+            f"{self.name}{_format_labels(key)} {value:g}"
+            for key, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    """可以任意设置的当前值"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[_label_key(labels)] = value
+
+
+class Histogram:
+    """固定分桶的耗时直方图, 占用内存与样本数无关
+
+    分位数由所在分桶线性插值估计, 精度取决于分桶的粒度
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各分桶计数(最后一个为+Inf), 总和]
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, seconds: float, **labels):
+        key = _label_key(labels)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        entry[1] += seconds
+
+    @contextmanager
+    def time(self, **labels):
+        """记录代码块的耗时, 出错时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _merged(self, labels: Optional[dict]) -> Tuple[list, float]:
+        """指定标签的计数, 未指定时合并所有标签"""
+        if labels is not None:
+            entry = self.values.get(_label_key(labels))
+            return (entry[0], entry[1]) if entry else ([], 0.0)
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for bucket_counts, bucket_sum in self.values.values():
+            counts = [a + b for a, b in zip(counts, bucket_counts)]
+            total += bucket_sum
+        return counts, total
+
+    def count(self, **labels) -> int:
+        counts, _ = self._merged(labels or None)
+        return sum(counts)
+
+    def quantile(self, q: float, **labels) -> float:
+        """估计q分位数(秒), 没有样本时为0; 落在最后一个分桶时返回其下界"""
+        counts, _ = self._merged(labels or None)
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def render(self) -> list:
+        lines = []
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (None,), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound is None else f"{bound:g}"
+                labels = _format_labels(key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """进程内的指标注册表
+
+    各模块在导入时注册自己的指标, 同名指标只创建一次。
+    可以导出为Prometheus文本格式, 供node_exporter的textfile收集器读取
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def _get(self, cls, name: str, help: str, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, help, **kwargs)
+        elif type(metric) is not cls:
+            raise ValueError(f"指标 {name} 已注册为 {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        """Prometheus文本格式"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """先写临时文件再替换, 收集器不会读到写了一半的文件"""
+        path = Path(path)
+        temp_file = path.with_suffix(".tmp")
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(self.render_prometheus())
+            os.replace(temp_file, path)
+        except OSError as e:
+            logger.warning("写入指标文件失败: %s", e, extra=SAMPLED)
+
+
+# 插件共用的注册表
+registry = MetricsRegistry()
@@ -0,0 +1,153 @@
+import colorsys
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # numpy不可用时不提取配色
+    np = None
+
+
+class PaletteExtractor:
+    """从封面提取主色和强调色
+
+    在缩略图上用numpy向量化的k-means聚类, 结果按键缓存。主色和强调色
+    压暗到在白色背景上清晰可读, 用于绘制分隔条和类别文字;
+    底纹颜色由主色归档到色相x明度的网格上
+    """
+
+    PATTERNS = ("dots", "lines", "circles", "grid")
+    # 12个色相 x 2档明度, 加上2档灰色, 共26种底纹颜色
+    HUE_STEPS = 12
+    VALUE_LEVELS = (0.45, 0.8)
+    # 在白色背景上可读的最大相对亮度, 约为4.5:1的对比度
+    MAX_LUMINANCE = 0.18
+
+    def __init__(
+        self,
+        clusters: int = 5,
+        iterations: int = 8,
+        thumbnail_size: int = 32,
+        max_entries: int = 512,
+    ):
+        self.clusters = clusters
+        self.iterations = iterations
+        self.thumbnail_size = thumbnail_size
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Hashable, dict]" = OrderedDict()
+
+    @staticmethod
+    def _to_hex(color) -> str:
+        r, g, b = (int(max(0, min(255, round(float(c))))) for c in color)
+        return f"#{r:02x}{g:02x}{b:02x}"
+
+    def _kmeans(self, pixels) -> Tuple["np.ndarray", "np.ndarray"]:
+        """返回聚类中心和每个中心的像素数"""
+        # 按亮度分位数初始化中心, 保证结果可复现
+        luminance = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        order = np.argsort(luminance)
+        picks = np.linspace(0, len(pixels) - 1, self.clusters).astype(int)
+        centers = pixels[order[picks]].copy()
+
+        squared_norms = (pixels**2).sum(axis=1, keepdims=True)
+        cluster_ids = np.arange(self.clusters)
+        labels = None
+        for _ in range(self.iterations):
+            # |p - c|^2 = |p|^2 - 2p·c + |c|^2, 用矩阵乘法代替逐对相减
+            distances = (
+                squared_norms - 2 * pixels @ centers.T + (centers**2).sum(axis=1)
+            )
+            new_labels = distances.argmin(axis=1)
+            if labels is not None and np.array_equal(labels, new_labels):
+                break
+            labels = new_labels
+            one_hot = (labels[:, None] == cluster_ids).astype(np.float32)
+            counts = one_hot.sum(axis=0)
+            filled = counts > 0
+            centers[filled] = (one_hot.T @ pixels)[filled] / counts[filled, None]
+        counts = np.bincount(labels, minlength=self.clusters)
+        return centers, counts
+
+    def extract(self, image: Image.Image) -> Optional[Tuple[str, str]]:
+        """提取 (主色, 强调色), numpy不可用时返回None"""
+        if np is None:
+            return None
+        # 先缩小再转换模式, 避免复制整张大图
+        thumbnail = image.resize(
+            (self.thumbnail_size, self.thumbnail_size),
+            Image.BILINEAR,
+            reducing_gap=2.0,
+        ).convert("RGB")
+        pixels = np.asarray(thumbnail, dtype=np.float32).reshape(-1, 3)
+        centers, counts = self._kmeans(pixels)
+
+        dominant = int(counts.argmax())
+        # 强调色: 占比不太小的簇中饱和度最高且与主色不同的颜色
+        best, best_score = dominant, -1.0
+        for i in range(self.clusters):
+            if i == dominant or counts[i] < len(pixels) * 0.05:
+                continue
+            r, g, b = centers[i] / 255.0
+            _, saturation, value = colorsys.rgb_to_hsv(r, g, b)
+            score = saturation * value
+            if score > best_score:
+                best, best_score = i, score
+        return self._to_hex(centers[dominant]), self._to_hex(centers[best])
+
+    @classmethod
+    def _readable(cls, color: str) -> str:
+        """按比例压暗颜色, 直到在白色背景上清晰可读"""
+        rgb = [int(color[i : i + 2], 16) / 255 for i in (1, 3, 5)]
+
+        def luminance(channels) -> float:
+            linear = [
+                c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+                for c in channels
+            ]
+            return 0.2126 * linear[0] + 0.7152 * linear[1] + 0.0722 * linear[2]
+
+        while luminance(rgb) > cls.MAX_LUMINANCE:
+            rgb = [c * 0.9 for c in rgb]
+        return cls._to_hex(c * 255 for c in rgb)
+
+    def _quantize(self, color: str) -> Tuple[str, int]:
+        """把颜色归到色相x明度的网格上, 返回 (网格颜色, 色相档位)
+
+        底纹颜色是底纹图块缓存键的一部分, 每个封面的精确主色都不同,
+        归档后所有封面只对应少数几种图块。底纹只以很低的不透明度混合,
+        归档带来的色差看不出来。低饱和度的颜色归为灰色, 色相档位为-1
+        """
+        r, g, b = (int(color[i : i + 2], 16) / 255 for i in (1, 3, 5))
+        hue, saturation, value = colorsys.rgb_to_hsv(r, g, b)
+        levels = self.VALUE_LEVELS
+        level = levels[min(int(value * len(levels)), len(levels) - 1)]
+        if saturation < 0.15:
+            return self._to_hex((level * 255,) * 3), -1
+        step = round(hue * self.HUE_STEPS) % self.HUE_STEPS
+        rgb = colorsys.hsv_to_rgb(step / self.HUE_STEPS, 0.6, level)
+        return self._to_hex(c * 255 for c in rgb), step
+
+    def theme(self, key: Hashable, image: Image.Image) -> Optional[dict]:
+        """根据封面生成主题, 结果按key缓存"""
+        theme = self._cache.get(key)
+        if theme is not None:
+            self._cache.move_to_end(key)
+            return theme
+
+        palette = self.extract(image)
+        if palette is None:
+            return None
+        primary, accent = palette
+        pattern_color, step = self._quantize(primary)
+        theme = {
+            "primary": self._readable(primary),
+            "accent": self._readable(accent),
+            "pattern_color": pattern_color,
+            # 按主色色相选择底纹, 同一封面总是得到相同的底纹
+            "pattern": self.PATTERNS[max(step, 0) % len(self.PATTERNS)],
+        }
+        self._cache[key] = theme
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return theme
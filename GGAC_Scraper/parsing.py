@@ -0,0 +1,70 @@
+import json
+from datetime import datetime
+from typing import Callable, Iterable, List, TypeVar
+from .metrics import registry
+from .log import logger
+
+try:
+    import orjson
+except ImportError:  # orjson不可用时使用标准库解析
+    orjson = None
+
+PARSE_SKIPPED = registry.counter(
+    "ggac_parse_skipped_total", "格式错误被跳过的列表项, 按类型(work/article)和原因"
+)
+
+T = TypeVar("T")
+
+KIND_NAMES = {"work": "作品", "article": "文章"}
+
+
+class ParseError(ValueError):
+    """列表项缺少必需的字段或字段格式错误"""
+
+
+def loads(data):
+    """解析JSON响应, 安装了orjson时使用orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def parse_time(value: str) -> datetime:
+    """解析 "YYYY-MM-DD HH:MM:SS" 格式的时间
+
+    格式固定时交给C实现的fromisoformat, 比strptime快一个数量级;
+    其他格式退回strptime, 不能解析时抛出ValueError
+    """
+    if len(value) == 19 and value[4] == "-" and value[10] == " ":
+        return datetime.fromisoformat(value)
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+
+
+def require(data: dict, key: str):
+    """取必需的字段, 缺失或为空时抛出ParseError"""
+    value = data.get(key)
+    if value is None or value == "":
+        raise ParseError(f"缺少字段 {key}")
+    return value
+
+
+def parse_items(
+    items: Iterable[dict], parse: Callable[[dict], T], kind: str
+) -> List[T]:
+    """逐项转换列表数据, 格式错误的项被跳过并计数, 不影响同一页的其他项"""
+    results = []
+    for item in items:
+        try:
+            results.append(parse(item))
+        except (ParseError, KeyError, TypeError, ValueError, AttributeError) as e:
+            reason = type(e).__name__
+            PARSE_SKIPPED.inc(kind=kind, reason=reason)
+            item_id = item.get("id") if isinstance(item, dict) else None
+            logger.warning(
+                "跳过格式错误的%s %s: %s: %s",
+                KIND_NAMES.get(kind, kind),
+                item_id,
+                reason,
+                e,
+            )
+    return results
@@ -0,0 +1,95 @@
+import asyncio
+
+
+class ImageTooLargeError(Exception):
+    """图片像素数超过单张上限"""
+
+    pass
+
+
+class PixelBudget:
+    """已解码像素的全局预算
+
+    解码和绘制前先申请像素额度, 额度用尽时新的解码需要等待,
+    以限制同时驻留在内存中的图片总量
+    """
+
+    def __init__(self, max_pixels: int):
+        self.max_pixels = max_pixels
+        self.in_use = 0
+        self.peak = 0
+        self.waiting = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, pixels: int) -> int:
+        """申请额度, 返回实际占用的像素数
+
+        超过总预算的申请按总预算计算, 在没有其他占用时放行
+        """
+        pixels = min(pixels, self.max_pixels)
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(
+                    lambda: self.in_use == 0
+                    or self.in_use + pixels <= self.max_pixels
+                )
+            finally:
+                self.waiting -= 1
+            self._grant(pixels)
+        return pixels
+
+    def _grant(self, pixels: int):
+        self.in_use += pixels
+        self.peak = max(self.peak, self.in_use)
+
+    async def release(self, pixels: int):
+        """归还额度并唤醒等待者"""
+        async with self._condition:
+            self.in_use -= pixels
+            self._condition.notify_all()
+
+    def lease(self) -> "PixelLease":
+        """创建一次绘制使用的额度租约"""
+        return PixelLease(self)
+
+    def stats(self) -> dict:
+        """预算使用情况"""
+        return {
+            "in_use": self.in_use,
+            "peak": self.peak,
+            "max": self.max_pixels,
+            "waiting": self.waiting,
+        }
+
+
+class PixelLease:
+    """一张卡片的像素额度
+
+    只有第一次申请会等待, 已持有额度的租约追加申请时直接放行,
+    避免持有部分额度的任务互相等待造成死锁。退出时归还全部额度
+    """
+
+    def __init__(self, budget: PixelBudget):
+        self.budget = budget
+        self.pixels = 0
+
+    @property
+    def held(self) -> bool:
+        return self.pixels > 0
+
+    async def acquire(self, pixels: int):
+        if self.held:
+            pixels = min(pixels, self.budget.max_pixels)
+            self.budget._grant(pixels)
+            self.pixels += pixels
+        else:
+            self.pixels += await self.budget.acquire(pixels)
+
+    async def __aenter__(self) -> "PixelLease":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.pixels:
+            await self.budget.release(self.pixels)
+            self.pixels = 0
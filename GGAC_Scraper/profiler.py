@@ -0,0 +1,177 @@
+import io
+import os
+import time
+import asyncio
+import cProfile
+import pstats
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from .log import logger
+
+
+class ProfilerBusyError(Exception):
+    """已经有一次分析在进行"""
+
+
+class Profiler:
+    """按需开启的性能分析
+
+    在指定的秒数或检查周期数内开启cProfile和tracemalloc, 结束后把pstats、
+    耗时报告和内存分配差异写入输出目录。未在分析时不安装任何钩子,
+    检查周期结束时只有一次属性判断
+    """
+
+    def __init__(self, output_dir: str, keep: int = 5):
+        self.output_dir = Path(output_dir)
+        self.keep = keep  # 保留最近几次分析的结果
+        self.active = False
+        self._cycles_left = 0
+        self._cycles_done: Optional[asyncio.Event] = None
+
+    def cycle_finished(self):
+        """每个检查周期结束时调用, 用于按周期数分析"""
+        if not self.active or self._cycles_done is None:
+            return
+        self._cycles_left -= 1
+        if self._cycles_left <= 0:
+            self._cycles_done.set()
+
+    async def run(
+        self,
+        seconds: Optional[float] = None,
+        cycles: Optional[int] = None,
+        timeout: float = 3600,
+    ) -> dict:
+        """分析接下来的seconds秒或cycles个检查周期(最长timeout秒)
+
+        返回 {"pstats": 文件, "report": 文件, "hotspots": 自身耗时最多的函数,
+        "allocations": 内存增长最多的代码行, "seconds": 实际时长, "cycles": 完成的周期数}
+        """
+        if self.active:
+            raise ProfilerBusyError("已经在进行性能分析")
+        self.active = True
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        profile = cProfile.Profile()
+        snapshot_before = tracemalloc.take_snapshot()
+        start = time.monotonic()
+        if cycles:
+            self._cycles_left = cycles
+            self._cycles_done = asyncio.Event()
+        profile.enable()
+        try:
+            try:
+                if cycles:
+                    try:
+                        await asyncio.wait_for(self._cycles_done.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        logger.warning("性能分析超时, 只完成了部分检查周期")
+                else:
+                    await asyncio.sleep(seconds or 0)
+            finally:
+                profile.disable()
+            elapsed = time.monotonic() - start
+            cycles_done = (cycles - max(self._cycles_left, 0)) if cycles else None
+
+            # 内存快照的比较、pstats排序和写文件在长时间分析后可能耗时数秒,
+            # 在线程中进行, 不阻塞事件循环
+            snapshot_after, peak = await asyncio.to_thread(self._snapshot)
+            return await asyncio.to_thread(
+                self._write_reports,
+                profile,
+                snapshot_before,
+                snapshot_after,
+                peak,
+                elapsed,
+                cycles_done,
+            )
+        finally:
+            if started_tracemalloc and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self.active = False
+            self._cycles_done = None
+
+    @staticmethod
+    def _snapshot() -> tuple:
+        """(内存快照, 分析期间的内存峰值)"""
+        return tracemalloc.take_snapshot(), tracemalloc.get_traced_memory()[1]
+
+    def _write_reports(
+        self, profile, snapshot_before, snapshot_after, peak, elapsed, cycles_done
+    ) -> dict:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        name = datetime.now().strftime("profile_%Y%m%d_%H%M%S")
+        pstats_file = self.output_dir / f"{name}.pstats"
+        report_file = self.output_dir / f"{name}.txt"
+        profile.dump_stats(str(pstats_file))
+
+        stats = pstats.Stats(profile)
+        hotspots = self._hotspots(stats, 15)
+        # 忽略tracemalloc自身和分析代码的分配
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ]
+        allocations = snapshot_after.filter_traces(filters).compare_to(
+            snapshot_before.filter_traces(filters), "lineno"
+        )[:30]
+
+        stream = io.StringIO()
+        stream.write(f"分析时长: {elapsed:.1f}秒")
+        if cycles_done is not None:
+            stream.write(f", 检查周期: {cycles_done}")
+        stream.write(f"\n分析期间内存峰值: {peak / 1024 / 1024:.1f}MB\n\n")
+        stream.write("== 自身耗时最多的函数 ==\n")
+        stream.write("\n".join(hotspots) + "\n\n")
+        stream.write("== 内存增长最多的代码行 ==\n")
+        stream.write("\n".join(str(stat) for stat in allocations) + "\n\n")
+        stream.write("== 按累计耗时排序 ==\n")
+        stats.stream = stream
+        stats.sort_stats("cumulative").print_stats(50)
+        with open(report_file, "w", encoding="utf-8") as f:
+            f.write(stream.getvalue())
+
+        self._remove_old_reports()
+        logger.info("性能分析结果已写入 %s", report_file)
+        return {
+            "pstats": str(pstats_file),
+            "report": str(report_file),
+            "hotspots": hotspots,
+            "allocations": [str(stat) for stat in allocations[:5]],
+            "seconds": elapsed,
+            "cycles": cycles_done,
+        }
+
+    @staticmethod
+    def _hotspots(stats: pstats.Stats, limit: int) -> List[str]:
+        """按自身耗时排序的前limit个函数, 每行: 自身耗时 累计耗时 调用次数 位置"""
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        lines = []
+        for (filename, line, function), (_, calls, self_time, cumulative, _) in rows[
+            :limit
+        ]:
+            # 内置函数没有文件和行号
+            location = (
+                f"{Path(filename).parent.name}/{Path(filename).name}:{line}({function})"
+                if line
+                else function
+            )
+            lines.append(
+                f"{self_time * 1000:>8.1f}ms {cumulative * 1000:>8.1f}ms "
+                f"{calls:>7}次  {location}"
+            )
+        return lines
+
+    def _remove_old_reports(self):
+        reports = sorted(self.output_dir.glob("profile_*.pstats"))
+        for old in reports[: max(0, len(reports) - self.keep)]:
+            for path in (old, old.with_suffix(".txt")):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
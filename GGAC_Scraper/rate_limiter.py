@@ -0,0 +1,40 @@
+import asyncio
+import time
+from .scheduler import PriorityScheduler
+
+
+class RateLimiter:
+    """令牌桶限流器
+
+    所有爬虫实例共用一个限流器, 每次HTTP请求前取一个令牌。
+    令牌按rate个/秒恢复, 最多积累burst个, 因此短时间的突发请求
+    (例如一页作品的详情)可以立即发出, 持续请求则被限制在rate以内。
+    令牌不足时请求按优先级排队, 用户命令的请求先于后台请求取得令牌
+    """
+
+    def __init__(self, rate: float = 8.0, burst: int = 25):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self.queue = PriorityScheduler(concurrency=1)
+        self.waited = 0.0  # 累计等待时间(秒)
+
+    async def acquire(self):
+        """取一个令牌, 不足时等待; rate不大于0时不限流"""
+        if self.rate <= 0:
+            return
+        async with self.queue.slot():
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waited += delay
+                # 占着槽位等待, 其余请求按优先级排队
+                await asyncio.sleep(delay)
+                self._tokens = 1.0
+                self._updated = time.monotonic()
+            self._tokens -= 1
@@ -0,0 +1,137 @@
+import time
+import asyncio
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Optional
+
+
+class Priority(IntEnum):
+    """任务优先级, 数值越小越优先"""
+
+    INTERACTIVE = 0  # 用户命令
+    POLLING = 1  # 定时检查更新
+    BACKGROUND = 2  # 预热、补充等后台任务
+
+
+# 当前任务的优先级, 由调用方在入口处设置, 新建的任务会继承
+current_priority: ContextVar[Priority] = ContextVar(
+    "ggac_priority", default=Priority.POLLING
+)
+
+
+@contextmanager
+def scheduling_priority(priority: Priority):
+    """在代码块内以指定优先级发出请求和渲染"""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class LatencyStats:
+    """保留最近的若干个耗时样本, 计算分位数"""
+
+    def __init__(self, max_samples: int = 512):
+        self._samples = deque(maxlen=max_samples)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, p: float) -> float:
+        """最近样本的p分位数(秒), 没有样本时为0"""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def stats(self) -> dict:
+        """次数和以毫秒计的p50/p95/最大值"""
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "max_ms": max(self._samples, default=0.0) * 1000,
+        }
+
+
+class PriorityScheduler:
+    """按优先级分配的并发槽位
+
+    槽位用尽时等待者按优先级排队, 同优先级先到先得。等待时间每满aging秒,
+    等效优先级提高一级, 后台任务在持续的高优先级请求下也不会一直等待。
+    按优先级记录排队等待时间
+    """
+
+    def __init__(self, concurrency: int = 1, aging: float = 5.0):
+        self.concurrency = max(1, concurrency)
+        self.aging = aging
+        self.active = 0
+        # 等待者: [优先级, 序号, 入队时间, future]
+        self._waiters = []
+        self._sequence = itertools.count()
+        self.wait_latency: Dict[Priority, LatencyStats] = {
+            priority: LatencyStats() for priority in Priority
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[Priority] = None):
+        """占用一个槽位, 未指定优先级时使用当前任务的优先级"""
+        if priority is None:
+            priority = current_priority.get()
+        start = time.monotonic()
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            waiter = [priority, next(self._sequence), start, future]
+            self._waiters.append(waiter)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # 已经分到槽位后才被取消, 归还槽位
+                    self._release()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        self.wait_latency[priority].record(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """把空出的槽位分给等效优先级最高的等待者"""
+        now = time.monotonic()
+        while self.active < self.concurrency and self._waiters:
+            waiter = min(
+                self._waiters,
+                key=lambda w: (w[0] - (now - w[2]) / self.aging, w[1]),
+            )
+            self._waiters.remove(waiter)
+            if waiter[3].done():
+                # 等待者已被取消
+                continue
+            self.active += 1
+            waiter[3].set_result(None)
+
+    def stats(self) -> dict:
+        """各优先级的排队等待时间"""
+        return {
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "wait": {
+                priority.name.lower(): latency.stats()
+                for priority, latency in self.wait_latency.items()
+            },
+        }
@@ -1,36 +1,64 @@
+"""GGACAPI测试
+
+启动本地模拟服务器, 测试登录、获取作品列表、随机作品和token过期。
+需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.test_api
+"""
+
 import asyncio
-from ggac_api import GGACAPI
+from .fake_ggac_server import FakeGGACServer
+from .ggac_api import GGACAPI
 
 
 async def main():
     """主测试函数，所有操作都在同一个事件循环中进行"""
-    # 在函数内部创建API实例
-    api = GGACAPI()
-
-    # 异步登录
-    success = await api.login(username="", password="")
-
-    if not success:
-        print("登录失败")
-        return
-
-    # 测试获取3D作品
-    print("\n获取精选3D作品:")
-    featured_3d_works = await api.get_works(
-        category="featured",
-        media_type="3d",
-        sort_by="recommended",
-        page=1,
-        size=1,
-    )
-    print(featured_3d_works)
-
-    # 测试获取2D作品
-    print("\n获取精选2D作品:")
-    featured_2d_works = await api.get_works(
-        category="featured", media_type="2d", sort_by="recommended", page=1, size=1
-    )
-    print(featured_2d_works)
+    # token只能用于3次详情请求
+    async with FakeGGACServer(token_ttl=3, require_login=True) as server:
+        api = GGACAPI(base_url=server.base_url, rate_limit=0)
+
+        # 异步登录
+        success = await api.login(username="test", password="test")
+        assert success, "登录失败"
+
+        # 测试获取3D作品
+        print("\n获取精选3D作品:")
+        featured_3d_works = await api.get_works(
+            category="featured",
+            media_type="3d",
+            sort_by="recommended",
+            page=1,
+            size=1,
+        )
+        print(featured_3d_works)
+        assert len(featured_3d_works) == 1
+        assert featured_3d_works[0].media_category == "3D模型"
+
+        # 测试获取2D作品
+        print("\n获取精选2D作品:")
+        featured_2d_works = await api.get_works(
+            category="featured", media_type="2d", sort_by="recommended", page=1, size=1
+        )
+        print(featured_2d_works)
+        assert len(featured_2d_works) == 1
+
+        # 测试随机作品: 一次列表请求和一次详情请求
+        print("\n获取随机作品:")
+        requests_before = dict(server.requests)
+        work = await api.get_random_work(category="all", media_type="2d")
+        print(work)
+        assert work is not None
+        assert server.requests["detail"] - requests_before.get("detail", 0) == 1
+
+        # token用完后详情接口返回430
+        print("\ntoken过期后获取作品:")
+        expired = await api.get_works(category="all", media_type="2d", size=2)
+        print(expired)
+        print(f"请求次数: {dict(server.requests)}")
+        assert len(expired) == 2
+        assert server.requests["detail_denied"] == 2
+
+    print("\nGGACAPI测试通过")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+"""拼图封面测试
+
+本地启动图片服务器, 为一个带有多张大图的作品生成拼图封面卡片,
+检查拼图铺满卡片宽度, 失败的图片被跳过, 并且峰值内存远小于同时持有全部原图。
+需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.test_collage --font 字体路径
+"""
+
+import argparse
+import asyncio
+import tempfile
+from io import BytesIO
+from aiohttp import web
+from PIL import Image
+from .card_generator import CardGenerator
+from .ggac_scraper import WorkItem
+from .bench_render import make_work, current_rss_kb, reset_peak_rss, peak_rss_kb
+from .test_memory_budget import encode_png
+from ..config import FONTS_DIR
+
+HOST, PORT = "127.0.0.1", 18932
+MEDIA_SIZES = [
+    (3000, 2000),
+    (2000, 3000),
+    (3000, 3000),
+    (4000, 1500),
+    (2400, 3600),
+    (3000, 2000),
+    (2000, 2000),
+    (3600, 2400),
+    (1500, 4000),
+    (3000, 2000),
+]
+MISSING = 3  # 第3张图片返回404
+
+
+async def start_server() -> web.AppRunner:
+    images = {i: encode_png(size, (40 * i % 255, 90, 150)) for i, size in enumerate(MEDIA_SIZES)}
+    avatar = encode_png((128, 128))
+
+    async def media_handler(request):
+        n = int(request.match_info["n"])
+        if n == MISSING:
+            return web.Response(status=404)
+        return web.Response(body=images[n], content_type="image/png")
+
+    async def avatar_handler(request):
+        return web.Response(body=avatar, content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/media/{n}.png", media_handler)
+    app.router.add_get("/avatar.png", avatar_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    return runner
+
+
+async def test_collage(font_path: str):
+    runner = await start_server()
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            generator = CardGenerator(
+                output_dir=output_dir,
+                font_path=font_path,
+                card_cache=False,
+                image_cache_pixels=0,
+                collage_max_images=9,
+            )
+            work = make_work(1, f"http://{HOST}:{PORT}/media/0.png")
+            work.user_avatar = f"http://{HOST}:{PORT}/avatar.png"
+            work.media_urls = WorkItem.project_media(
+                [
+                    {"type": 1, "url": f"http://{HOST}:{PORT}/media/{i}.png"}
+                    for i in range(len(MEDIA_SIZES))
+                ]
+            )
+            assert len(generator._media_urls(work, 9)) == 9
+
+            baseline = current_rss_kb()
+            measured = reset_peak_rss()
+            data, _ = await generator.generate_card_data(work, "collage")
+            peak_mb = (peak_rss_kb() - baseline) / 1024
+
+            card = Image.open(BytesIO(data))
+            print(f"卡片尺寸: {card.width}x{card.height}")
+            assert card.width == generator.collage_width, "拼图没有铺满卡片宽度"
+            assert generator.pixel_budget.in_use == 0, "像素额度没有全部归还"
+
+            # 布局: 每行铺满宽度, 图片按顺序分配
+            aspects = [w / h for w, h in MEDIA_SIZES[:9]]
+            layout = generator._mosaic_rows(aspects, 1200, 960)
+            assert [i for row, _ in layout for i in row] == list(range(9))
+            print(f"分行: {[len(row) for row, _ in layout]}")
+
+            if measured:
+                originals_mb = sum(w * h for w, h in MEDIA_SIZES[:9]) * 4 / 1024 / 1024
+                print(f"全部原图约: {originals_mb:.0f}MB, 峰值内存增量: {peak_mb:.0f}MB")
+                assert peak_mb < originals_mb / 2, "峰值内存没有受到限制"
+            print("测试通过")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="拼图封面测试")
+    parser.add_argument("--font", default=FONTS_DIR, help="字体文件路径")
+    args = parser.parse_args()
+    asyncio.run(test_collage(args.font))
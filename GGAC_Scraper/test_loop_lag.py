@@ -0,0 +1,51 @@
+"""事件循环延迟监控测试
+
+在事件循环中直接调用同步的阻塞函数, 检查延迟被记录为卡顿并归属到该函数,
+短暂的阻塞不算卡顿。需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.test_loop_lag
+"""
+
+import asyncio
+import time
+from .loop_monitor import LoopLagMonitor, LOOP_LAG_SECONDS, LOOP_STALLS
+
+BLOCK_SECONDS = 0.4
+
+
+def blocking_render():
+    """模拟在事件循环中同步绘制卡片"""
+    time.sleep(BLOCK_SECONDS)
+
+
+async def test_loop_lag():
+    monitor = LoopLagMonitor(interval=0.05, threshold=0.1)
+    task = asyncio.create_task(monitor.run())
+    try:
+        await asyncio.sleep(0.3)
+        # 短于阈值的阻塞
+        time.sleep(0.02)
+        await asyncio.sleep(0.2)
+        assert LOOP_STALLS.total() == 0, "短暂的阻塞不应算作卡顿"
+
+        blocking_render()
+        await asyncio.sleep(0.2)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    print(f"采样次数: {LOOP_LAG_SECONDS.count()}")
+    for function, count, total, longest in monitor.top():
+        print(f"{function}: {count}次, 共{total:.2f}s, 最长{longest * 1000:.0f}ms")
+    for stall in monitor.recent:
+        print("\n".join(stall["stack"]))
+
+    assert LOOP_STALLS.total() == 1, "应记录一次卡顿"
+    function, count, total, longest = monitor.top(1)[0]
+    assert function == "GGAC_Scraper/test_loop_lag.py:blocking_render", function
+    assert BLOCK_SECONDS * 0.8 <= longest <= BLOCK_SECONDS * 1.5, longest
+    print("测试通过")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_loop_lag())
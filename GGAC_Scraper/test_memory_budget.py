@@ -0,0 +1,133 @@
+"""像素预算测试
+
+本地启动图片服务器, 同时为大量作品生成卡片, 封面都是大尺寸PNG,
+绘制并发数大于作品数, 只有像素预算限制同时驻留的封面, 检查预算的峰值
+和进程的峰值内存都不超过预算, 并检查超大图片会降级为占位图。
+需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.test_memory_budget --font 字体路径
+"""
+
+import argparse
+import asyncio
+import struct
+import tempfile
+import zlib
+from aiohttp import web
+from .card_generator import CardGenerator
+from .bench_render import make_work, current_rss_kb, reset_peak_rss, peak_rss_kb
+from ..config import FONTS_DIR
+
+HOST, PORT = "127.0.0.1", 18931
+COVER_SIZE = (4000, 4000)  # 解码后约64MB
+HUGE_SIZE = (8000, 6000)  # 超过单张上限
+BUDGET_PIXELS = 24_000_000  # 约96MB
+WORKS = 10
+
+
+def encode_png(size, color=(90, 120, 150)) -> bytes:
+    """逐行压缩生成纯色PNG, 不在测试进程中预先分配大图, 以免抬高内存基线"""
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(body))
+            + kind
+            + body
+            + struct.pack(">I", zlib.crc32(kind + body))
+        )
+
+    width, height = size
+    row = b"\x00" + bytes(color) * width
+    compressor = zlib.compressobj()
+    idat = b"".join(compressor.compress(row) for _ in range(height))
+    idat += compressor.flush()
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", idat)
+        + chunk(b"IEND", b"")
+    )
+
+
+async def start_server() -> web.AppRunner:
+    """封面立即返回, 头像延迟返回, 使解码后的封面在等待头像时驻留内存"""
+    cover = encode_png(COVER_SIZE)
+    huge = encode_png(HUGE_SIZE)
+    avatar = encode_png((128, 128))
+
+    async def cover_handler(request):
+        return web.Response(body=cover, content_type="image/png")
+
+    async def huge_handler(request):
+        return web.Response(body=huge, content_type="image/png")
+
+    async def avatar_handler(request):
+        await asyncio.sleep(0.5)
+        return web.Response(body=avatar, content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/cover/{n}.png", cover_handler)
+    app.router.add_get("/huge.png", huge_handler)
+    app.router.add_get("/avatar/{n}.png", avatar_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    return runner
+
+
+async def test_memory_budget(font_path: str):
+    runner = await start_server()
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            generator = CardGenerator(
+                output_dir=output_dir,
+                font_path=font_path,
+                card_cache=False,
+                image_cache_pixels=0,  # 关闭内存缓存, 每张封面都重新解码
+                render_budget_pixels=BUDGET_PIXELS,
+                # 所有卡片同时绘制, 内存只受像素预算限制
+                render_concurrency=WORKS + 1,
+            )
+            works = []
+            for i in range(WORKS):
+                work = make_work(i, f"http://{HOST}:{PORT}/cover/{i}.png")
+                work.user_avatar = f"http://{HOST}:{PORT}/avatar/{i}.png"
+                works.append(work)
+            huge_work = make_work(WORKS, f"http://{HOST}:{PORT}/huge.png")
+            huge_work.user_avatar = f"http://{HOST}:{PORT}/avatar/{WORKS}.png"
+            works.append(huge_work)
+
+            baseline = current_rss_kb()
+            check_rss = reset_peak_rss()
+            if not check_rss:
+                print("警告: 无法重置峰值内存统计, 只检查像素预算, 不检查进程峰值内存")
+            results = await asyncio.gather(
+                *(generator.generate_card_data(work) for work in works)
+            )
+            peak_mb = (peak_rss_kb() - baseline) / 1024
+
+            budget_mb = BUDGET_PIXELS * 4 / 1024 / 1024
+            print(f"预算: {budget_mb:.0f}MB")
+            print(f"预算峰值: {generator.pixel_budget.peak} 像素")
+
+            assert all(data for data, _ in results), "有卡片生成失败"
+            assert generator.pixel_budget.peak <= BUDGET_PIXELS, "像素预算的峰值超出预算"
+            assert generator.pixel_budget.in_use == 0, "像素额度没有全部归还"
+            if check_rss:
+                print(f"峰值内存增量: {peak_mb:.0f}MB")
+                # 额外留出字体、编码缓冲区等开销; 预算生效时约105MB,
+                # 不限制预算时约170MB, 超出该上限
+                assert peak_mb <= budget_mb + 32, "峰值内存超出预算"
+                print("测试通过")
+            else:
+                print("测试通过(未检查进程峰值内存)")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="像素预算测试")
+    parser.add_argument("--font", default=FONTS_DIR, help="字体文件路径")
+    args = parser.parse_args()
+    asyncio.run(test_memory_budget(args.font))
@@ -1,37 +1,72 @@
+"""监控测试
+
+启动本地模拟服务器, 第一次检查创建缓存, 服务器新增作品后第二次检查,
+应当只找到新增的作品并为其生成卡片。
+需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.test_monitor --font 字体路径
+"""
+
+import argparse
 import asyncio
-import json
-from ggac_monitor import GGACMonitor
+import os
+import tempfile
+from .fake_ggac_server import FakeGGACServer
+from .ggac_monitor import GGACMonitor
+from ..config import FONTS_DIR
+
+PUSH_SETTINGS = {
+    "最新2D": {"category": "all", "media_type": "2d", "sort_by": "latest"},
+}
+
 
+async def test_monitor(font_path: str):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        async with FakeGGACServer(works=60) as server:
+            monitor = GGACMonitor(
+                cache_dir=os.path.join(temp_dir, "cache"),
+                cards_dir=os.path.join(temp_dir, "cards"),
+                api_rate_limit=0,
+                warm_pool_size=0,
+                api_base_url=server.base_url,
+                font_path=font_path,
+            )
 
-async def test_monitor():
-    monitor = GGACMonitor()
+            # 第一次运行，会创建缓存
+            print("第一次运行:")
+            updates = await monitor.check_updates(PUSH_SETTINGS)
+            assert updates == {}
+            print("首次缓存完成，无更新推送")
 
-    # 第一次运行，会创建缓存
-    print("第一次运行:")
-    updates = await monitor.check_updates()
-    print("首次缓存完成，无更新推送")
+            # 服务器新增作品, 直到其中至少有两个2D原画
+            new_ids = set()
+            expected = set()
+            while len(expected) < 2:
+                for work_id in server.add_works(1):
+                    new_ids.add(work_id)
+                    if server.works[0]["dictMap"]["mediaCategory"] == "2D原画":
+                        expected.add(work_id)
 
-    # 模拟数据变化：修改缓存文件，删除一些数据
-    for cache_file in monitor.cache_files.values():
-        if cache_file.exists():
-            with open(cache_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            # 删除前3条数据，模拟有新内容
-            modified_data = data[3:]
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump(modified_data, f, ensure_ascii=False, indent=2)
+            print("\n新增作品后第二次运行:")
+            updates = await monitor.check_updates(PUSH_SETTINGS)
 
-    print("\n模拟数据变化后第二次运行:")
-    updates = await monitor.check_updates()
+            found = set()
+            for category, items in updates.items():
+                print(f"\n{category}类型更新:")
+                for item in items:
+                    print(f"图片路径: {item['image_path']}")
+                    print(f"作品链接: {item['url']}")
+                    print("---")
+                    assert os.path.exists(item["image_path"])
+                    found.add(int(item["url"].rstrip("/").split("/")[-1]))
+            assert found == expected and found <= new_ids, (found, expected)
+            monitor.release_updates(updates)
 
-    for category, items in updates.items():
-        if items:
-            print(f"\n{category}类型更新:")
-            for item in items:
-                print(f"图片路径: {item['image_path']}")
-                print(f"作品链接: {item['url']}")
-                print("---")
+    print("\n监控测试通过")
 
 
 if __name__ == "__main__":
-    asyncio.run(test_monitor())
+    parser = argparse.ArgumentParser(description="监控测试")
+    parser.add_argument("--font", default=FONTS_DIR, help="字体文件路径")
+    args = parser.parse_args()
+    asyncio.run(test_monitor(args.font))
@@ -1,34 +1,40 @@
+"""接口格式测试
+
+启动本地模拟服务器, 直接请求作品列表接口, 检查返回格式。
+需要以包的方式在插件目录的上一级运行:
+
+    python -m astrbot_plugin_ggac.GGAC_Scraper.test_request
+"""
+
 import aiohttp
 import asyncio
 import json
+from .fake_ggac_server import FakeGGACServer
+
 
 async def test_request():
-    # 测试2D原画请求
-    url_2d = "https://www.ggac.com/api/work/list?pageNumber=1&pageSize=48&isPublic=1&isRecommend=1&sortField=recommendUpdateTime&mediaCategory=1"
-    
-    # 测试3D模型请求
-    url_3d = "https://www.ggac.com/api/work/list?pageNumber=1&pageSize=48&isPublic=1&isRecommend=1&sortField=recommendUpdateTime&mediaCategory=2"
-    
-    async with aiohttp.ClientSession() as session:
-        # 测试2D原画
-        print("\n测试2D原画请求:")
-        async with session.get(url_2d, ssl=False) as response:
-            if response.status == 200:
-                data = await response.json()
-                print(f"状态码: {response.status}")
-                print(f"返回数据: {json.dumps(data, ensure_ascii=False, indent=2)[:200]}...")
-            else:
-                print(f"请求失败: {response.status}")
-        
-        # 测试3D模型
-        print("\n测试3D模型请求:")
-        async with session.get(url_3d, ssl=False) as response:
-            if response.status == 200:
-                data = await response.json()
-                print(f"状态码: {response.status}")
-                print(f"返回数据: {json.dumps(data, ensure_ascii=False, indent=2)[:200]}...")
-            else:
-                print(f"请求失败: {response.status}")
+    async with FakeGGACServer() as server:
+        # 测试2D原画请求
+        url_2d = f"{server.base_url}/work/list?pageNumber=1&pageSize=48&isPublic=1&isRecommend=1&sortField=recommendUpdateTime&mediaCategory=1"
+
+        # 测试3D模型请求
+        url_3d = f"{server.base_url}/work/list?pageNumber=1&pageSize=48&isPublic=1&isRecommend=1&sortField=recommendUpdateTime&mediaCategory=2"
+
+        async with aiohttp.ClientSession() as session:
+            for name, url, media in (("2D原画", url_2d, "2D原画"), ("3D模型", url_3d, "3D模型")):
+                print(f"\n测试{name}请求:")
+                async with session.get(url) as response:
+                    assert response.status == 200, f"请求失败: {response.status}"
+                    data = await response.json()
+                    print(f"状态码: {response.status}")
+                    print(f"返回数据: {json.dumps(data, ensure_ascii=False, indent=2)[:200]}...")
+                page_data = data["data"]["pageData"]
+                assert data["code"] == "0" and page_data
+                assert all(item["dictMap"]["mediaCategory"] == media for item in page_data)
+                assert not any(key.startswith("_") for key in page_data[0])
+
+    print("\n接口格式测试通过")
+
 
 if __name__ == "__main__":
-    asyncio.run(test_request()) 
\ No newline at end of file
+    asyncio.run(test_request())
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from PIL import ImageFont
+
+
+class TextLayout:
+    """文本排版: 按宽度换行, 超出行数时以省略号截断
+
+    每个字体尺寸缓存一份字符宽度表, 测量一行文本只需对字典求和,
+    不必反复调用FreeType。忽略字距调整, 对卡片标题足够准确
+    """
+
+    ELLIPSIS = "…"
+
+    def __init__(self, max_fonts: int = 32):
+        self.max_fonts = max_fonts
+        self._advances: "OrderedDict[Tuple[str, int], Dict[str, float]]" = (
+            OrderedDict()
+        )
+
+    def _advance_table(self, font: ImageFont.FreeTypeFont) -> Dict[str, float]:
+        """字体对应的字符宽度表"""
+        key = (font.path, font.size)
+        table = self._advances.get(key)
+        if table is None:
+            table = {}
+            self._advances[key] = table
+            if len(self._advances) > self.max_fonts:
+                self._advances.popitem(last=False)
+        else:
+            self._advances.move_to_end(key)
+        return table
+
+    def _char_widths(self, text: str, font: ImageFont.FreeTypeFont) -> List[float]:
+        """每个字符的宽度, 未缓存的字符调用一次getlength"""
+        table = self._advance_table(font)
+        widths = []
+        for char in text:
+            width = table.get(char)
+            if width is None:
+                width = table[char] = font.getlength(char)
+            widths.append(width)
+        return widths
+
+    def measure(self, text: str, font: ImageFont.FreeTypeFont) -> float:
+        """文本宽度"""
+        return sum(self._char_widths(text, font))
+
+    @staticmethod
+    def _is_wide(char: str) -> bool:
+        """中日韩文字及全角符号, 可以在任意位置换行"""
+        code = ord(char)
+        return (
+            0x2E80 <= code <= 0x9FFF
+            or 0xAC00 <= code <= 0xD7AF
+            or 0xF900 <= code <= 0xFAFF
+            or 0xFF00 <= code <= 0xFFEF
+        )
+
+    def _break_points(self, text: str) -> List[int]:
+        """允许换行的位置(在该下标之前换行)"""
+        points = []
+        for i in range(1, len(text)):
+            prev, char = text[i - 1], text[i]
+            if prev == " " or self._is_wide(prev) or self._is_wide(char):
+                points.append(i)
+        return points
+
+    def wrap(
+        self,
+        text: str,
+        font: ImageFont.FreeTypeFont,
+        max_width: float,
+        max_lines: int = 1,
+    ) -> List[str]:
+        """按最大宽度换行, 最多max_lines行, 超出时末行以省略号结尾"""
+        text = " ".join(text.split())
+        if not text:
+            return [""]
+        widths = self._char_widths(text, font)
+        breaks = set(self._break_points(text))
+
+        lines = []
+        start = 0
+        while start < len(text) and len(lines) < max_lines:
+            # 找到这一行最多能容纳的字符
+            width = 0.0
+            end = start
+            while end < len(text) and width + widths[end] <= max_width:
+                width += widths[end]
+                end += 1
+            if end == len(text):
+                lines.append(text[start:end])
+                start = end
+                break
+            # 回退到最近的换行位置, 没有合适位置时(超长单词)直接截断
+            cut = end
+            while cut > start and cut not in breaks:
+                cut -= 1
+            if cut == start:
+                cut = max(end, start + 1)
+            lines.append(text[start:cut].rstrip())
+            start = cut
+            while start < len(text) and text[start] == " ":
+                start += 1
+
+        if start < len(text):
+            lines[-1] = self._ellipsize(lines[-1], font, max_width)
+        return lines
+
+    def _ellipsize(self, line: str, font: ImageFont.FreeTypeFont, max_width: float) -> str:
+        """截断行尾, 使加上省略号后不超过最大宽度"""
+        budget = max_width - self.measure(self.ELLIPSIS, font)
+        widths = self._char_widths(line, font)
+        width = 0.0
+        end = 0
+        while end < len(line) and width + widths[end] <= budget:
+            width += widths[end]
+            end += 1
+        return line[:end].rstrip() + self.ELLIPSIS
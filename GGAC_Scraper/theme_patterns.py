@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+from PIL import Image, ImageColor
+from .log import logger
+
+try:
+    import numpy as np
+except ImportError:  # numpy不可用时不绘制底纹
+    np = None
+
+
+class PatternTiles:
+    """主题底纹
+
+    底纹按 (底纹类型, 颜色, 宽度档位) 用numpy预先与背景色混合成RGB图块,
+    生成一次后缓存, 绘制时不带遮罩直接贴到卡片上
+    """
+
+    PATTERNS = ("dots", "lines", "circles", "grid")
+
+    def __init__(
+        self, width_step: int = 100, opacity: float = 0.08, max_tiles: int = 64
+    ):
+        self.width_step = width_step
+        self.opacity = opacity
+        self.max_tiles = max_tiles
+        self._tiles: "OrderedDict[Tuple[str, str, str, int], Image.Image]" = (
+            OrderedDict()
+        )
+        if np is None:
+            logger.warning("未安装numpy, 卡片将不绘制主题底纹")
+
+    def _bucket(self, width: int) -> int:
+        """宽度向上取整到档位"""
+        return -(-width // self.width_step) * self.width_step
+
+    def _render(
+        self, pattern: str, color: str, background: str, width: int, height: int
+    ) -> Image.Image:
+        """用numpy计算底纹并与背景色混合"""
+        spacing = max(12, width // 30)
+        stroke = max(1, spacing // 12)
+        y, x = np.ogrid[:height, :width]
+        # 每个像素在所属网格单元中的相对坐标
+        cell_x = x % spacing
+        cell_y = y % spacing
+        center = spacing / 2
+
+        if pattern == "dots":
+            radius = spacing / 8
+            mask = (cell_x - center) ** 2 + (cell_y - center) ** 2 <= radius**2
+        elif pattern == "lines":
+            mask = (x + y) % spacing < stroke
+        elif pattern == "circles":
+            distance = np.sqrt((cell_x - center) ** 2 + (cell_y - center) ** 2)
+            mask = np.abs(distance - spacing / 3) < stroke * 0.75
+        else:  # grid
+            mask = (cell_x < stroke) | (cell_y < stroke)
+
+        # 图案像素按不透明度混合主题色, 其余像素为背景色
+        bg = np.array(ImageColor.getrgb(background)[:3], dtype=np.float32)
+        fg = np.array(ImageColor.getrgb(color)[:3], dtype=np.float32)
+        blended = (bg + (fg - bg) * self.opacity).round().astype(np.uint8)
+        tile = np.empty((height, width, 3), dtype=np.uint8)
+        tile[...] = bg.astype(np.uint8)
+        tile[np.broadcast_to(mask, (height, width))] = blended
+        return Image.fromarray(tile, "RGB")
+
+    def get_tile(
+        self, pattern: str, color: str, background: str, width: int, height: int
+    ) -> Optional[Image.Image]:
+        """获取至少覆盖 width x height 区域的底纹图块"""
+        if np is None or pattern not in self.PATTERNS:
+            return None
+        key = (pattern, color, background, self._bucket(width))
+        tile = self._tiles.get(key)
+        if tile is None or tile.height < height:
+            # 预留一些高度, 同一档位内不同卡片的区域高度略有差异
+            tile = self._render(pattern, color, background, key[3], int(height * 1.25))
+            self._tiles[key] = tile
+            if len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def paste(
+        self,
+        card: Image.Image,
+        pattern: str,
+        color: str,
+        background: str,
+        top: int,
+        height: int,
+    ):
+        """把底纹贴到卡片从top开始到底部的区域, 该区域应为纯背景色
+
+        图块比区域大时超出卡片的部分会被裁掉, 因此无需复制裁剪
+        """
+        tile = self.get_tile(pattern, color, background, card.width, height)
+        if tile is not None:
+            card.paste(tile, (0, top))
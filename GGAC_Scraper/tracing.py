@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from .log import logger, SAMPLED
+
+# perf_counter与墙上时间的差, 记录耗时用perf_counter, 写入文件时换算为时间戳
+_CLOCK_OFFSET = time.time() - time.perf_counter()
+
+
+class Trace:
+    """一次推送中某个作品经过的各步骤, 每个步骤为一个span
+
+    span为字典: name(步骤名), start(时间戳), duration_ms, 以及附加的属性
+    """
+
+    __slots__ = ("trace_id", "work_id", "attrs", "spans")
+
+    def __init__(self, work_id=None, **attrs):
+        self.trace_id = os.urandom(8).hex()
+        self.work_id = work_id
+        self.attrs = attrs
+        self.spans: List[dict] = []
+
+    def add(self, name: str, start: float, end: float, **attrs) -> dict:
+        """按perf_counter的起止时间添加一个span"""
+        record = {
+            "name": name,
+            "start": round(_CLOCK_OFFSET + start, 6),
+            "duration_ms": round((end - start) * 1000, 3),
+        }
+        record.update(attrs)
+        self.spans.append(record)
+        return record
+
+    def to_dict(self) -> dict:
+        spans = sorted(self.spans, key=lambda span: span["start"])
+        return {
+            "trace_id": self.trace_id,
+            "work_id": self.work_id,
+            **self.attrs,
+            "start": spans[0]["start"] if spans else None,
+            "spans": spans,
+        }
+
+
+# 当前任务所属的trace, 未采样时为None; 新建的任务会继承
+current_trace: ContextVar[Optional[Trace]] = ContextVar("ggac_trace", default=None)
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]):
+    """在代码块内把span记录到指定的trace"""
+    token = current_trace.set(trace)
+    try:
+        yield
+    finally:
+        current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """记录代码块的耗时, 返回的字典可在代码块内补充属性
+
+    没有当前trace时只有一次ContextVar查询
+    """
+    trace = current_trace.get()
+    if trace is None:
+        yield attrs
+        return
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        trace.add(name, start, time.perf_counter(), **attrs)
+
+
+def record_span(name: str, start: float, end: Optional[float] = None, **attrs):
+    """记录已经测量好的区间, start和end为perf_counter的值, end默认为现在"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, start, time.perf_counter() if end is None else end, **attrs)
+
+
+class Tracer:
+    """按比例采样新作品, 推送完成后把trace写入按大小轮转的JSONL文件
+
+    每行一个trace。文件超过max_bytes时依次改名为 .1 .. .backups,
+    最旧的被删除
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        sample_rate: float = 1.0,
+        max_bytes: int = 5 * 1024 * 1024,
+        backups: int = 3,
+    ):
+        self.path = Path(path) if path else None
+        self.sample_rate = sample_rate if path else 0.0
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def collector(self) -> Optional[Trace]:
+        """收集列表和详情请求的span, 此时还不知道哪些作品需要推送"""
+        return Trace() if self.enabled else None
+
+    def start(self, work_id, collected: Optional[Trace] = None, **attrs) -> Optional[Trace]:
+        """按采样率为作品开始一个trace, 未被采样时返回None
+
+        继承collected中不属于任何作品或属于该作品的span
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        trace = Trace(work_id, **attrs)
+        if collected is not None:
+            trace.spans = [
+                span
+                for span in collected.spans
+                if span.get("work_id", work_id) == work_id
+            ]
+        return trace
+
+    def finish(self, trace: Optional[Trace], **attrs):
+        """写入trace, 出错不影响推送"""
+        if trace is None or self.path is None:
+            return
+        trace.attrs.update(attrs)
+        line = json.dumps(trace.to_dict(), ensure_ascii=False) + "\n"
+        try:
+            if (
+                self.path.exists()
+                and self.path.stat().st_size + len(line) > self.max_bytes
+            ):
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning("写入trace文件失败: %s", e, extra=SAMPLED)
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def find(self, work_id, limit: int = 3) -> List[dict]:
+        """从新到旧查找作品最近的trace
+
+        同步读取所有trace文件, 在事件循环中应通过asyncio.to_thread调用
+        """
+        if self.path is None:
+            return []
+        found = []
+        # 先用字符串筛选, 只解析可能匹配的行
+        needle = f'"work_id": {json.dumps(work_id)},'
+        files = [self.path] + [
+            self.path.with_name(f"{self.path.name}.{index}")
+            for index in range(1, self.backups + 1)
+        ]
+        for trace_file in files:
+            if not trace_file.exists():
+                continue
+            with open(trace_file, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            for line in reversed(lines):
+                if needle not in line:
+                    continue
+                try:
+                    trace = json.loads(line)
+                except ValueError:
+                    continue
+                if trace.get("work_id") == work_id:
+                    found.append(trace)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+
+def format_timeline(trace: dict) -> List[str]:
+    """trace的时间线, 每个span一行: 相对开始的时间、步骤、耗时和属性"""
+    start = trace.get("start") or 0
+    spans = trace.get("spans", [])
+    end = max((span["start"] + span["duration_ms"] / 1000 for span in spans), default=start)
+    header = (
+        f"trace {trace['trace_id']} "
+        f"({trace.get('setting', '未知设置')}, "
+        f"{datetime.fromtimestamp(start).strftime('%m-%d %H:%M:%S')}, "
+        f"共{(end - start) * 1000:.0f}ms)"
+    )
+    if trace.get("error"):
+        header += f" 出错: {trace['error']}"
+    lines = [header]
+    for span in spans:
+        extra = ", ".join(
+            f"{key}={value}"
+            for key, value in span.items()
+            if key not in ("name", "start", "duration_ms")
+        )
+        lines.append(
+            f"  +{(span['start'] - start) * 1000:>7.0f}ms "
+            f"{span['name']:<12}{span['duration_ms']:>8.0f}ms"
+            + (f"  {extra}" if extra else "")
+        )
+    return lines
+
+
+def trace_summary(traces: List[Dict]) -> str:
+    """多个trace的时间线, 用于 /ggac_trace"""
+    return "\n\n".join("\n".join(format_timeline(trace)) for trace in traces)
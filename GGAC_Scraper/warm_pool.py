@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
+from .ggac_api import GGACAPI
+from .card_generator import CardGenerator
+from .scheduler import Priority, scheduling_priority
+from .log import logger
+
+
+class WarmPool:
+    """预渲染卡片池
+
+    为常用的 (分类, 创作类型) 组合预先渲染若干张随机作品卡片,
+    /ggac 命令直接从池中取卡片, 取走后在空闲时补充:
+    - 补充只在监控任务空闲时进行, 请求经过爬虫共用的限流器
+    - 池中的卡片在卡片存储中保持固定, 不会被淘汰
+    - 池、推送记录和请求次数保存在状态文件中, 重启后继续使用;
+      状态变化后延迟save_delay秒合并写入, 文件写入在线程中进行
+    - 同一群组在repeat_window秒内不会收到同一个作品
+    """
+
+    def __init__(
+        self,
+        state_file: str,
+        api: GGACAPI,
+        card_generator: CardGenerator,
+        size: int = 3,  # 每个组合预渲染的卡片数, 0为关闭
+        repeat_window: float = 24 * 3600,  # 同一群组不重复的时间窗口(秒)
+        max_age: float = 6 * 3600,  # 池中卡片的最长保留时间(秒)
+        max_keys: int = 8,  # 最多预热的组合数
+        cover_type: str = "default",
+        default_keys: tuple = ("all/2d",),  # 未被请求过也预热的组合
+        save_delay: float = 2.0,  # 状态变化后延迟写入的秒数
+    ):
+        self.state_file = Path(state_file)
+        self.api = api
+        self.card_generator = card_generator
+        self.size = max(0, size)
+        self.repeat_window = repeat_window
+        self.max_age = max_age
+        self.max_keys = max_keys
+        self.cover_type = cover_type
+        self.default_keys = list(default_keys)
+        self.save_delay = save_delay
+
+        # 监控任务运行时清除, 补充前等待
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+        # 组合 -> 卡片列表, 卡片为 {id, title, url, image_path, created}
+        self._pools: Dict[str, List[dict]] = {}
+        # 群组 -> {作品ID: 推送时间}
+        self._served: Dict[str, Dict[str, float]] = {}
+        # 组合 -> 请求次数, 用于选择预热的组合
+        self._requests: Dict[str, int] = {}
+        self._refilling = set()
+        # 后台补充任务, 保留引用避免任务在运行中被回收
+        self._tasks = set()
+        self._save_task: Optional[asyncio.Task] = None
+        self._save_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    @staticmethod
+    def key(category: str, media_type: str) -> str:
+        return f"{category}/{media_type}"
+
+    def _load(self):
+        """读取状态文件, 丢弃文件已不存在或过旧的卡片, 其余重新固定"""
+        if not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("读取卡片池状态失败: %s", e)
+            return
+
+        now = time.time()
+        for key, entries in state.get("pools", {}).items():
+            kept = []
+            for entry in entries:
+                if now - entry["created"] > self.max_age:
+                    continue
+                if not os.path.exists(entry["image_path"]):
+                    continue
+                self.card_generator.card_store.pin(entry["image_path"])
+                kept.append(entry)
+            if kept:
+                self._pools[key] = kept
+        self._served = state.get("served", {})
+        self._requests = state.get("requests", {})
+        self._prune_served(now)
+
+    def _save(self):
+        """状态有变化, save_delay秒后写入, 期间的多次变化合并为一次写入"""
+        if self._save_task is None:
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(self.save_delay)
+        # 之后的变化重新安排写入
+        self._save_task = None
+        await self.flush()
+
+    async def flush(self):
+        """立即写入状态文件
+
+        在事件循环中序列化当前状态, 文件写入在线程中进行, 不阻塞事件循环
+        """
+        data = json.dumps(
+            {
+                "pools": self._pools,
+                "served": self._served,
+                "requests": self._requests,
+            },
+            ensure_ascii=False,
+        )
+        async with self._save_lock:
+            await asyncio.to_thread(self._write_state, data)
+
+    def _write_state(self, data: str):
+        """先写临时文件再替换, 避免中途退出损坏状态"""
+        temp_file = self.state_file.with_suffix(".tmp")
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_file, self.state_file)
+        except OSError as e:
+            logger.warning("保存卡片池状态失败: %s", e)
+
+    async def close(self):
+        """停止后台补充任务并写入尚未保存的状态"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+            await self.flush()
+
+    def _prune_served(self, now: float):
+        """清理超出时间窗口的推送记录"""
+        expire_before = now - self.repeat_window
+        for group_id in list(self._served):
+            served = {
+                work_id: served_at
+                for work_id, served_at in self._served[group_id].items()
+                if served_at >= expire_before
+            }
+            if served:
+                self._served[group_id] = served
+            else:
+                del self._served[group_id]
+
+    def was_served(self, group_id, work_id) -> bool:
+        """该作品是否在时间窗口内推送给过该群组"""
+        served_at = self._served.get(str(group_id), {}).get(str(work_id))
+        return served_at is not None and time.time() - served_at < self.repeat_window
+
+    def mark_served(self, group_id, work_id):
+        """记录推送"""
+        now = time.time()
+        self._served.setdefault(str(group_id), {})[str(work_id)] = now
+        self._prune_served(now)
+        self._save()
+
+    def take(self, category: str, media_type: str, group_id) -> Optional[dict]:
+        """取出一张没有推送给过该群组的卡片, 并在后台补充
+
+        返回的卡片仍处于固定状态, 由调用方推送完成后取消固定
+        """
+        if self.size == 0:
+            return None
+        key = self.key(category, media_type)
+        self._requests[key] = self._requests.get(key, 0) + 1
+
+        entry = None
+        now = time.time()
+        pool = self._pools.get(key, [])
+        for i, candidate in enumerate(pool):
+            if now - candidate["created"] > self.max_age:
+                continue
+            if not self.was_served(group_id, candidate["id"]):
+                entry = pool.pop(i)
+                break
+        self._drop_expired(key, now)
+        self._save()
+
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        task = asyncio.create_task(self.refill(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return entry
+
+    def _drop_expired(self, key: str, now: float):
+        """移除过旧的卡片并取消固定"""
+        pool = self._pools.get(key, [])
+        for entry in pool:
+            if now - entry["created"] > self.max_age:
+                self.card_generator.card_store.unpin(entry["image_path"])
+        self._pools[key] = [
+            entry for entry in pool if now - entry["created"] <= self.max_age
+        ]
+
+    def popular_keys(self) -> List[str]:
+        """需要预热的组合: 默认组合加上请求次数最多的组合"""
+        keys = list(self.default_keys)
+        for key, _ in sorted(self._requests.items(), key=lambda item: -item[1]):
+            if len(keys) >= self.max_keys:
+                break
+            if key not in keys:
+                keys.append(key)
+        return keys[: self.max_keys]
+
+    async def refill(self, key: str):
+        """在空闲时把该组合补充到size张卡片, 同一组合同时只有一个补充任务
+
+        补充任务可能由用户命令创建, 这里显式降为后台优先级
+        """
+        if self.size == 0 or key in self._refilling:
+            return
+        self._refilling.add(key)
+        try:
+            with scheduling_priority(Priority.BACKGROUND):
+                await self._refill(key)
+        except Exception as e:
+            logger.error("补充卡片池 %s 时出错: %s", key, e)
+        finally:
+            self._refilling.discard(key)
+
+    async def _refill(self, key: str):
+        """逐张获取随机作品并渲染, 每张之前等待监控任务空闲"""
+        category, media_type = key.split("/", 1)
+        attempts = 0
+        while len(self._pools.get(key, [])) < self.size and attempts < self.size * 3:
+            attempts += 1
+            await self.idle.wait()
+            work = await self.api.get_random_work(
+                category=category, media_type=media_type, sort_by="latest"
+            )
+            if work is None:
+                break
+            pool = self._pools.setdefault(key, [])
+            if any(entry["id"] == work.id for entry in pool):
+                continue
+            card_path, work_url = await self.card_generator.generate_card(
+                work, self.cover_type
+            )
+            if card_path is None:
+                continue
+            self.card_generator.card_store.pin(card_path)
+            pool.append(
+                {
+                    "id": work.id,
+                    "title": work.title,
+                    "url": work_url,
+                    "image_path": card_path,
+                    "created": time.time(),
+                }
+            )
+            self._save()
+
+    async def run(self, interval: float = 60):
+        """后台任务: 定期补充常用组合"""
+        if self.size == 0:
+            return
+        while True:
+            for key in self.popular_keys():
+                await self.refill(key)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        """卡片池使用情况"""
+        return {
+            "keys": len(self._pools),
+            "cards": sum(len(pool) for pool in self._pools.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,4 +1,6 @@
 import asyncio
+import os
+import time
 import traceback
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
@@ -7,8 +9,12 @@ from astrbot.core.message.message_event_result import MessageChain
 from astrbot.api.message_components import Plain, Image
 from astrbot.api.event.filter import EventMessageType
 from astrbot.api import logger
-from typing import List, Dict
-from .GGAC_Scraper.ggac_monitor import GGACMonitor
+from typing import List, Dict, Optional
+from .GGAC_Scraper.ggac_monitor import GGACMonitor, SEND_SECONDS, MESSAGES_SENT
+from .GGAC_Scraper.scheduler import Priority, scheduling_priority
+from .GGAC_Scraper.log import configure_logging
+from .GGAC_Scraper.tracing import use_trace, span, trace_summary
+from .GGAC_Scraper.profiler import ProfilerBusyError
 from .config import CACHE_DIR, CARDS_DIR, CATEGORY_MAP, load_settings
 
 
@@ -22,6 +28,7 @@ class GGACPlugin(Star):
     def __init__(self, context: Context, config: dict):
         super().__init__(context)
         self.config = config
+        configure_logging(self.config.get("log_level", "INFO"))
         # 加载推送设置
         settings = load_settings()
 
@@ -40,11 +47,50 @@ class GGACPlugin(Star):
                 ),
             }
 
-        self.monitor = GGACMonitor(cache_dir=CACHE_DIR, cards_dir=CARDS_DIR)
+        self.monitor = GGACMonitor(
+            cache_dir=CACHE_DIR,
+            cards_dir=CARDS_DIR,
+            image_cache_mb=self.config.get("image_cache_mb", 200),
+            card_cache=self.config.get("card_cache", True),
+            stat_granularity=self.config.get("stat_granularity", 100),
+            card_store_mb=self.config.get("card_store_mb", 500),
+            card_max_age_hours=self.config.get("card_max_age_hours", 72),
+            card_format=self.config.get("card_format", "png"),
+            card_quality=self.config.get("card_quality", 85),
+            card_target_kb=self.config.get("card_target_kb", 0),
+            delivery=self.config.get("card_delivery", "file"),
+            render_memory_mb=self.config.get("render_memory_mb", 256),
+            theme_patterns=self.config.get("theme_patterns", True),
+            theme_mode=self.config.get("theme_mode", "category"),
+            collage_max_images=self.config.get("collage_max_images", 9),
+            cover_type=self.config.get("cover_type", "default"),
+            warm_pool_size=self.config.get("warm_pool_size", 3),
+            warm_pool_repeat_hours=self.config.get("warm_pool_repeat_hours", 24),
+            api_rate_limit=self.config.get("api_rate_limit", 8),
+            metrics_file=os.path.join(CACHE_DIR, "metrics.prom")
+            if self.config.get("metrics_file", False)
+            else None,
+            trace_file=os.path.join(CACHE_DIR, "traces.jsonl"),
+            trace_sample_rate=self.config.get("trace_sample_rate", 1.0),
+            loop_lag_threshold=self.config.get("loop_lag_threshold_ms", 100) / 1000,
+        )
         self.monitor.set_credentials(
             self.config.get("account"), self.config.get("password")
         )
-        asyncio.create_task(self.monitoring_task())
+        # 保留后台任务的引用, 插件停用或重载时在terminate中取消
+        self.tasks = [
+            asyncio.create_task(self.monitoring_task()),
+            asyncio.create_task(self.monitor.warm_pool.run()),
+            asyncio.create_task(self.monitor.loop_monitor.run()),
+        ]
+
+    async def terminate(self):
+        """插件停用或重载时停止后台任务, 避免重载后旧的任务和线程继续运行"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.monitor.loop_monitor.stop()
+        await self.monitor.warm_pool.close()
 
     @filter.on_astrbot_loaded()
     async def on_astrbot_loaded(self):
@@ -72,7 +118,7 @@ class GGACPlugin(Star):
                         message = [
                             {
                                 "type": "image",
-                                "data": {"file": "file://" + item["image_path"]},
+                                "data": {"file": item["image_file"]},
                             },
                             {
                                 "type": "text",
@@ -81,9 +127,16 @@ class GGACPlugin(Star):
                         ]
 
                         payloads = {"group_id": group_id, "message": message}
-                        await self.client.api.call_action("send_group_msg", **payloads)
+                        with use_trace(item.get("trace")), span(
+                            "send", group=group_id
+                        ), SEND_SECONDS.time():
+                            await self.client.api.call_action(
+                                "send_group_msg", **payloads
+                            )
+                        MESSAGES_SENT.inc(result="ok")
                         await asyncio.sleep(1)
                     except Exception as e:
+                        MESSAGES_SENT.inc(result="error")
                         logger.error(f"推送作品时出错: {e}")
                         traceback.print_exc()
                         continue
@@ -110,13 +163,18 @@ class GGACPlugin(Star):
                     target_groups = self.config.get("target_groups", [])
                     if not target_groups:
                         logger.error("未配置目标群组")
+                        self.monitor.release_updates(updates)
                         continue
 
                     logger.info(f"检测到更新，准备向 {len(target_groups)} 个群组推送")
 
-                    for group_id in target_groups:
-                        await self.send_updates(group_id, updates)
+                    try:
+                        for group_id in target_groups:
+                            await self.send_updates(group_id, updates)
+                    finally:
+                        self.monitor.release_updates(updates)
 
+                self.monitor.export_metrics()
                 await asyncio.sleep(interval)
             except Exception as e:
                 logger.error(f"监控任务出错: {e}")
@@ -125,12 +183,118 @@ class GGACPlugin(Star):
     @filter.command("ggac_status")
     async def check_status(self, event: AstrMessageEvent):
         """检查插件状态"""
+        store_stats = self.monitor.card_generator.card_store.stats()
+        pool_stats = self.monitor.warm_pool.stats()
+        scheduler_stats = self.monitor.scheduler_stats()
+        command = scheduler_stats["command"]
+
+        def queue_p95(queue: str) -> str:
+            waits = scheduler_stats[queue]["wait"]
+            return ", ".join(
+                f"{name} {waits[name]['p95_ms']:.0f}ms"
+                for name in ("interactive", "polling", "background")
+            )
+
         yield event.plain_result(
             f"GGAC监控插件正在运行\n"
             f"目标群组: {', '.join(map(str, self.config.get('target_groups', [])))} \n"
-            f"检查间隔: {self.config.get('check_interval', 300)}秒"
+            f"检查间隔: {self.config.get('check_interval', 300)}秒\n"
+            f"卡片存储: {store_stats['cards']}张, "
+            f"{store_stats['bytes'] / 1024 / 1024:.1f}/"
+            f"{store_stats['max_bytes'] / 1024 / 1024:.0f}MB, "
+            f"固定{store_stats['pinned']}张, 已淘汰{store_stats['evicted']}张\n"
+            f"预渲染卡片池: {pool_stats['cards']}张, "
+            f"命中{pool_stats['hits']}次, 未命中{pool_stats['misses']}次\n"
+            f"/ggac 耗时: p50 {command['p50_ms']:.0f}ms, p95 {command['p95_ms']:.0f}ms\n"
+            f"请求排队p95: {queue_p95('http')}\n"
+            f"绘制排队p95: {queue_p95('render')}\n"
+            + "\n".join(self.monitor.metrics_summary())
         )
 
+    @filter.command("ggac_trace")
+    async def show_trace(self, event: AstrMessageEvent, work_id: str = ""):
+        """查看作品最近几次推送的各步骤耗时"""
+        if not work_id.isdigit():
+            yield event.plain_result("用法: /ggac_trace <作品ID>")
+            return
+        if not self.monitor.tracer.enabled:
+            yield event.plain_result("未开启推送追踪, 请将 trace_sample_rate 设为大于0")
+            return
+        # trace文件最多约20MB, 在线程中读取, 不阻塞事件循环
+        traces = await asyncio.to_thread(self.monitor.tracer.find, int(work_id))
+        if not traces:
+            yield event.plain_result(f"没有作品 {work_id} 的推送记录")
+            return
+        yield event.plain_result(trace_summary(traces))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("ggac_profile")
+    async def profile(
+        self, event: AstrMessageEvent, amount: int = 60, unit: str = "秒"
+    ):
+        """性能分析: /ggac_profile 60 分析60秒, /ggac_profile 2 轮 分析2个检查周期"""
+        by_cycles = unit in ("轮", "cycle", "cycles")
+        if by_cycles:
+            amount = max(1, min(amount, 10))
+            description = f"接下来的{amount}个检查周期"
+        else:
+            amount = max(1, min(amount, 600))
+            description = f"接下来的{amount}秒"
+        if self.monitor.profiler.active:
+            yield event.plain_result("已经在进行性能分析, 请等待结束")
+            return
+        yield event.plain_result(f"开始性能分析, 时长为{description}")
+        try:
+            if by_cycles:
+                interval = self.config.get("check_interval", 300)
+                result = await self.monitor.profiler.run(
+                    cycles=amount, timeout=amount * interval + 600
+                )
+            else:
+                result = await self.monitor.profiler.run(seconds=amount)
+        except ProfilerBusyError as e:
+            yield event.plain_result(str(e))
+            return
+
+        summary = f"性能分析完成, 时长{result['seconds']:.0f}秒"
+        if result["cycles"] is not None:
+            summary += f", 完成{result['cycles']}个检查周期"
+        yield event.plain_result(
+            f"{summary}\n"
+            f"自身耗时  累计耗时  调用次数  位置\n"
+            + "\n".join(result["hotspots"])
+            + "\n\n内存增长最多:\n"
+            + "\n".join(result["allocations"])
+            + f"\n\n完整报告: {result['report']}\npstats: {result['pstats']}"
+        )
+
+    async def _pick_random_item(
+        self, category: str, media_type: str, group_id
+    ) -> Optional[Dict[str, str]]:
+        """为群组挑选一张随机作品卡片, 没有作品时返回None"""
+        warm_pool = self.monitor.warm_pool
+
+        # 优先使用预渲染的卡片
+        item = await self.monitor.take_warm_card(category, media_type, group_id)
+        if item is None:
+            # 只请求列表, 随机选中一个作品后才请求它的详情,
+            # 尽量避开最近推送给本群的作品
+            work = None
+            for _ in range(3):
+                work = await self.monitor.api.get_random_work(
+                    category=category, media_type=media_type, sort_by="latest"
+                )
+                if not work or not warm_pool.was_served(group_id, work.id):
+                    break
+            if not work:
+                return None
+
+            item = await self.monitor.render_work(
+                work, self.config.get("cover_type", "default")
+            )
+        warm_pool.mark_served(group_id, item["id"])
+        return item
+
     @filter.command("ggac")
     async def get_random_work(
         self, event: AstrMessageEvent, category: str = "all", media_type: str = "2d"
@@ -227,40 +391,43 @@ class GGACPlugin(Star):
             standard_category = category_map[category]
             standard_media_type = media_type_map[media_type]
 
-            works = await self.monitor.api.get_works(
-                category=standard_category,
-                media_type=standard_media_type,
-                sort_by="latest",
-                page=1,
-            )
+            group_id = event.message_obj.group_id
+
+            # 用户命令的请求和绘制优先于推送和预热
+            start = time.monotonic()
+            with scheduling_priority(Priority.INTERACTIVE):
+                item = await self._pick_random_item(
+                    standard_category, standard_media_type, group_id
+                )
+            self.monitor.command_latency.record(time.monotonic() - start)
 
-            if not works:
+            if item is None:
                 yield event.plain_result(
                     f"未找到{category_names[standard_category]}分类下的{media_type_names[standard_media_type]}作品"
                 )
                 return
 
-            import random
-
-            work = random.choice(works)
-
-            card_path, work_url = await self.monitor.card_generator.generate_card(
-                work, self.config.get("cover_type", "default")
-            )
-
             message = [
                 {
                     "type": "image",
-                    "data": {"file": "file://" + card_path},
+                    "data": {"file": item["image_file"]},
                 },
                 {
                     "type": "text",
-                    "data": {"text": f"作品链接: {work_url}"},
+                    "data": {"text": f"作品链接: {item['url']}"},
                 },
             ]
 
-            payloads = {"group_id": event.message_obj.group_id, "message": message}
-            await self.client.api.call_action("send_group_msg", **payloads)
+            payloads = {"group_id": group_id, "message": message}
+            try:
+                with SEND_SECONDS.time():
+                    await self.client.api.call_action("send_group_msg", **payloads)
+                MESSAGES_SENT.inc(result="ok")
+            except Exception:
+                MESSAGES_SENT.inc(result="error")
+                raise
+            finally:
+                self.monitor.release_updates({"random": [item]})
 
         except Exception as e:
             logger.error(f"获取随机作品时出错: {e}")